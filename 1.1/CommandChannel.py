@@ -0,0 +1,258 @@
+import itertools
+import re
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+from ServerEvents import HEADER_RE
+from TickMonitor import COLOR_RE
+
+# Markers are sent as unknown commands. Brigadier servers echo the input back
+# ("mcq00002a<--[HERE]", at most 10 characters of it), so keep them short.
+MARKER_PREFIX = "mcq"
+TOKEN_RE = re.compile(MARKER_PREFIX + r"([0-9a-f]{6})<--\[HERE\]")
+UNKNOWN_REPLY_RE = re.compile(r"Unknown or incomplete command|Unknown command")
+
+# Whether the server echoes unknown commands; None means learn it from the first marker
+ECHOES = {"Vanilla": True, "Fabric": True, "Forge": True, "Pocket Edition (PHP)": False}
+SETTLE = 0.5  # seconds a no-echo reply waits to see whether a second "Unknown command" follows
+
+
+class Response:
+    def __init__(self, command, lines, complete):
+        self.command = command
+        self.lines = lines
+        self.complete = complete  # False when the end marker never came back in time
+
+    def messages(self):
+        # The lines without the "[12:00:00] [Server thread/INFO]: " header
+        messages = []
+        for line in self.lines:
+            line = COLOR_RE.sub("", line).rstrip("\r\n")
+            header = HEADER_RE.match(line)
+            messages.append(header.group("message") if header else line)
+        return messages
+
+
+class PendingCommand:
+    def __init__(self, command, begin, end, quiet=False):
+        self.command = command
+        self.quiet = quiet  # keep the output off the console, e.g. for the launcher's own probes
+        self.begin = begin
+        self.end = end
+        self.started = False
+        self.sent = False
+        self.lines = []
+        self.future = Future()
+        self.timer = None
+
+
+class CommandChannel:
+    # Correlates commands with their output. Every request goes out as
+    # <begin marker>, <command>, <end marker> in one locked write, and the
+    # server runs console commands in order, so whatever it prints between the
+    # replies to the two markers belongs to the command. The marker replies
+    # themselves are taken off the bus; the command's own output still reaches
+    # the console and every other subscriber, unless the request is quiet.
+    # Servers that don't echo unknown commands (Bukkit's "Unknown command",
+    # PocketMine) are matched by counting replies, which only works with one
+    # request in flight: there (and until the first marker tells) requests go
+    # out one at a time. A command with no output ends on a single reply, an
+    # unknown command on two in a row, so a reply that closes an empty
+    # response is held for SETTLE seconds to see whether another follows.
+    def __init__(self, instance, timeout=5.0):
+        self.instance = instance
+        self.timeout = timeout
+        self.echo = ECHOES.get(instance.server_type)
+        self.lock = threading.Lock()
+        self.pending = deque()
+        self.held = None
+        self.tentative = None  # (request, reply) that may be its end or its command's own reply
+        self.orphans = 0  # marker replies still due from expired requests (no-echo servers)
+        self.finished = []  # resolved outside the lock so callbacks may send again
+        self._seq = itertools.count(1)
+        instance.bus.add_filter(self._filter, first=True)
+
+    def _token(self):
+        return f"{MARKER_PREFIX}{next(self._seq) % 0x1000000:06x}"
+
+    def request(self, command, timeout=None, quiet=False):
+        # Returns a Future that resolves to a Response
+        pending = PendingCommand(command, self._token(), self._token(), quiet)
+        pending.timer = threading.Timer(timeout or self.timeout, self._expire, args=(pending,))
+        pending.timer.daemon = True
+        with self.lock:
+            self.pending.append(pending)
+        pending.timer.start()
+        self._send_ready()
+        return pending.future
+
+    def _next_unsent(self):
+        # The request that may go out now, if any; called with the lock held
+        if self.echo:
+            return next((item for item in self.pending if not item.sent), None)
+        if self.pending and not self.pending[0].sent and self.tentative is None:
+            return self.pending[0]
+        return None
+
+    def _send_ready(self):
+        # Writes every request that may go out, in order. Never call it on the
+        # bus reader thread: a full stdin pipe would wait on that very thread.
+        with self.instance.send_lock:
+            while True:
+                with self.lock:
+                    pending = self._next_unsent()
+                    if pending is None:
+                        return
+                    pending.sent = True
+                try:
+                    self.instance.send(pending.begin)
+                    self.instance.send(pending.command)
+                    self.instance.send(pending.end)
+                except Exception as e:
+                    with self.lock:
+                        self._discard(pending)
+                    if pending.timer:
+                        pending.timer.cancel()
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+
+    def _send_later(self):
+        # From the bus reader thread: hand the writing to a short-lived thread
+        with self.lock:
+            ready = self._next_unsent() is not None
+        if ready:
+            threading.Thread(target=self._send_ready, name="command-send", daemon=True).start()
+
+    def run(self, command, timeout=None, quiet=False):
+        # Blocking helper for scripts: the response, even an incomplete one
+        return self.request(command, timeout, quiet).result()
+
+    def reset(self):
+        # New server process: nothing in flight will ever be answered
+        with self.lock:
+            pending, self.pending = list(self.pending), deque()
+            if self.tentative is not None:
+                pending.insert(0, self.tentative[0])
+            self.held = None
+            self.tentative = None
+            self.orphans = 0
+        for item in pending:
+            self._resolve(item, complete=False)
+
+    def _discard(self, pending):
+        if pending in self.pending:
+            self.pending.remove(pending)
+
+    def _expire(self, pending):
+        with self.lock:
+            if pending not in self.pending:
+                return
+            self.pending.remove(pending)
+            if self.held is not None and self.echo is None:
+                # Nothing followed the held "Unknown command" reply, so the server doesn't echo
+                self.echo = False
+                held, self.held = self.held, None
+                self._reply(None, held)
+            if not self.echo and pending.sent:
+                self.orphans += 1 if pending.started else 2
+            finished, self.finished = self.finished, []
+        for item in finished:
+            self._resolve(item, complete=True)
+        self._resolve(pending, complete=False)
+        self._send_ready()
+
+    def _settle(self, pending):
+        # No second reply came: the command printed nothing and that was its end
+        with self.lock:
+            if self.tentative is None or self.tentative[0] is not pending:
+                return
+            self.tentative = None
+        self._resolve(pending, complete=True)
+        self._send_ready()
+
+    def _resolve(self, pending, complete):
+        if pending.timer:
+            pending.timer.cancel()
+        if not pending.future.done():
+            pending.future.set_result(Response(pending.command, pending.lines, complete))
+
+    def _reply(self, token, line=None):
+        # One marker came back (token None: an "Unknown command" line from a
+        # server that doesn't echo); called with the lock held. Returns a
+        # reply that turned out to be command output, for the caller to pass on.
+        if token is None and self.tentative is not None:
+            # Two replies in a row: the first was the command's own
+            pending, first = self.tentative
+            self.tentative = None
+            pending.lines.append(first)
+            self.finished.append(pending)
+            return None if pending.quiet else first
+        head = self.pending[0] if self.pending else None
+        if token is None:
+            if self.orphans:
+                self.orphans -= 1
+                return None
+            if head is None:
+                return None
+            if head.started and not head.lines:
+                # A silent command's end, or an unknown command's reply with the end still to come
+                self.pending.popleft()
+                head.timer.cancel()
+                self.tentative = (head, line)
+                timer = threading.Timer(SETTLE, self._settle, args=(head,))
+                timer.daemon = True
+                timer.start()
+                return None
+            token = head.end if head.started else head.begin
+        if head is None:
+            return None  # late echo of an expired request
+        if token == head.begin:
+            head.started = True
+        elif token == head.end:
+            self.pending.popleft()
+            self.finished.append(head)
+        return None
+
+    def _emit(self, line, kept):
+        head = self.pending[0] if self.pending and self.pending[0].started else None
+        if head is not None:
+            head.lines.append(line)
+        if head is None or not head.quiet:
+            kept.append(line)
+
+    def _filter(self, lines):
+        if not self.pending and self.held is None and self.tentative is None and not self.orphans:
+            return lines
+        kept = []
+        with self.lock:
+            for line in lines:
+                clean = COLOR_RE.sub("", line)
+                match = TOKEN_RE.search(clean)
+                if match:
+                    # The held "Unknown or incomplete command" line was the first half of this reply
+                    self.echo = True
+                    self.held = None
+                    self._reply(MARKER_PREFIX + match.group(1))
+                    continue
+                if self.held is not None:
+                    held, self.held = self.held, None
+                    if self.echo:
+                        self._emit(held, kept)
+                    else:
+                        self.echo = False
+                        self._reply(None, held)
+                if UNKNOWN_REPLY_RE.search(clean) and (self.pending or self.orphans or self.tentative is not None):
+                    if self.echo is False:
+                        first = self._reply(None, line)
+                        if first is not None:
+                            kept.append(first)
+                    else:
+                        self.held = line  # wait for the next line to tell marker and command apart
+                    continue
+                self._emit(line, kept)
+            finished, self.finished = self.finished, []
+        for item in finished:
+            self._resolve(item, complete=True)
+        self._send_later()
+        return kept
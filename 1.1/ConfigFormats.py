@@ -0,0 +1,689 @@
+import bisect
+import json
+import os
+import re
+import shutil
+import tempfile
+import textwrap
+
+# Format-aware documents for the files a server is actually tuned with:
+# server.properties, ops.json / whitelist.json / banned-*.json and the Bukkit
+# family of .yml files. Each keeps the original text and patches only the
+# lines (or JSON values) that were edited, so comments, key order and
+# formatting survive a save untouched.
+
+
+def atomic_write(path, text, encoding="utf-8"):
+    # Write next to the target and swap it in, so a crash never leaves half a file
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=os.path.basename(path), dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding=encoding, newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def format_path(path):
+    return ".".join(str(key) for key in path)
+
+
+def parse_path(text):
+    # "0.name" -> (0, "name"); digits address list entries
+    return tuple(int(part) if part.isdigit() else part for part in text.split("."))
+
+
+def format_value(value):
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def coerce(text, current):
+    # Entry widgets give strings; keep the type the value already had
+    if isinstance(current, bool):
+        return text.strip().lower() in ("true", "yes", "on", "1")
+    if isinstance(current, int):
+        return int(text)
+    if isinstance(current, float):
+        return float(text)
+    if isinstance(current, (list, dict)):
+        return json.loads(text)
+    return text
+
+
+class Leaf:
+    __slots__ = ("path", "value", "line", "start", "end", "editable")
+
+    def __init__(self, path, value, line=None, start=None, end=None, editable=True):
+        self.path = path
+        self.value = value
+        self.line = line
+        self.start = start
+        self.end = end
+        self.editable = editable
+
+
+class Document:
+    # Base class: the file is read on open, parsed on first use
+    def __init__(self, path):
+        self.path = path
+        self.dirty = False
+        self._leaves = None
+        self.reload()
+
+    def reload(self):
+        try:
+            with open(self.path, "r", encoding="utf-8", newline="") as f:
+                self.text = f.read()
+        except FileNotFoundError:
+            self.text = ""
+        self.newline = "\r\n" if "\r\n" in self.text else "\n"
+        self.dirty = False
+        self._leaves = None
+
+    @property
+    def leaves(self):
+        if self._leaves is None:
+            self._leaves = self.parse()
+        return self._leaves
+
+    def entries(self):
+        return [(leaf.path, leaf.value) for leaf in self.leaves.values()]
+
+    def get(self, path, default=None):
+        leaf = self.leaves.get(tuple(path))
+        return leaf.value if leaf else default
+
+    def editable(self, path):
+        leaf = self.leaves.get(tuple(path))
+        return leaf is None or leaf.editable
+
+    def parse_input(self, text, path):
+        leaf = self.leaves.get(tuple(path))
+        return coerce(text, leaf.value) if leaf else self.parse_new(text)
+
+    def parse_new(self, text):
+        return text
+
+    def rename(self, old, new, value):
+        # The new key goes in first: if it's rejected the old entry is still there
+        self.set(new, value)
+        self.delete(old)
+
+    def save(self):
+        if not self.dirty:
+            return False
+        atomic_write(self.path, self.render())
+        self.reload()
+        return True
+
+
+class PropertiesDocument(Document):
+    # Java .properties as written by the server: key=value, # comments
+    LINE_RE = re.compile(r"^([ \t\f]*)((?:\\.|[^=:\s\\])+)([ \t\f]*[=:]?[ \t\f]*)(.*?)(\r?\n)?$", re.DOTALL)
+
+    def parse(self):
+        self.lines = self.text.splitlines(keepends=True)
+        leaves = {}
+        for index, line in enumerate(self.lines):
+            stripped = line.lstrip()
+            if not stripped.strip() or stripped[0] in "#!":
+                continue
+            match = self.LINE_RE.match(line)
+            if match:
+                key = self.unescape(match.group(2))
+                start = match.start(4)
+                leaves[(key,)] = Leaf((key,), self.unescape(match.group(4)), index, start, match.end(4))
+        return leaves
+
+    @staticmethod
+    def unescape(text):
+        if "\\" not in text:
+            return text
+        return re.sub(r"\\u([0-9a-fA-F]{4})|\\(.)",
+                      lambda m: chr(int(m.group(1), 16)) if m.group(1) else
+                      {"t": "\t", "n": "\n", "r": "\r", "f": "\f"}.get(m.group(2), m.group(2)), text)
+
+    @staticmethod
+    def escape(text, key=False):
+        out = []
+        for i, ch in enumerate(text):
+            if ch == "\\" or ch in "=:#!" or (ch == " " and (key or i == 0)):
+                out.append("\\" + ch)
+            elif ch in "\t\n\r\f":
+                out.append({"\t": "\\t", "\n": "\\n", "\r": "\\r", "\f": "\\f"}[ch])
+            elif ord(ch) > 0x7E:
+                out.append(f"\\u{ord(ch):04x}")  # safe whether the server reads UTF-8 or Latin-1
+            else:
+                out.append(ch)
+        return "".join(out)
+
+    def set(self, path, value):
+        key = path[0]
+        value = str(value).lower() if isinstance(value, bool) else str(value)
+        leaf = self.leaves.get((key,))
+        if leaf is None:
+            if self.lines and not self.lines[-1].endswith("\n"):
+                self.lines[-1] += self.newline
+            self.lines.append(f"{self.escape(key, key=True)}={self.escape(value)}{self.newline}")
+            self.leaves[(key,)] = Leaf((key,), value, len(self.lines) - 1, len(self.escape(key, key=True)) + 1)
+            self.leaves[(key,)].end = len(self.lines[-1]) - len(self.newline)
+        elif leaf.value != value:
+            line = self.lines[leaf.line]
+            text = self.escape(value)
+            self.lines[leaf.line] = line[:leaf.start] + text + line[leaf.end:]
+            leaf.value, leaf.end = value, leaf.start + len(text)
+        else:
+            return
+        self.dirty = True
+
+    def delete(self, path):
+        leaf = self.leaves.pop(tuple(path), None)
+        if leaf:
+            self.lines[leaf.line] = ""
+            self.dirty = True
+
+    def render(self):
+        return "".join(self.lines) if self._leaves is not None else self.text
+
+
+def scan_json(text, decoder=json.JSONDecoder()):
+    # Parses JSON and records the text span of every scalar, so one value can
+    # be rewritten without re-serialising the file
+    spans = {}
+    ws = re.compile(r"[ \t\n\r]*")
+
+    def skip(i):
+        return ws.match(text, i).end()
+
+    def value(i, path):
+        i = skip(i)
+        ch = text[i:i + 1]
+        if ch == "{":
+            result = {}
+            i = skip(i + 1)
+            if text[i] == "}":
+                return result, i + 1
+            while True:
+                key, i = json.decoder.scanstring(text, skip(i) + 1)
+                i = skip(i)
+                if text[i] != ":":
+                    raise ValueError(f"expected ':' at {i}")
+                result[key], i = value(i + 1, path + (key,))
+                i = skip(i)
+                if text[i] == "}":
+                    return result, i + 1
+                if text[i] != ",":
+                    raise ValueError(f"expected ',' at {i}")
+                i += 1
+        if ch == "[":
+            result = []
+            i = skip(i + 1)
+            if text[i] == "]":
+                return result, i + 1
+            while True:
+                item, i = value(i, path + (len(result),))
+                result.append(item)
+                i = skip(i)
+                if text[i] == "]":
+                    return result, i + 1
+                if text[i] != ",":
+                    raise ValueError(f"expected ',' at {i}")
+                i += 1
+        item, end = decoder.raw_decode(text, i)
+        spans[path] = (i, end)
+        return item, end
+
+    if not text.strip():
+        return {}, spans
+    data, _ = value(0, ())
+    return data, spans
+
+
+class JsonDocument(Document):
+    # ops.json, whitelist.json, banned-players.json and the launcher's own configs
+    def parse(self):
+        self.data, spans = scan_json(self.text)
+        self.patches = {}
+        self.rewrite = False
+        match = re.search(r"\n([ \t]+)\S", self.text)
+        self.indent = match.group(1) if match else "  "
+        leaves = {}
+        for path, (start, end) in spans.items():
+            leaves[path] = Leaf(path, self.lookup(path), None, start, end)
+        return leaves
+
+    def lookup(self, path):
+        node = self.data
+        for key in path:
+            node = node[key]
+        return node
+
+    def parse_new(self, text):
+        try:
+            return json.loads(text)
+        except ValueError:
+            return text
+
+    def set(self, path, value):
+        path = tuple(path)
+        leaf = self.leaves.get(path)
+        if leaf is not None and not isinstance(value, (dict, list)):
+            if leaf.value == value and type(leaf.value) is type(value):
+                return
+            self.patches[leaf.start] = (leaf.end, json.dumps(value, ensure_ascii=False))
+            leaf.value = value
+            self.assign(path, value)
+        else:
+            # New keys or containers change the structure: re-serialise on save
+            self.assign(path, value, create=True)
+            self.rewrite = True
+            self.reindex()
+        self.dirty = True
+
+    def assign(self, path, value, create=False):
+        if not path:
+            self.data = value
+            return
+        node = self.data
+        for key, following in zip(path, path[1:]):
+            if isinstance(node, list) and key == len(node) and create:
+                node.append([] if isinstance(following, int) else {})
+            elif isinstance(node, dict) and key not in node and create:
+                node[key] = [] if isinstance(following, int) else {}
+            node = node[key]
+        key = path[-1]
+        if isinstance(node, list) and key == len(node):
+            node.append(value)
+        else:
+            node[key] = value
+
+    def delete(self, path):
+        path = tuple(path)
+        if path not in self.leaves and not isinstance(self.lookup(path), (dict, list)):
+            return
+        parent = self.lookup(path[:-1])
+        del parent[path[-1]]
+        self.rewrite = True
+        self.reindex()
+        self.dirty = True
+
+    def reindex(self):
+        # Paths of list entries shift after a structural change; spans are no longer used
+        leaves = {}
+
+        def walk(node, path):
+            if isinstance(node, dict) and node:
+                for key, item in node.items():
+                    walk(item, path + (key,))
+            elif isinstance(node, list) and node:
+                for index, item in enumerate(node):
+                    walk(item, path + (index,))
+            else:
+                leaves[path] = Leaf(path, node)
+
+        walk(self.data, ())
+        self._leaves = leaves
+
+    def render(self):
+        if self._leaves is None:
+            return self.text
+        if self.rewrite:
+            text = json.dumps(self.data, indent=self.indent, ensure_ascii=False)
+            return text.replace("\n", self.newline) + (self.newline if self.text.endswith(("\n", "\r\n")) else "")
+        parts, last = [], 0
+        for start in sorted(self.patches):
+            end, replacement = self.patches[start]
+            parts += [self.text[last:start], replacement]
+            last = end
+        parts.append(self.text[last:])
+        return "".join(parts)
+
+
+def split_comment(text):
+    # Splits "value  # comment" outside of quotes
+    quote = None
+    for i, ch in enumerate(text):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch == "#" and (i == 0 or text[i - 1] in " \t"):
+            return text[:i].rstrip(), i
+    return text.rstrip(), len(text.rstrip())
+
+
+YAML_KEY_RE = re.compile(r"^( *)('[^']*'|\"[^\"]*\"|[^\s#'\"\-?:][^#]*?|-[^\s#][^#]*?):(?:[ \t]+|$)")
+YAML_PLAIN_RE = re.compile(r"^[A-Za-z_./][A-Za-z0-9_./ -]*$")
+YAML_SPECIAL = {"true", "false", "yes", "no", "on", "off", "null", "~", "y", "n"}
+
+
+def parse_yaml_scalar(text):
+    if text[:1] == "'" and text[-1:] == "'":
+        return text[1:-1].replace("''", "'")
+    if text[:1] == '"' and text[-1:] == '"':
+        try:
+            return json.loads(text)
+        except ValueError:
+            return text[1:-1]
+    lowered = text.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    if lowered in ("null", "~", ""):
+        return None
+    if re.match(r"^[-+]?\d+$", text):
+        return int(text)
+    if re.match(r"^[-+]?(\d+\.\d*|\.\d+)([eE][-+]?\d+)?$", text):
+        return float(text)
+    return text
+
+
+def format_yaml_scalar(value):
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, list):
+        return "[" + ", ".join(format_yaml_scalar(item) for item in value) + "]"
+    text = str(value)
+    if YAML_PLAIN_RE.match(text) and text.lower() not in YAML_SPECIAL and text == text.strip():
+        return text
+    return "'" + text.replace("'", "''") + "'"
+
+
+class YamlDocument(Document):
+    # Block-style YAML as used by bukkit.yml, spigot.yml, paper*.yml: nested
+    # mappings, scalar values and lists. Block scalars and lists of mappings
+    # are shown but kept read-only. Not a general YAML parser.
+    def parse(self):
+        self.lines = self.text.splitlines(keepends=True)
+        self.blocks = {}  # mapping path -> (key line, end line, child indent)
+        leaves = {}
+        stack = []  # (indent, key)
+        count = len(self.lines)
+        index = 0
+        while index < count:
+            line = self.lines[index].rstrip("\r\n")
+            stripped = line.strip()
+            if not stripped or stripped.startswith("#") or stripped in ("---", "..."):
+                index += 1
+                continue
+            match = YAML_KEY_RE.match(line)
+            if not match:
+                index += 1
+                continue
+            indent = len(match.group(1))
+            while stack and stack[-1][0] >= indent:
+                stack.pop()
+            key = match.group(2).strip()
+            key = parse_yaml_scalar(key) if key[:1] in "'\"" else key
+            path = tuple(k for _, k in stack) + (str(key),)
+            for depth in range(len(path) - 1):
+                parent = self.blocks.get(path[:depth + 1])
+                if parent and parent[2] is None:
+                    self.blocks[path[:depth + 1]] = (parent[0], parent[1], indent)
+            value, _ = split_comment(line[match.end():])
+            start = match.end()
+            end = self.block_end(index, indent)
+
+            if value in ("|", ">", "|-", ">-", "|+", ">+"):
+                raw = textwrap.dedent("".join(self.lines[index + 1:end])).rstrip()
+                leaves[path] = Leaf(path, raw, index, start, start + len(value), editable=False)
+            elif value:
+                leaves[path] = Leaf(path, self.flow_value(value), index, start, start + len(value),
+                                    editable=not value.startswith("{"))
+            else:
+                items = [self.lines[i].strip() for i in range(index + 1, end)]
+                items = [item for item in items if item and not item.startswith("#")]
+                if items and all(item.startswith("- ") or item == "-" for item in items):
+                    if any(YAML_KEY_RE.match(item[2:]) for item in items):
+                        leaves[path] = Leaf(path, "".join(self.lines[index + 1:end]).rstrip(), index, start, start,
+                                            editable=False)
+                    else:
+                        values = [parse_yaml_scalar(split_comment(item[2:])[0]) for item in items]
+                        leaves[path] = Leaf(path, values, index, start, start)
+                    index = end
+                    continue
+                if not items:
+                    leaves[path] = Leaf(path, None, index, start, start)
+                self.blocks[path] = (index, end, None)
+                stack.append((indent, str(key)))
+            index += 1
+        return leaves
+
+    def block_end(self, index, indent):
+        # First line after index that is not deeper than indent (list items at the same indent belong to it)
+        end = index + 1
+        last = end
+        while end < len(self.lines):
+            line = self.lines[end].rstrip("\r\n")
+            stripped = line.lstrip()
+            if stripped and not stripped.startswith("#"):
+                depth = len(line) - len(stripped)
+                if depth < indent or (depth == indent and not stripped.startswith("- ") and stripped != "-"):
+                    break
+                last = end + 1
+            end += 1
+        return last
+
+    def flow_value(self, text):
+        if text.startswith("[") and text.endswith("]"):
+            inner = text[1:-1].strip()
+            return [parse_yaml_scalar(item.strip()) for item in inner.split(",")] if inner else []
+        return parse_yaml_scalar(text)
+
+    def parse_new(self, text):
+        return self.flow_value(text.strip())
+
+    def parse_input(self, text, path):
+        leaf = self.leaves.get(tuple(path))
+        if leaf and isinstance(leaf.value, list):
+            return self.flow_value(text.strip())
+        return super().parse_input(text, path)
+
+    def set(self, path, value):
+        path = tuple(path)
+        leaf = self.leaves.get(path)
+        if leaf is None:
+            self.insert(path, value)
+            return
+        if not leaf.editable:
+            raise ValueError(f"{format_path(path)} can't be edited here")
+        if leaf.value == value and type(leaf.value) is type(value):
+            return
+        line = self.lines[leaf.line]
+        text = format_yaml_scalar(value)
+        if isinstance(leaf.value, list) and leaf.start == leaf.end:
+            # Block list -> flow list on the key's own line
+            end = self.block_end(leaf.line, len(line) - len(line.lstrip()))
+            for i in range(leaf.line + 1, end):
+                self.lines[i] = ""
+            body = line.rstrip("\r\n")
+            self.lines[leaf.line] = body[:leaf.start].rstrip() + " " + text + line[len(body):]
+            self.dirty = True
+            self.reparse()
+            return
+        self.lines[leaf.line] = line[:leaf.start] + text + line[leaf.end:]
+        leaf.value, leaf.end = value, leaf.start + len(text)
+        self.dirty = True
+
+    def insert(self, path, value):
+        # New key: goes at the end of its parent mapping, creating parents as needed
+        depth = len(path) - 1
+        while depth > 0 and path[:depth] not in self.blocks:
+            depth -= 1
+        if depth:
+            key_line, end, child_indent = self.blocks[path[:depth]]
+            parent_line = self.lines[key_line]
+            indent = child_indent if child_indent is not None else \
+                len(parent_line) - len(parent_line.lstrip()) + 2
+        else:
+            end, indent = len(self.lines), 0
+        new_lines = []
+        for level, key in enumerate(path[depth:]):
+            prefix = " " * (indent + 2 * level) + format_yaml_scalar(str(key)) + ":"
+            if level < len(path) - depth - 1:
+                new_lines.append(prefix + self.newline)
+            else:
+                new_lines.append(prefix + " " + format_yaml_scalar(value) + self.newline)
+        if end and end <= len(self.lines) and not self.lines[end - 1].endswith("\n"):
+            self.lines[end - 1] += self.newline
+        self.lines[end:end] = new_lines
+        self.dirty = True
+        self.reparse()
+
+    def delete(self, path):
+        path = tuple(path)
+        leaf = self.leaves.get(path)
+        line_index = leaf.line if leaf else (self.blocks.get(path) or (None,))[0]
+        if line_index is None:
+            return
+        line = self.lines[line_index]
+        end = self.block_end(line_index, len(line) - len(line.lstrip()))
+        del self.lines[line_index:end]
+        self.dirty = True
+        self.reparse()
+
+    def reparse(self):
+        self.text = "".join(self.lines)
+        self._leaves = self.parse()
+
+    def render(self):
+        return "".join(self.lines) if self._leaves is not None else self.text
+
+
+WORD_RE = re.compile(r"\w+")
+
+
+class ConfigIndex:
+    # The editor's view of a document. A section's child list is worked out
+    # the first time that section is shown, and the filter looks words up in
+    # a token index (word -> paths whose "path = value" text has that word)
+    # that is built on the first search and kept current by add/update/remove
+    def __init__(self, document):
+        self.document = document
+        self.children = {}  # section path -> ordered child paths (dict used as an ordered set), filled on demand
+        self.tokens = None  # word -> paths, built on the first search
+        self.words = {}  # path -> its words, so an edit can take them back out
+        self.vocabulary = None  # sorted words for prefix lookups, rebuilt after the word set changes
+
+    def count(self):
+        return len(self.document.leaves)
+
+    def value(self, path, default=""):
+        return self.document.get(path, default)
+
+    def has_value(self, path):
+        return tuple(path) in self.document.leaves
+
+    def is_container(self, path):
+        # Empty sections are leaves of their own, so anything else that exists is a section
+        return path not in self.document.leaves
+
+    def children_of(self, path):
+        children = self.children.get(path)
+        if children is None:
+            children = self.children[path] = {}
+            size = len(path)
+            for leaf in self.document.leaves:
+                if len(leaf) > size and leaf[:size] == path:
+                    children[leaf[:size + 1]] = None
+        return children
+
+    def add(self, path, value):
+        for depth in range(len(path)):
+            if path[:depth] in self.children:
+                self.children[path[:depth]][path[:depth + 1]] = None
+        self.update(path, value)
+
+    def update(self, path, value):
+        if self.tokens is not None:
+            self._unindex(path)
+            self._index(path, value)
+
+    def remove(self, path):
+        size = len(path)
+        for section in [section for section in self.children if section[:size] == path]:
+            del self.children[section]
+        self.children.get(path[:-1], {}).pop(path, None)
+        if self.tokens is not None:
+            for leaf in [leaf for leaf in self.words if leaf[:size] == path]:
+                self._unindex(leaf)
+
+    def reload_branch(self, path):
+        # List entries get renumbered when one is removed; re-read just that section
+        size = len(path)
+        for section in [section for section in self.children if section[:size] == path]:
+            del self.children[section]
+        if self.tokens is not None:
+            for leaf in [leaf for leaf in self.words if leaf[:size] == path]:
+                self._unindex(leaf)
+            for leaf, value in self.document.entries():
+                if leaf[:size] == path:
+                    self._index(leaf, value)
+
+    def _index(self, path, value):
+        words = set(WORD_RE.findall(f"{format_path(path)} = {format_value(value)}".lower()))
+        self.words[path] = words
+        for word in words:
+            if word not in self.tokens:
+                self.tokens[word] = set()
+                self.vocabulary = None
+            self.tokens[word].add(path)
+
+    def _unindex(self, path):
+        for word in self.words.pop(path, ()):
+            paths = self.tokens[word]
+            paths.discard(path)
+            if not paths:
+                del self.tokens[word]
+                self.vocabulary = None
+
+    def search(self, query, limit=1000):
+        # Every word typed has to start some word of the entry's "path = value"
+        terms = WORD_RE.findall(query.lower())
+        if not terms:
+            return []
+        if self.tokens is None:
+            self.tokens = {}
+            for path, value in self.document.entries():
+                self._index(path, value)
+        if self.vocabulary is None:
+            self.vocabulary = sorted(self.tokens)
+        matches = None
+        for term in terms:
+            found = set()
+            position = bisect.bisect_left(self.vocabulary, term)
+            while position < len(self.vocabulary) and self.vocabulary[position].startswith(term):
+                found |= self.tokens[self.vocabulary[position]]
+                position += 1
+            matches = found if matches is None else matches & found
+            if not matches:
+                return []
+        return sorted(matches, key=format_path)[:limit]
+
+
+FORMATS = {
+    ".properties": PropertiesDocument,
+    ".json": JsonDocument,
+    ".yml": YamlDocument,
+    ".yaml": YamlDocument,
+}
+
+
+def open_document(path):
+    document_class = FORMATS.get(os.path.splitext(path)[1].lower())
+    if document_class is None:
+        raise ValueError(f"Don't know how to edit {os.path.basename(path)}")
+    return document_class(path)
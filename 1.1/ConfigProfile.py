@@ -2,15 +2,26 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import json
 import os
+from ConfigFormats import open_document, format_path, parse_path, format_value, ConfigIndex
 
-class ConfigEditor(tk.Tk):
-    def __init__(self, config_path="config.json"):
-        super().__init__()
+FILTER_LIMIT = 1000  # rows shown for a filter; the status line says when there are more
+PLACEHOLDER = "…"
+
+class ConfigEditor(tk.Toplevel):
+    # A window of whichever Tk app opens it; on_save(path) is called after every save
+    def __init__(self, master=None, config_path="config.json", on_save=None):
+        super().__init__(master)
         self.title("Config Editor - Minecraft Profile")
         self.geometry("600x500")
         self.configure(bg="#2d3436")
         self.config_path = config_path
-        self.config_data = {}
+        self.on_save = on_save
+        self.document = None
+        self.index = None
+        self.filter_job = None
+        self.rows = {}  # path -> row id, only for rows that exist in the tree
+        self.paths = {}  # row id -> path
+        self.loaded = set()  # sections whose children are in the tree
 
         self.style = ttk.Style(self)
         self.style.theme_use("clam")
@@ -21,11 +32,24 @@ class ConfigEditor(tk.Tk):
         self.load_config()
 
     def create_widgets(self):
-        # Treeview
-        self.tree = ttk.Treeview(self, columns=("Key", "Value"), show="headings", selectmode="browse")
-        self.tree.heading("Key", text="Key")
+        # Filter
+        filter_frame = tk.Frame(self, bg="#2d3436")
+        filter_frame.pack(fill="x", padx=10, pady=(10, 0))
+        tk.Label(filter_frame, text="🔍 Filter:", bg="#2d3436", fg="white").pack(side="left")
+        self.filter_text = tk.StringVar()
+        self.filter_text.trace_add("write", self.schedule_filter)
+        tk.Entry(filter_frame, textvariable=self.filter_text).pack(side="left", fill="x", expand=True, padx=5)
+
+        # Treeview: sections are filled in when they are first opened
+        self.tree = ttk.Treeview(self, columns=("Value",), show="tree headings", selectmode="browse")
+        self.tree.heading("#0", text="Key")
         self.tree.heading("Value", text="Value")
         self.tree.pack(fill="both", expand=True, pady=10, padx=10)
+        self.tree.bind("<<TreeviewOpen>>", self.on_open)
+        self.tree.bind("<Double-1>", lambda event: self.edit_entry())
+
+        self.status_label = tk.Label(self, text="", bg="#2d3436", fg="#b2bec3", anchor="w")
+        self.status_label.pack(fill="x", padx=10)
 
         # Buttons
         btn_frame = tk.Frame(self, bg="#2d3436")
@@ -38,34 +62,114 @@ class ConfigEditor(tk.Tk):
         ttk.Button(btn_frame, text="📂 Open File", command=self.browse_file).pack(side="left", padx=5)
 
     def load_config(self):
-        if os.path.isfile(self.config_path):
-            with open(self.config_path, "r") as f:
-                self.config_data = json.load(f)
-        else:
-            self.config_data = {}
-
+        # server.properties, *.json and *.yml each get a backend that keeps comments and order
+        try:
+            self.document = open_document(self.config_path)
+            self.index = ConfigIndex(self.document)
+        except (ValueError, json.JSONDecodeError) as e:
+            messagebox.showerror("Error", f"Failed to open config:\n{e}", parent=self)
+            self.document = self.index = None
+        self.title(f"Config Editor - {os.path.basename(self.config_path)}")
         self.refresh_tree()
 
     def save_config(self):
+        # Only the edited lines are written; the tree already shows what was saved
         try:
-            with open(self.config_path, "w") as f:
-                json.dump(self.config_data, f, indent=4)
-            self.load_config()  # 🔁 Auto-reload after save
-            messagebox.showinfo("Saved", "Configuration saved and reloaded.")
+            if self.document and self.document.save():
+                if self.on_save:
+                    self.on_save(self.config_path)
+                messagebox.showinfo("Saved", "Configuration saved.", parent=self)
+            else:
+                messagebox.showinfo("Saved", "Nothing changed.", parent=self)
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to save config:\n{e}")
+            messagebox.showerror("Error", f"Failed to save config:\n{e}", parent=self)
 
 
     def refresh_tree(self):
+        # Full rebuild: only when a file is opened or the filter changes
+        self.filter_job = None
         self.tree.delete(*self.tree.get_children())
+        self.rows, self.paths, self.loaded = {}, {}, set()
+        if self.index is None:
+            self.status_label.config(text="")
+            return
 
-        for section, values in self.config_data.items():
-            if isinstance(values, dict):
-                parent = self.tree.insert("", "end", text=section, values=(section, ""), open=True)
-                for key, val in values.items():
-                    self.tree.insert(parent, "end", values=(f"{section}.{key}", val))
-            else:
-                self.tree.insert("", "end", values=(section, values))  # Flat key
+        query = self.filter_text.get().strip()
+        if query:
+            matches = self.index.search(query, FILTER_LIMIT + 1)
+            for path in matches[:FILTER_LIMIT]:
+                self.insert_row("", path, flat=True)
+            more = "+" if len(matches) > FILTER_LIMIT else ""
+            self.status_label.config(text=f"{min(len(matches), FILTER_LIMIT)}{more} matches")
+        else:
+            self.populate(())
+            self.status_label.config(text=f"{self.index.count()} values")
+
+    def schedule_filter(self, *args):
+        if self.filter_job:
+            self.after_cancel(self.filter_job)
+        self.filter_job = self.after(200, self.refresh_tree)
+
+    def insert_row(self, parent_iid, path, flat=False):
+        container = self.index.is_container(path) and not flat
+        text = format_path(path) if flat else str(path[-1])
+        value = "" if container else format_value(self.index.value(path))
+        iid = self.tree.insert(parent_iid, "end", text=text, values=(value,))
+        self.rows[path] = iid
+        self.paths[iid] = path
+        if container:
+            self.tree.insert(iid, "end", text=PLACEHOLDER)  # gives the row its expand arrow
+        return iid
+
+    def populate(self, path):
+        if path in self.loaded:
+            return
+        self.loaded.add(path)
+        parent_iid = self.rows.get(path, "")
+        if parent_iid:
+            self.tree.delete(*self.tree.get_children(parent_iid))
+        for child in self.index.children_of(path):
+            self.insert_row(parent_iid, child)
+
+    def on_open(self, event=None):
+        path = self.paths.get(self.tree.focus())
+        if path is not None:
+            self.populate(path)
+
+    def show_path(self, path):
+        # Rows for a new value, as far down as its sections are already open
+        if self.filter_text.get().strip():
+            self.refresh_tree()
+            return
+        for depth in range(1, len(path) + 1):
+            node = path[:depth]
+            if node[:-1] and node[:-1] not in self.loaded:
+                return
+            if node not in self.rows:
+                self.insert_row(self.rows.get(node[:-1], ""), node)
+
+    def forget_rows(self, path):
+        iid = self.rows.get(path)
+        if iid and self.tree.exists(iid):
+            self.tree.delete(iid)
+        size = len(path)
+        for row in [row for row in self.rows if row[:size] == path]:
+            del self.paths[self.rows.pop(row)]
+            self.loaded.discard(row)
+
+    def refresh_branch(self, path):
+        # A list lost an entry and the ones after it were renumbered
+        self.index.reload_branch(path)
+        if not path or self.filter_text.get().strip():
+            self.refresh_tree()
+            return
+        if path in self.loaded:
+            size = len(path)
+            for row in [row for row in self.rows if len(row) > size and row[:size] == path]:
+                del self.paths[self.rows.pop(row)]
+                self.loaded.discard(row)
+            self.loaded.discard(path)
+            self.populate(path)  # replaces the old child rows
 
 
     def add_entry(self):
@@ -73,49 +177,68 @@ class ConfigEditor(tk.Tk):
 
     def edit_entry(self):
         selected = self.tree.selection()
-        if not selected:
-            messagebox.showwarning("No selection", "Please select an item to edit.")
+        if not selected or selected[0] not in self.paths:
+            messagebox.showwarning("No selection", "Please select an item to edit.", parent=self)
             return
 
-        key, value = self.tree.item(selected[0], "values")
-        if "." in key:
-            section, subkey = key.split(".", 1)
-        else:
-            section, subkey = None, key
+        path = self.paths[selected[0]]
+        if self.index.is_container(path):
+            messagebox.showwarning("Section", "Select a value inside the section to edit it.", parent=self)
+            return
+        if not self.document.editable(path):
+            messagebox.showwarning("Read-only", "This value spans several lines and can't be edited here.",
+                                   parent=self)
+            return
 
-        self.open_editor("Edit Entry", key=subkey, value=value, section=section)
+        self.open_editor("Edit Entry", key=format_path(path), value=format_value(self.index.value(path)))
 
     def delete_entry(self):
         selected = self.tree.selection()
-        if not selected:
-            messagebox.showwarning("No selection", "Please select an item to delete.")
+        if not selected or selected[0] not in self.paths:
+            messagebox.showwarning("No selection", "Please select an item to delete.", parent=self)
             return
-        key, _ = self.tree.item(selected[0], "values")
-        if "." in key:
-            section, subkey = key.split(".", 1)
-            if section in self.config_data and subkey in self.config_data[section]:
-                del self.config_data[section][subkey]
+        path = self.paths[selected[0]]
+        # Deleting a section deletes everything under it
+        self.document.delete(path)
+        if isinstance(path[-1], int):
+            self.refresh_branch(path[:-1])
         else:
-            if key in self.config_data:
-                del self.config_data[key]
-
-        self.refresh_tree()
+            self.index.remove(path)
+            self.forget_rows(path)
 
 
-    def open_editor(self, title, key="", value="", section=None):
+    def open_editor(self, title, key="", value=""):
         def save_entry():
-            new_key = key_entry.get()
+            new_key = key_entry.get().strip()
             new_value = value_entry.get()
             if not new_key:
-                messagebox.showerror("Invalid", "Key cannot be empty.")
+                messagebox.showerror("Invalid", "Key cannot be empty.", parent=editor)
                 return
 
-            if section:
-                self.config_data.setdefault(section, {})[new_key] = new_value
-            else:
-                self.config_data[new_key] = new_value
+            path = parse_path(new_key)
+            existed = self.index.has_value(path)
+            try:
+                value = self.document.parse_input(new_value, path)
+                if key and new_key != key:
+                    self.document.rename(parse_path(key), path, value)
+                else:
+                    self.document.set(path, value)
+            except (ValueError, KeyError, IndexError, TypeError) as e:
+                messagebox.showerror("Invalid", str(e), parent=editor)
+                return
+            if key and new_key != key:
+                self.index.remove(parse_path(key))
+                self.forget_rows(parse_path(key))
 
-            self.refresh_tree()
+            # Only the affected row changes
+            value = self.document.get(path, value)
+            if existed:
+                self.index.update(path, value)
+                if path in self.rows:
+                    self.tree.item(self.rows[path], values=(format_value(value),))
+            else:
+                self.index.add(path, value)
+                self.show_path(path)
             editor.destroy()
 
         editor = tk.Toplevel(self)
@@ -137,10 +260,15 @@ class ConfigEditor(tk.Tk):
 
 
     def browse_file(self):
-        path = filedialog.askopenfilename(filetypes=[("JSON Files", "*.json")])
+        path = filedialog.askopenfilename(parent=self, filetypes=[("Server configs", "*.properties *.json *.yml *.yaml"),
+                                                                  ("All Files", "*.*")])
         if path:
             self.config_path = path
             self.load_config()
 
 if __name__ == "__main__":
-    ConfigEditor().mainloop()
+    root = tk.Tk()
+    root.withdraw()
+    editor = ConfigEditor(root)
+    editor.protocol("WM_DELETE_WINDOW", root.destroy)
+    root.mainloop()
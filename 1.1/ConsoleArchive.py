@@ -0,0 +1,267 @@
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from OutputBus import Subscription
+
+TOKEN_RE = re.compile(r"\w{2,}")
+
+
+def tokenize(text):
+    return set(TOKEN_RE.findall(text.lower()))
+
+
+def query_terms(needle):
+    # (token, match) for every token of the query. Only a token with
+    # non-word characters on both sides is a whole word; one at the start of
+    # the query may be the end of a longer word and one at the end its
+    # beginning ("Stev" finds "Steve"), so those are matched against the
+    # segment's vocabulary instead of looked up.
+    terms = []
+    for found in TOKEN_RE.finditer(needle):
+        token, open_start, open_end = found.group(), found.start() == 0, found.end() == len(needle)
+        if open_start and open_end:
+            terms.append((token, lambda word, token=token: token in word))
+        elif open_start:
+            terms.append((token, lambda word, token=token: word.endswith(token)))
+        elif open_end:
+            terms.append((token, lambda word, token=token: word.startswith(token)))
+        else:
+            terms.append((token, None))
+    return terms
+
+
+class Segment:
+    def __init__(self, directory, name):
+        self.directory = directory
+        self.name = name
+        self.index = None  # token -> [line numbers], loaded lazily for sealed segments
+
+    @property
+    def log_path(self):
+        return os.path.join(self.directory, self.name + ".log")
+
+    @property
+    def sealed_path(self):
+        return os.path.join(self.directory, self.name + ".log.gz")
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, self.name + ".idx.json")
+
+    def load_index(self):
+        if self.index is None:
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self.index = json.load(f)
+            except OSError:
+                return {}  # a leftover segment that hasn't been sealed yet
+            except ValueError:
+                self.index = {}
+        return self.index
+
+    def read_lines(self, wanted):
+        wanted = sorted(wanted)
+        if not wanted:
+            return []
+        path = self.sealed_path if os.path.exists(self.sealed_path) else self.log_path
+        opener = gzip.open if path.endswith(".gz") else open
+        found = []
+        pos = 0
+        # Lines end at \n only, the same way they were counted when indexing;
+        # a stray \r inside a line must not shift the numbers
+        with opener(path, "rt", encoding="utf-8", errors="replace", newline="\n") as f:
+            for number, line in enumerate(f):
+                if number == wanted[pos]:
+                    found.append((number, line.rstrip("\r\n")))
+                    pos += 1
+                    if pos == len(wanted):
+                        break
+        return found
+
+
+class ConsoleArchive:
+    # Console lines come in through a bus subscription (or write()) and are
+    # written by a background thread into rotating segment files. A sealed
+    # segment is gzipped and gets a token index next to it, so search() only
+    # opens segments that can contain a hit.
+    def __init__(self, directory, source=None, segment_lines=200000, segment_bytes=32 * 1024 * 1024,
+                 max_segments=500):
+        self.directory = directory
+        self.segment_lines = segment_lines
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.source = source or Subscription("archive", maxlen=None)
+        self.lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self.segments = self._scan_segments()
+        self.active = None
+        self.active_file = None
+        self.active_lines = 0
+        self.active_bytes = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _scan_segments(self):
+        names = set()
+        for entry in os.listdir(self.directory):
+            if entry.endswith(".log.gz"):
+                names.add(entry[:-len(".log.gz")])
+            elif entry.endswith(".log"):
+                names.add(entry[:-len(".log")])
+        return [Segment(self.directory, name) for name in sorted(names)]
+
+    def _seal_leftovers(self):
+        # A plain .log left over from a previous run was never sealed. Done on
+        # the writer thread: gzipping a big segment must not hold up whoever
+        # created the archive
+        for segment in list(self.segments):
+            if not os.path.exists(segment.sealed_path):
+                self._seal(segment)
+
+    def write(self, line):
+        self.source.offer([line])
+
+    def close(self):
+        self.source.close()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        self._seal_leftovers()
+        while True:
+            batch = self.source.get(limit=5000)
+            if batch is None:
+                break
+            if batch:
+                self._append(batch)
+        self._close_active()
+
+    def _open_active(self):
+        name = time.strftime("console-%Y%m%d-%H%M%S")
+        if self.segments and self.segments[-1].name.startswith(name):
+            name = f"{name}-{len(self.segments)}"
+        segment = Segment(self.directory, name)
+        segment.index = {}
+        with self.lock:
+            self.segments.append(segment)
+            self.active = segment
+        self.active_file = open(segment.log_path, "a", encoding="utf-8", newline="\n")
+        self.active_lines = 0
+        self.active_bytes = 0
+
+    def _append(self, batch):
+        if self.active is None:
+            self._open_active()
+        with self.lock:
+            index = self.active.index
+            for line in batch:
+                if not line.endswith("\n"):
+                    line += "\n"
+                self.active_file.write(line)
+                for token in tokenize(line):
+                    index.setdefault(token, []).append(self.active_lines)
+                self.active_lines += 1
+                self.active_bytes += len(line)
+            self.active_file.flush()
+        if self.active_lines >= self.segment_lines or self.active_bytes >= self.segment_bytes:
+            self._close_active()
+
+    def _close_active(self):
+        if self.active is None:
+            return
+        self.active_file.close()
+        with self.lock:
+            segment = self.active
+            self.active = None
+            self._write_index(segment)
+        self._seal(segment)
+        segment.index = None  # reloaded from disk on the next search
+        self._prune()
+
+    def _write_index(self, segment):
+        tmp = segment.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(segment.index, f, separators=(",", ":"))
+        os.replace(tmp, segment.index_path)
+
+    def _seal(self, segment):
+        if not os.path.exists(segment.log_path):
+            return
+        if not os.path.exists(segment.index_path):
+            index = {}
+            with open(segment.log_path, "r", encoding="utf-8", errors="replace", newline="\n") as f:
+                for number, line in enumerate(f):
+                    for token in tokenize(line):
+                        index.setdefault(token, []).append(number)
+            segment.index = index
+            self._write_index(segment)
+        tmp = segment.sealed_path + ".tmp"
+        with open(segment.log_path, "rb") as src, gzip.open(tmp, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp, segment.sealed_path)
+        os.remove(segment.log_path)
+
+    def _prune(self):
+        with self.lock:
+            while self.max_segments and len(self.segments) > self.max_segments:
+                segment = self.segments.pop(0)
+                for path in (segment.sealed_path, segment.index_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+
+    def search(self, query, limit=200):
+        needle = query.lower().strip()
+        if not needle:
+            return []
+        terms = query_terms(needle)
+        with self.lock:
+            segments = list(self.segments)
+            active = self.active
+            active_candidates = self._candidates(active, terms) if active and terms else None
+
+        results = []
+        for segment in reversed(segments):
+            try:
+                if terms:
+                    candidates = active_candidates if segment is active else self._candidates(segment, terms)
+                    if not candidates:
+                        continue
+                    lines = segment.read_lines(candidates)
+                else:
+                    # Nothing indexable in the query (e.g. "<"), so scan the segment
+                    lines = self._scan(segment, needle)
+            except OSError:
+                continue  # sealed or pruned while we were reading
+            hits = [(segment.name, number, line) for number, line in lines if needle in line.lower()]
+            results[:0] = hits
+            if len(results) >= limit:
+                break
+        return results[-limit:]
+
+    def _candidates(self, segment, terms):
+        index = segment.load_index()
+        postings = None
+        for token, match in terms:
+            if match is None:
+                lines = set(index.get(token, ()))
+            else:
+                lines = set()
+                for word in filter(match, index):
+                    lines.update(index[word])
+            if not lines:
+                return set()
+            postings = lines if postings is None else postings & lines
+            if not postings:
+                return postings
+        return postings
+
+    def _scan(self, segment, needle):
+        path = segment.sealed_path if os.path.exists(segment.sealed_path) else segment.log_path
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8", errors="replace", newline="\n") as f:
+            return [(number, line.rstrip("\r\n")) for number, line in enumerate(f) if needle in line.lower()]
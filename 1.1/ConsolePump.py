@@ -0,0 +1,163 @@
+import queue
+import time
+from collections import deque
+
+
+class ConsolePump:
+    # Worker threads only ever put() into the queue; the Tk main loop drains it
+    # every interval_ms and writes the whole batch with a single insert.
+    # call() queues a function the same way, for threads (like the tray's)
+    # that must not touch Tk themselves.
+    def __init__(self, text_widget, interval_ms=50, max_lines_per_tick=1000,
+                 max_lines=5000, max_bytes=None, trim_chunk=500):
+        self.text = text_widget
+        self.interval_ms = interval_ms
+        self.max_lines_per_tick = max_lines_per_tick
+        self.queue = queue.SimpleQueue()
+        self.subscriptions = []
+        self._after_id = None
+
+        # Scrollback: sizes of the lines currently in the widget, oldest first.
+        # Trimming waits until we are trim_chunk lines (or a tenth of max_bytes)
+        # over the limit so the widget is cut in one delete, not line by line.
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.trim_chunk = trim_chunk
+        self._line_sizes = deque()
+        self._partial_size = 0
+        self._buffer_bytes = 0
+        self.lines_trimmed = 0
+
+        # Stats so the cost of UI work per tick can be checked
+        self.ticks = 0
+        self.lines_drained = 0
+        self.last_tick_ms = 0.0
+        self.max_tick_ms = 0.0
+
+    def put(self, message):
+        self.queue.put(message)
+
+    def call(self, func):
+        # func() runs on the Tk thread at the next tick, after the lines queued before it
+        self.queue.put(func)
+
+    def attach(self, subscription):
+        # Also drain a bus subscription (server output) on every tick
+        self.subscriptions.append(subscription)
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.text.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.text.after_cancel(self._after_id)
+            self._after_id = None
+
+    def backlog(self):
+        return self.queue.qsize() + sum(sub.pending() for sub in self.subscriptions)
+
+    def stats(self):
+        return {
+            "ticks": self.ticks,
+            "lines_drained": self.lines_drained,
+            "backlog": self.backlog(),
+            "scrollback_lines": len(self._line_sizes),
+            "scrollback_bytes": self._buffer_bytes,
+            "lines_trimmed": self.lines_trimmed,
+            "last_tick_ms": round(self.last_tick_ms, 2),
+            "max_tick_ms": round(self.max_tick_ms, 2),
+        }
+
+    def _drain(self):
+        batch = []
+        calls = []
+        try:
+            for _ in range(self.max_lines_per_tick):
+                item = self.queue.get_nowait()
+                if callable(item):
+                    calls.append(item)
+                else:
+                    batch.append(item)
+        except queue.Empty:
+            pass
+        for sub in self.subscriptions:
+            room = self.max_lines_per_tick - len(batch)
+            if room <= 0:
+                break
+            lines, dropped = sub.drain(room)
+            if dropped:
+                batch.append(f"[... {dropped} lines skipped, console fell behind ...]\n")
+            batch.extend(lines)
+        return batch, calls
+
+    def set_scrollback(self, max_lines=None, max_bytes=None):
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+
+    def clear(self):
+        self.text.config(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.config(state="disabled")
+        self._line_sizes.clear()
+        self._partial_size = 0
+        self._buffer_bytes = 0
+
+    def _track(self, chunk):
+        lines = chunk.split("\n")
+        for line in lines[:-1]:
+            size = self._partial_size + len(line) + 1
+            self._line_sizes.append(size)
+            self._buffer_bytes += size
+            self._partial_size = 0
+        self._partial_size += len(lines[-1])
+
+    def _excess_lines(self):
+        excess = 0
+        if self.max_lines and len(self._line_sizes) > self.max_lines + self.trim_chunk:
+            excess = len(self._line_sizes) - self.max_lines
+        if self.max_bytes and self._buffer_bytes > self.max_bytes + self.max_bytes // 10:
+            over = self._buffer_bytes - self.max_bytes
+            count = 0
+            for size in self._line_sizes:
+                if over <= 0:
+                    break
+                over -= size
+                count += 1
+            excess = max(excess, count)
+        return excess
+
+    def _trim(self):
+        excess = self._excess_lines()
+        if not excess:
+            return
+        for _ in range(excess):
+            self._buffer_bytes -= self._line_sizes.popleft()
+        self.text.delete("1.0", f"{excess + 1}.0")
+        self.lines_trimmed += excess
+
+    def _write(self, batch):
+        chunk = "".join(batch)
+        self._track(chunk)
+        self.text.config(state="normal")
+        self.text.insert("end", chunk)
+        self._trim()
+        self.text.see("end")
+        self.text.config(state="disabled")
+
+    def _tick(self):
+        started = time.perf_counter()
+        batch, calls = self._drain()
+        if batch:
+            self._write(batch)
+            self.lines_drained += len(batch)
+        self.ticks += 1
+        self.last_tick_ms = (time.perf_counter() - started) * 1000
+        self.max_tick_ms = max(self.max_tick_ms, self.last_tick_ms)
+
+        # Still behind: come back right after pending events instead of waiting a full interval
+        delay = 1 if self.backlog() else self.interval_ms
+        self._after_id = self.text.after(delay, self._tick)
+        # Last, as a call may destroy the window
+        for call in calls:
+            call()
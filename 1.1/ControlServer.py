@@ -0,0 +1,425 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import struct
+import threading
+from urllib.parse import urlsplit, parse_qs
+
+from OutputBus import DROP_OLDEST
+from ServerInstance import InstanceManager
+from JvmProfiles import load_profiles
+from Rcon import RconError
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_BODY = 64 * 1024
+MAX_FRAME = 1024 * 1024
+STATUS_TEXT = {200: "OK", 202: "Accepted", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+               404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 500: "Internal Server Error"}
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class WebSocket:
+    # Just enough RFC 6455 for a console stream: text frames, ping/pong, close
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+        self.lock = asyncio.Lock()
+
+    async def send(self, data):
+        await self._send(0x1, json.dumps(data).encode("utf-8"))
+
+    async def _send(self, opcode, payload):
+        header = bytes([0x80 | opcode])
+        if len(payload) < 126:
+            header += bytes([len(payload)])
+        elif len(payload) < 65536:
+            header += bytes([126]) + struct.pack("!H", len(payload))
+        else:
+            header += bytes([127]) + struct.pack("!Q", len(payload))
+        async with self.lock:
+            self.writer.write(header + payload)
+            # Waits while the client's socket buffer is full: that is the backpressure
+            await self.writer.drain()
+
+    async def _frame(self):
+        first, second = await self.reader.readexactly(2)
+        opcode, length = first & 0x0F, second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await self.reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await self.reader.readexactly(8))[0]
+        if length > MAX_FRAME:
+            raise ValueError("frame too large")
+        mask = await self.reader.readexactly(4) if second & 0x80 else None
+        payload = await self.reader.readexactly(length)
+        if mask:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return bool(first & 0x80), opcode, payload
+
+    async def receive(self):
+        # Next text message, or None once the client has gone
+        message = b""
+        while True:
+            try:
+                fin, opcode, payload = await self._frame()
+            except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+                self.closed = True
+                return None
+            if opcode == 0x8:
+                self.closed = True
+                try:
+                    await self._send(0x8, b"")
+                except ConnectionError:
+                    pass
+                return None
+            if opcode == 0x9:
+                await self._send(0xA, payload[:125])
+                continue
+            if opcode in (0x0, 0x1, 0x2):
+                message += payload
+                if fin:
+                    return message.decode("utf-8", errors="replace")
+
+
+class ControlServer:
+    # Local HTTP + WebSocket API for running the instances without the GUI.
+    #   GET  /instances                      list with status
+    #   GET  /instances/<name>               one instance
+    #   GET  /instances/<name>/events        recent player/log events
+    #   POST /instances/<name>/start|stop|restart
+    #   POST /instances/<name>/command       {"command": "list", "timeout": 5}
+    #   POST /instances/<name>/backup        snapshot the world in the background
+    #   POST /instances/<name>/pregen        {"action": "start", "radius": 5000, "center": [0, 0]},
+    #                                        {"action": "resume"} or {"action": "stop"}
+    #   WS   /instances/<name>/console       console lines out, commands in
+    # Every WebSocket client gets its own bus subscription, so a slow client
+    # only loses its own oldest lines and never holds up the server or others.
+    def __init__(self, manager, host="127.0.0.1", port=8765, unix_path=None, token=None, client_buffer=5000):
+        if not unix_path and host not in LOCAL_HOSTS and not token:
+            # Start, stop and console access for the whole network, unauthenticated
+            raise ValueError(f"listening on {host} needs a token")
+        self.manager = manager
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.token = token
+        self.client_buffer = client_buffer
+        self.clients = 0
+        self.loop = None
+        self.server = None
+        self.thread = None
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        if self.unix_path:
+            if os.path.exists(self.unix_path):
+                os.unlink(self.unix_path)
+            self.server = await asyncio.start_unix_server(self.handle, path=self.unix_path)
+            os.chmod(self.unix_path, 0o600)
+        else:
+            self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        async with self.server:
+            try:
+                await self.server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+    def address(self):
+        return self.unix_path or f"http://{self.host}:{self.port}"
+
+    def start(self):
+        # For the GUI: the API runs on its own thread and event loop
+        self.thread = threading.Thread(target=asyncio.run, args=(self.serve(),), name="control-api", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.loop and self.server:
+            self.loop.call_soon_threadsafe(self.server.close)
+
+    async def handle(self, reader, writer):
+        try:
+            method, path, query, headers, body = await self.read_request(reader)
+            self.check_access(headers, query)
+            if headers.get("upgrade", "").lower() == "websocket":
+                await self.websocket(reader, writer, path, headers)
+                return
+            status, data = await self.route(method, path, body)
+        except HttpError as e:
+            status, data = e.status, {"error": str(e)}
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        except Exception as e:
+            status, data = 500, {"error": str(e)}
+        await self.respond(writer, status, data)
+
+    async def read_request(self, reader):
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HttpError(400, "bad request line")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            raise HttpError(400, "bad Content-Length")
+        if length < 0:
+            raise HttpError(400, "bad Content-Length")
+        if length > MAX_BODY:
+            raise HttpError(400, "body too large")
+        body = await reader.readexactly(length) if length else b""
+        url = urlsplit(target)
+        return method.upper(), url.path.rstrip("/") or "/", parse_qs(url.query), headers, body
+
+    def check_access(self, headers, query):
+        # Browsers send Origin; don't let any web page drive the servers on this box
+        origin = headers.get("origin")
+        if origin and urlsplit(origin).hostname not in LOCAL_HOSTS:
+            raise HttpError(403, "cross-origin requests are not allowed")
+        if self.token:
+            supplied = headers.get("authorization", "").removeprefix("Bearer ").strip() or \
+                       query.get("token", [""])[0]
+            if not hmac.compare_digest(supplied.encode("utf-8"), self.token.encode("utf-8")):
+                raise HttpError(401, "missing or wrong token")
+
+    async def respond(self, writer, status, data):
+        payload = json.dumps(data).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n"
+                f"Connection: close\r\n\r\n")
+        try:
+            writer.write(head.encode("latin-1") + payload)
+            await writer.drain()
+            writer.close()
+        except ConnectionError:
+            pass
+
+    def instance(self, name):
+        instance = self.manager.get(name)
+        if instance is None:
+            raise HttpError(404, f"no instance called '{name}'")
+        return instance
+
+    def describe(self, instance):
+        info = instance.to_dict()
+        if info.get("rcon"):
+            # to_dict() is what gets saved; the password must never leave over the API
+            info["rcon"] = {key: value for key, value in info["rcon"].items() if key != "password"}
+        info.update({
+            "running": instance.is_running(),
+            "active": instance.is_active(),
+            "stop_stage": instance.stop_stage,
+            "pid": instance.process.pid if instance.is_running() else None,
+            "players": instance.events.online(),
+            "tps": instance.tick_monitor.tps,
+            "mspt": instance.tick_monitor.mspt,
+            "process": instance.sampler.latest,
+            "backup_running": instance.backups.is_running(),
+            "last_backup": instance.backups.last,
+            "pregen": instance.pregen.job,
+            "pregen_status": instance.pregen.status(),
+        })
+        return info
+
+    async def route(self, method, path, body):
+        parts = [part for part in path.split("/") if part]
+        if parts == ["instances"] and method == "GET":
+            return 200, [self.describe(instance) for instance in list(self.manager.instances.values())]
+        if len(parts) < 2 or parts[0] != "instances":
+            raise HttpError(404, "not found")
+        instance = self.instance(parts[1])
+        action = parts[2] if len(parts) > 2 else None
+
+        if method == "GET" and action is None:
+            return 200, self.describe(instance)
+        if method == "GET" and action == "events":
+            return 200, [event._asdict() for event in instance.events.events()]
+        if method != "POST":
+            raise HttpError(405, "method not allowed")
+
+        loop = asyncio.get_running_loop()
+        if action == "start":
+            if not instance.start():
+                raise HttpError(409, "already running")
+            return 202, self.describe(instance)
+        if action == "stop":
+            if not instance.is_active() and instance.uses_rcon():
+                return 202, await self.run_command(instance, "stop")
+            if not instance.is_active():
+                raise HttpError(409, "not running")
+            instance.stop()
+            return 202, self.describe(instance)
+        if action == "restart":
+            # Waits for the graceful stop, which can take a while on big worlds
+            if instance.is_active():
+                await loop.run_in_executor(None, lambda: instance.stop(wait=True))
+                await loop.run_in_executor(None, instance.thread.join)
+            instance.start()
+            return 202, self.describe(instance)
+        if action == "command":
+            try:
+                request = json.loads(body or b"{}")
+                command = request["command"].strip()
+            except (ValueError, KeyError, TypeError, AttributeError):
+                raise HttpError(400, 'expected {"command": "..."}')
+            return 200, await self.run_command(instance, command, request.get("timeout"))
+        if action == "backup":
+            if not instance.backups.start():
+                raise HttpError(409, "a backup is already running")
+            return 202, self.describe(instance)
+        if action == "pregen":
+            return self.pregen(instance, body)
+        raise HttpError(404, "not found")
+
+    def pregen(self, instance, body):
+        try:
+            request = json.loads(body or b"{}")
+            kind = request["action"]
+            if kind == "start":
+                started = instance.pregen.start(int(request["radius"]), tuple(request.get("center", (0, 0))),
+                                                request.get("dimension", "minecraft:overworld"),
+                                                request.get("backend", "auto"))
+            elif kind == "resume":
+                started = instance.pregen.resume()
+            elif kind == "stop":
+                instance.pregen.stop()
+                return 202, self.describe(instance)
+            else:
+                raise KeyError(kind)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            raise HttpError(400, 'expected {"action": "start", "radius": ...}, {"action": "resume"} or '
+                                 '{"action": "stop"}')
+        if not started:
+            raise HttpError(409, "pre-generation is already running or there is nothing to resume")
+        return 202, self.describe(instance)
+
+    async def run_command(self, instance, command, timeout=None):
+        if not instance.is_running() and not instance.uses_rcon():
+            raise HttpError(409, "not running")
+        try:
+            response = await asyncio.wrap_future(instance.request(command, timeout))
+        except (RuntimeError, RconError) as e:
+            raise HttpError(409, str(e))
+        return {"command": response.command, "lines": response.messages(), "complete": response.complete}
+
+    async def websocket(self, reader, writer, path, headers):
+        parts = [part for part in path.split("/") if part]
+        if len(parts) != 3 or parts[0] != "instances" or parts[2] != "console":
+            raise HttpError(404, "not found")
+        instance = self.instance(parts[1])
+        key = headers.get("sec-websocket-key")
+        if not key:
+            raise HttpError(400, "missing Sec-WebSocket-Key")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode("ascii")).digest()).decode("ascii")
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+        ws = WebSocket(reader, writer)
+        self.clients += 1
+        subscription = instance.bus.subscribe(f"ws-{self.clients}", maxlen=self.client_buffer, policy=DROP_OLDEST)
+        sender = asyncio.create_task(self.stream(ws, subscription))
+        try:
+            while True:
+                command = await ws.receive()
+                if command is None:
+                    break
+                if command.strip():
+                    try:
+                        result = await self.run_command(instance, command.strip())
+                    except HttpError as e:
+                        result = {"command": command, "error": str(e)}
+                    await ws.send(result)
+        except ConnectionError:
+            pass
+        finally:
+            sender.cancel()
+            subscription.close()
+            writer.close()
+
+    async def stream(self, ws, subscription):
+        # The bus wakes this task when lines arrive instead of it polling
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                pass  # the loop is gone, the server is shutting down
+
+        subscription.on_ready = wake
+        try:
+            while not ws.closed and not subscription.closed:
+                ready.clear()
+                lines, dropped = subscription.drain(500)
+                if not lines and not dropped:
+                    await ready.wait()
+                    continue
+                await ws.send({"lines": lines, "dropped": dropped})
+        except ConnectionError:
+            ws.closed = True
+        finally:
+            subscription.on_ready = None
+
+
+def load_manager(config_file, base_dir):
+    # The instances saved by the GUI, without any Tk
+    with open(config_file, "r") as f:
+        config = json.load(f)
+    manager = InstanceManager(base_dir, load_profiles(config.get("jvm_profiles")))
+    for entry in config.get("instances", []):
+        settings = dict(entry)
+        manager.create(settings.pop("name"), settings.pop("server_type"), settings.pop("jar_file"), **settings)
+    return manager
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless control API for the Minecraft Server Launcher")
+    parser.add_argument("--config", default="log_config.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this unix socket instead of TCP")
+    parser.add_argument("--token", default=os.environ.get("MC_LAUNCHER_TOKEN"))
+    parser.add_argument("--start", nargs="*", default=[], help="instances to start right away")
+    args = parser.parse_args()
+    if not args.unix and args.host not in LOCAL_HOSTS and not args.token:
+        parser.error(f"listening on {args.host} needs --token (or MC_LAUNCHER_TOKEN)")
+
+    manager = load_manager(args.config, os.path.dirname(os.path.abspath(__file__)))
+    for instance in manager.instances.values():
+        instance.on_message = lambda instance, message: print(f"[{instance.name}] {message.rstrip()}", flush=True)
+    for name in args.start:
+        manager.get(name).start()
+
+    server = ControlServer(manager, args.host, args.port, args.unix, args.token)
+    print(f"▶ Control API listening on {server.address()}", flush=True)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("🛑 Stopping servers...", flush=True)
+        manager.stop_all(wait=True)
+        manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import os
+import re
+import threading
+import time
+from collections import deque
+
+GC_LOG_PATH = os.path.join("logs", "gc.log")  # relative to the instance working directory
+# Relative on purpose: a Windows drive letter's ':' would break the -Xlog syntax
+GC_LOG_FLAG = "-Xlog:gc*:file=logs/gc.log:time,uptime,level,tags:filecount=5,filesize=20M"
+
+UPTIME_RE = re.compile(r"\[([\d.]+)s\]")
+# G1 / Parallel / Serial summary line, e.g.
+#   [gc] GC(12) Pause Young (Normal) (G1 Evacuation Pause) 120M->40M(1024M) 5.123ms
+# ZGC pause phases, e.g.
+#   [gc,phases] GC(3) Y: Pause Mark Start 0.012ms
+PAUSE_RE = re.compile(r"GC\((\d+)\) (?:[YO]: )?(Pause [A-Za-z ]+?)(?: \((?:[^()]|\([^()]*\))*\))*"
+                      r"(?: (\d+)([KMG])->(\d+)([KMG])\((\d+)([KMG])\))? ([\d.]+)ms\s*$")
+# Only these collections clean the old generation, so only their heap-after
+# is close to the live set; young pauses and Remark run with old gen still full
+OLD_COLLECTION_RE = re.compile(r"Pause Full|Pause Young \(Mixed\)")
+UNITS = {"K": 1 / 1024, "M": 1, "G": 1024}
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class GcLogAnalyzer:
+    # Follows the unified JVM GC log while the server runs and keeps rolling
+    # windows of pause times and heap-after-GC samples.
+    def __init__(self, path, window=2000, poll_interval=1.0, live_window=50):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.pauses = deque(maxlen=window)  # (uptime, kind, ms)
+        self.heap_after = deque(maxlen=window)  # (uptime, MB after GC, heap MB)
+        self.old_after = deque(maxlen=live_window)  # MB after the recent full and mixed collections
+        self.allocated_mb = 0.0
+        self.first_uptime = None
+        self.last_uptime = None
+        self._last_after = None
+        self._since = 0
+        self._thread = None
+        self._wake = threading.Event()
+
+    def reset(self):
+        self.pauses.clear()
+        self.heap_after.clear()
+        self.old_after.clear()
+        self.allocated_mb = 0.0
+        self.first_uptime = self.last_uptime = self._last_after = None
+
+    def start(self):
+        # Called when the JVM starts; uptimes restart from zero with it
+        self.reset()
+        self._since = time.time()
+        if self._thread is None or not self._thread.is_alive():
+            self._wake.clear()
+            self._thread = threading.Thread(target=self._follow, name="gc-log", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._wake.set()
+
+    def _follow(self):
+        f = None
+        inode = None
+        pending = ""
+        try:
+            while True:
+                if f is None:
+                    try:
+                        # Skip a gc.log left over from the previous run until the JVM rotates it
+                        if os.stat(self.path).st_mtime >= self._since - 1:
+                            f = open(self.path, "r", encoding="utf-8", errors="replace")
+                            inode = os.fstat(f.fileno()).st_ino
+                    except OSError:
+                        f = None
+                if f is not None:
+                    chunk = f.read()
+                    if chunk:
+                        lines = (pending + chunk).split("\n")
+                        pending = lines.pop()
+                        for line in lines:
+                            self.feed(line)
+                    else:
+                        # The JVM rotates gc.log -> gc.log.0 and starts a new file
+                        try:
+                            stat = os.stat(self.path)
+                            if stat.st_ino != inode or stat.st_size < f.tell():
+                                f.close()
+                                f, pending = None, ""
+                                continue
+                        except OSError:
+                            pass
+                if self._wake.wait(self.poll_interval):
+                    break
+        finally:
+            if f is not None:
+                f.close()
+
+    def feed(self, line):
+        match = PAUSE_RE.search(line)
+        if not match:
+            return False
+        uptime = UPTIME_RE.search(line)
+        uptime = float(uptime.group(1)) if uptime else None
+        kind, ms = match.group(2).strip(), float(match.group(9))
+        self.pauses.append((uptime, kind, ms))
+
+        if match.group(3) and uptime is not None:
+            before = float(match.group(3)) * UNITS[match.group(4)]
+            after = float(match.group(5)) * UNITS[match.group(6)]
+            heap = float(match.group(7)) * UNITS[match.group(8)]
+            self.heap_after.append((uptime, after, heap))
+            if OLD_COLLECTION_RE.search(line):
+                self.old_after.append(after)
+            # Everything that appeared between the last GC and this one was allocated
+            if self._last_after is not None:
+                self.allocated_mb += max(0.0, before - self._last_after)
+            else:
+                self.first_uptime = uptime
+            self._last_after = after
+            self.last_uptime = uptime
+        return True
+
+    def histogram(self):
+        counts = [0] * (len(BUCKETS_MS) + 1)
+        for _, _, ms in self.pauses:
+            for i, bound in enumerate(BUCKETS_MS):
+                if ms <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+        labels = [f"<={bound}ms" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return list(zip(labels, counts))
+
+    def stats(self):
+        times = [ms for _, _, ms in self.pauses]
+        after = [mb for _, mb, _ in self.heap_after]
+        elapsed = (self.last_uptime or 0) - (self.first_uptime or 0)
+        return {
+            "pauses": len(times),
+            "p50_ms": percentile(times, 0.5),
+            "p99_ms": percentile(times, 0.99),
+            "max_ms": max(times) if times else None,
+            "alloc_rate_mb_s": self.allocated_mb / elapsed if elapsed > 0 else None,
+            "heap_after_mb": after[-1] if after else None,
+            # Low end of what full and mixed collections leave behind; None
+            # until the old generation has been collected at least once
+            "live_set_mb": percentile(self.old_after, 0.1),
+            "heap_mb": self.heap_after[-1][2] if self.heap_after else None,
+        }
+
+    def summary(self):
+        s = self.stats()
+        if not s["pauses"]:
+            return ""
+        text = f"GC p50 {s['p50_ms']:.1f} ms  p99 {s['p99_ms']:.1f} ms  max {s['max_ms']:.1f} ms"
+        if s["alloc_rate_mb_s"] is not None:
+            text += f"  alloc {s['alloc_rate_mb_s']:.0f} MB/s"
+        return text
+
+    def trend(self, points=60):
+        # Heap after GC, oldest first, thinned out to at most `points` samples
+        samples = list(self.heap_after)
+        step = max(1, len(samples) // points)
+        return [(uptime, after) for uptime, after, _ in samples[::step]]
@@ -0,0 +1,131 @@
+import os
+import re
+import sys
+
+OS_RESERVE_MB = 1024  # left for the OS and the launcher itself when not in a container
+MIN_HEAP_MB = 512
+HEAP_STEP_MB = 256
+
+
+def parse_size_mb(value, default=None):
+    # Accepts 2048, "2048", "2048M", "2G", "1.5g" -> MB
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.match(r"^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*$", str(value), re.IGNORECASE)
+    if not match:
+        return default
+    number, unit = float(match.group(1)), match.group(2).upper()
+    factor = {"K": 1 / 1024, "": 1, "M": 1, "G": 1024, "T": 1024 * 1024}[unit]
+    return int(number * factor)
+
+
+def read_meminfo(path="/proc/meminfo"):
+    values = {}
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("MemTotal", "MemAvailable"):
+                    values[key] = int(rest.split()[0]) // 1024
+    except (OSError, ValueError):
+        return None
+    if "MemTotal" not in values:
+        return None
+    return {"total": values["MemTotal"], "available": values.get("MemAvailable", values["MemTotal"])}
+
+
+def read_windows_memory():
+    import ctypes
+
+    class MEMORYSTATUSEX(ctypes.Structure):
+        _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                    ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                    ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                    ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                    ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+    status = MEMORYSTATUSEX()
+    status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+    if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+        return None
+    return {"total": status.ullTotalPhys // (1024 * 1024), "available": status.ullAvailPhys // (1024 * 1024)}
+
+
+def read_cgroup_limit(proc_cgroup="/proc/self/cgroup", root="/sys/fs/cgroup"):
+    # cgroup v2 memory.max for our own group (or the root), falling back to v1
+    candidates = []
+    try:
+        with open(proc_cgroup, "r") as f:
+            for line in f:
+                parts = line.strip().split(":", 2)
+                if len(parts) == 3 and parts[0] == "0" and parts[1] == "":
+                    candidates.append(os.path.join(root, parts[2].lstrip("/"), "memory.max"))
+                elif len(parts) == 3 and "memory" in parts[1].split(","):
+                    candidates.append(os.path.join(root, "memory", parts[2].lstrip("/"), "memory.limit_in_bytes"))
+    except OSError:
+        pass
+    candidates += [os.path.join(root, "memory.max"), os.path.join(root, "memory", "memory.limit_in_bytes")]
+
+    for path in candidates:
+        try:
+            with open(path, "r") as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value == "max":
+            return None
+        limit = int(value) // (1024 * 1024)
+        # v1 reports "unlimited" as a huge number
+        return limit if limit < 1024 * 1024 * 1024 else None
+    return None
+
+
+def host_memory():
+    info = read_windows_memory() if sys.platform == "win32" else read_meminfo()
+    if info is None:
+        return None
+    info["cgroup_limit"] = None if sys.platform == "win32" else read_cgroup_limit()
+    if info["cgroup_limit"]:
+        # Inside a container the limit is the whole budget, there's no OS to leave room for
+        info["limit"] = min(info["total"], info["cgroup_limit"])
+        info["reserve"] = 0
+    else:
+        info["limit"] = info["total"]
+        info["reserve"] = OS_RESERVE_MB
+    return info
+
+
+def headroom_mb(xmx):
+    # Off-heap use of a server JVM: metaspace, code cache, thread stacks, direct buffers
+    return max(512, int(xmx) // 4)
+
+
+def footprint_mb(xmx):
+    return int(xmx) + headroom_mb(xmx)
+
+
+def max_heap_mb(info, other_heaps=()):
+    # Largest Xmx that still fits next to the other instances, off-heap headroom included
+    if info is None:
+        return None
+    return heap_for_budget(info["limit"] - info["reserve"] - sum(footprint_mb(xmx) for xmx in other_heaps))
+
+
+def heap_for_budget(budget):
+    xmx = min(budget - 512, budget * 4 // 5)
+    xmx = xmx // HEAP_STEP_MB * HEAP_STEP_MB
+    return max(xmx, 0)
+
+
+def recommend_heap(info, other_heaps=()):
+    # Returns (xms, xmx) in MB, or None if the host can't be read.
+    # Unlike max_heap_mb this also respects what the rest of the machine is
+    # using: info is read when the launcher starts, before any of its
+    # instances run, so the other instances still come out of "available"
+    xmx = max_heap_mb(info, other_heaps)
+    if xmx is None:
+        return None
+    free = info["available"] - sum(footprint_mb(xmx) for xmx in other_heaps)
+    xmx = max(min(xmx, heap_for_budget(free)), MIN_HEAP_MB)
+    # Fixed-size heaps avoid resize pauses and let AlwaysPreTouch work
+    return xmx, xmx
@@ -0,0 +1,91 @@
+class JvmProfile:
+    # A named set of JVM flags. The flags depend on the heap picked with the
+    # Xms/Xmx sliders, so they are computed at launch time by flags().
+    def __init__(self, name, gc="g1", pause_target_ms=200, pre_touch=True, large_pages=False, extra_flags=None):
+        self.name = name
+        self.gc = gc  # "default", "g1", "zgc" or "parallel"
+        self.pause_target_ms = pause_target_ms
+        self.pre_touch = pre_touch
+        self.large_pages = large_pages
+        self.extra_flags = list(extra_flags or [])
+
+    @classmethod
+    def from_dict(cls, name, data):
+        return cls(name, **data)
+
+    def to_dict(self):
+        return {
+            "gc": self.gc,
+            "pause_target_ms": self.pause_target_ms,
+            "pre_touch": self.pre_touch,
+            "large_pages": self.large_pages,
+            "extra_flags": self.extra_flags,
+        }
+
+    def flags(self, xms, xmx):
+        xms, xmx = int(xms), int(xmx)
+        flags = [f"-Xms{xms}M", f"-Xmx{xmx}M"]
+        if self.gc == "g1":
+            flags += g1_flags(xmx, self.pause_target_ms)
+        elif self.gc == "zgc":
+            flags += ["-XX:+UseZGC", f"-XX:SoftMaxHeapSize={xmx * 9 // 10}M", "-XX:+DisableExplicitGC"]
+        elif self.gc == "parallel":
+            flags += ["-XX:+UseParallelGC", f"-XX:MaxGCPauseMillis={self.pause_target_ms}", "-XX:+DisableExplicitGC"]
+
+        if self.gc != "default":
+            flags.append("-XX:+PerfDisableSharedMem")
+        # Pre-touching only pays off when the heap is fixed, otherwise it just slows startup
+        if self.pre_touch and xms == xmx:
+            flags.append("-XX:+AlwaysPreTouch")
+        if self.large_pages:
+            flags += ["-XX:+UseLargePages", "-XX:LargePageSizeInBytes=2m"]
+        return flags + self.extra_flags
+
+
+def g1_flags(xmx, pause_target_ms):
+    # Aikar's G1 tuning for Minecraft; bigger heaps get a larger young gen and regions
+    large = xmx >= 12 * 1024
+    return [
+        "-XX:+UseG1GC",
+        "-XX:+ParallelRefProcEnabled",
+        f"-XX:MaxGCPauseMillis={pause_target_ms}",
+        "-XX:+UnlockExperimentalVMOptions",
+        "-XX:+DisableExplicitGC",
+        f"-XX:G1NewSizePercent={40 if large else 30}",
+        f"-XX:G1MaxNewSizePercent={50 if large else 40}",
+        f"-XX:G1HeapRegionSize={g1_region_size(xmx)}M",
+        f"-XX:G1ReservePercent={15 if large else 20}",
+        "-XX:G1HeapWastePercent=5",
+        "-XX:G1MixedGCCountTarget=4",
+        f"-XX:InitiatingHeapOccupancyPercent={20 if large else 15}",
+        "-XX:G1MixedGCLiveThresholdPercent=90",
+        "-XX:G1RSetUpdatingPauseTimePercent=5",
+        "-XX:SurvivorRatio=32",
+        "-XX:MaxTenuringThreshold=1",
+    ]
+
+
+def g1_region_size(xmx):
+    # Big regions keep chunk data out of humongous allocations; tiny heaps can't afford them
+    if xmx >= 12 * 1024:
+        return 16
+    if xmx >= 2048:
+        return 8
+    return 4
+
+
+DEFAULT_PROFILES = {
+    "default": JvmProfile("default", gc="default", pre_touch=False),
+    "g1-low-latency": JvmProfile("g1-low-latency", gc="g1", pause_target_ms=130),
+    "g1-balanced": JvmProfile("g1-balanced", gc="g1", pause_target_ms=200),
+    "zgc": JvmProfile("zgc", gc="zgc"),
+    "throughput": JvmProfile("throughput", gc="parallel", pause_target_ms=500),
+}
+
+
+def load_profiles(data=None):
+    # Built-in profiles, overridden or extended by the "jvm_profiles" section of the config
+    profiles = {name: JvmProfile.from_dict(name, profile.to_dict()) for name, profile in DEFAULT_PROFILES.items()}
+    for name, settings in (data or {}).items():
+        profiles[name] = JvmProfile.from_dict(name, settings)
+    return profiles
@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import deque
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+
+
+class Subscription:
+    # Bounded per-subscriber queue. The policy decides what happens when the
+    # subscriber falls behind: drop its oldest lines, drop the incoming ones, or
+    # make the publisher wait, but never longer than block_timeout so the
+    # server's stdout pipe keeps draining.
+    def __init__(self, name, maxlen=10000, policy=DROP_OLDEST, block_timeout=0.1):
+        self.name = name
+        self.maxlen = maxlen
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.lines = deque()
+        self.cond = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+        self.delivered = 0
+        self._dropped_unseen = 0
+        self.bus = None
+        self.on_ready = None  # called on the publishing thread once lines arrive or it closes
+
+    def offer(self, lines):
+        with self.cond:
+            if self.closed:
+                return
+            if self.maxlen:
+                free = self.maxlen - len(self.lines)
+                if len(lines) > free and self.policy == BLOCK:
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(lines) > free and not self.closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self.cond.wait(remaining)
+                        free = self.maxlen - len(self.lines)
+                if len(lines) > free:
+                    if self.policy == DROP_OLDEST:
+                        skipped = max(0, len(lines) - self.maxlen)
+                        lines = lines[skipped:]
+                        overflow = len(lines) - free
+                        for _ in range(overflow):
+                            self.lines.popleft()
+                        self._count_dropped(skipped + overflow)
+                    else:
+                        self._count_dropped(len(lines) - max(free, 0))
+                        lines = lines[:max(free, 0)]
+            self.lines.extend(lines)
+            self.cond.notify_all()
+        if self.on_ready:
+            self.on_ready()
+
+    def _count_dropped(self, count):
+        self.dropped += count
+        self._dropped_unseen += count
+
+    def drain(self, limit=None):
+        # Non-blocking; returns (lines, lines dropped since the last drain)
+        with self.cond:
+            if limit is None or limit >= len(self.lines):
+                batch = list(self.lines)
+                self.lines.clear()
+            else:
+                batch = [self.lines.popleft() for _ in range(limit)]
+            dropped, self._dropped_unseen = self._dropped_unseen, 0
+            self.delivered += len(batch)
+            self.cond.notify_all()
+        return batch, dropped
+
+    def get(self, timeout=None, limit=None):
+        # Blocks until lines are available; returns None once closed and empty
+        with self.cond:
+            if not self.lines and not self.closed:
+                self.cond.wait(timeout)
+            if not self.lines and self.closed:
+                return None
+        return self.drain(limit)[0]
+
+    def pending(self):
+        return len(self.lines)
+
+    def close(self):
+        if self.bus is not None:
+            self.bus.unsubscribe(self)
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        if self.on_ready:
+            self.on_ready()
+
+
+class OutputBus:
+    # One stdout stream, many consumers. publish() is called by the reader
+    # thread with a batch of lines and hands it to every subscriber.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = ()
+        self.filters = ()
+        self.published = 0
+
+    def subscribe(self, name, maxlen=10000, policy=DROP_OLDEST, block_timeout=0.1):
+        sub = Subscription(name, maxlen, policy, block_timeout)
+        sub.bus = self
+        with self.lock:
+            self.subscribers = self.subscribers + (sub,)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self.lock:
+            self.subscribers = tuple(s for s in self.subscribers if s is not sub)
+        sub.bus = None
+
+    def add_filter(self, func, first=False):
+        # func(lines) -> lines to pass on; runs on the reader thread, keep it cheap
+        with self.lock:
+            self.filters = (func,) + self.filters if first else self.filters + (func,)
+
+    def remove_filter(self, func):
+        with self.lock:
+            self.filters = tuple(f for f in self.filters if f is not func)
+
+    def publish(self, lines):
+        for func in self.filters:
+            lines = func(lines)
+            if not lines:
+                return
+        self.published += len(lines)
+        for sub in self.subscribers:
+            sub.offer(lines)
+
+    def stats(self):
+        return {
+            "published": self.published,
+            "subscribers": {
+                sub.name: {"pending": sub.pending(), "delivered": sub.delivered, "dropped": sub.dropped}
+                for sub in self.subscribers
+            },
+        }
@@ -0,0 +1,68 @@
+import codecs
+import time
+
+
+class Throughput:
+    def __init__(self):
+        self.total_lines = 0
+        self.total_bytes = 0
+        self._last_time = time.monotonic()
+        self._last_lines = 0
+        self._last_bytes = 0
+
+    def add(self, lines, nbytes):
+        self.total_lines += lines
+        self.total_bytes += nbytes
+
+    def sample(self):
+        # Rates since the previous sample() call, as (lines/s, bytes/s)
+        now = time.monotonic()
+        elapsed = max(now - self._last_time, 1e-6)
+        lines = (self.total_lines - self._last_lines) / elapsed
+        nbytes = (self.total_bytes - self._last_bytes) / elapsed
+        self._last_time = now
+        self._last_lines = self.total_lines
+        self._last_bytes = self.total_bytes
+        return lines, nbytes
+
+
+class ChunkedLineReader:
+    # Reads the raw (binary, unbuffered) stdout of the server with readinto into
+    # one reusable buffer and yields a list of complete lines per chunk. Bad
+    # UTF-8 from mods is replaced instead of killing the reader.
+    def __init__(self, stream, chunk_size=64 * 1024, encoding="utf-8", throughput=None):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+        self.throughput = throughput or Throughput()
+
+    def __iter__(self):
+        buffer = bytearray(self.chunk_size)
+        view = memoryview(buffer)
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        pending = ""  # start of a line whose end hasn't been read yet
+        carry = ""  # a \r that ended the last read; its \n may start the next one
+
+        while True:
+            n = self.stream.readinto(buffer)
+            if not n:
+                break
+            text = carry + decoder.decode(view[:n])
+            carry = ""
+            if text.endswith("\r"):
+                text, carry = text[:-1], "\r"
+            if "\r" in text:
+                text = text.replace("\r\n", "\n")
+            parts = text.split("\n")
+            parts[0] = pending + parts[0]
+            pending = parts.pop()
+            self.throughput.add(len(parts), n)
+            if parts:
+                yield [line + "\n" for line in parts]
+
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            pending += carry + tail  # the \r was inside the last line after all
+        if pending:
+            self.throughput.add(1, 0)
+            yield [pending + "\n"]
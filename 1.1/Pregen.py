@@ -0,0 +1,357 @@
+import itertools
+import json
+import os
+import re
+import threading
+import time
+
+from ConfigFormats import atomic_write
+from TickMonitor import COLOR_RE, UNKNOWN_RE
+
+CHUNKY = "chunky"
+FORCELOAD = "forceload"
+BACKENDS = ("auto", CHUNKY, FORCELOAD)
+TILE = 4  # chunks per side of one forceload area
+STATE_FILE = "pregen.json"
+# "[Chunky] Task running for world. Processed: 1234 chunks (1.23%), ETA: 0:10:00, Rate: 40.1 cps, ..."
+CHUNKY_RE = re.compile(r"\[Chunky\] Task (running|finished) for (.+?)\. Processed: (\d+) chunks \(([\d.]+)%\)")
+PAUSE_ABOVE = 1.25  # pause outright when MSPT is this far over the limit
+RESUME_BELOW = 0.8  # and resume, or grow the batch, once it is back under this share of it
+
+
+def tile_ranges(n, tile=TILE):
+    # Tile index -> (first, last) chunk offset from the centre, for indexes -n..n
+    return {i: (i * tile - tile // 2, i * tile - tile // 2 + tile - 1) for i in range(-n, n + 1)}
+
+
+def tiles(center_x, center_z, radius, tile=TILE):
+    # Forceload areas (x1, z1, x2, z2 in chunks) covering the square of
+    # radius blocks around the centre, ring by ring from the middle out, so
+    # an interrupted run always leaves a solid square behind.
+    cx, cz = center_x // 16, center_z // 16
+    r = -(-radius // 16)
+    n = -(-(r + tile // 2) // tile)
+    ranges = {i: (max(lo, -r), min(hi, r)) for i, (lo, hi) in tile_ranges(n, tile).items()}
+    for k in range(n + 1):
+        if k == 0:
+            ring = [(0, 0)]
+        else:
+            ring = ([(i, -k) for i in range(-k, k + 1)] + [(k, j) for j in range(-k + 1, k + 1)] +
+                    [(i, k) for i in range(k - 1, -k - 1, -1)] + [(-k, j) for j in range(k - 1, -k, -1)])
+        for i, j in ring:
+            (x1, x2), (z1, z2) = ranges[i], ranges[j]
+            if x1 <= x2 and z1 <= z2:
+                yield cx + x1, cz + z1, cx + x2, cz + z2
+
+
+def count_tiles(radius, tile=TILE):
+    r = -(-radius // 16)
+    n = -(-(r + tile // 2) // tile)
+    side = sum(1 for lo, hi in tile_ranges(n, tile).values() if max(lo, -r) <= min(hi, r))
+    return side * side
+
+
+class PregenScheduler:
+    # Drives chunk pre-generation through the instance's command channel and
+    # keeps it from hurting the game: while players are online MSPT has to
+    # stay under target_mspt (idle_mspt applies to an empty server, None for
+    # no limit). With Chunky installed the scheduler only pauses and continues
+    # Chunky's own task. Otherwise it sweeps the square with vanilla
+    # forceload, a batch of 4x4-chunk areas at a time: add, wait until every
+    # chunk tests as loaded, remove. The batch halves when MSPT goes over the
+    # limit and grows by one while it is comfortably under.
+    # Progress is saved to pregen.json after every batch, so resume() picks
+    # up after a stop, a crash or a launcher restart.
+    def __init__(self, instance, target_mspt=40.0, idle_mspt=None, max_batch=16, probe_interval=5.0,
+                 load_timeout=120.0):
+        self.instance = instance
+        self.target_mspt = target_mspt
+        self.idle_mspt = idle_mspt
+        self.max_batch = max_batch
+        self.probe_interval = probe_interval  # seconds between tick health probes while generating
+        self.load_timeout = load_timeout  # seconds to wait for one batch of forceloaded chunks
+        self.state_path = os.path.join(instance.workdir, STATE_FILE)
+        self.job = None
+        self.batch = 1
+        self.paused = None  # reason, while paused
+        self.verify = True  # False once the server turns out not to know "execute if loaded"
+        self.unmeasured = False  # warned that there is no MSPT to throttle by
+        self.thread = None
+        self._stop = threading.Event()
+
+    def to_dict(self):
+        return {"target_mspt": self.target_mspt, "idle_mspt": self.idle_mspt, "max_batch": self.max_batch,
+                "probe_interval": self.probe_interval, "load_timeout": self.load_timeout}
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def load_job(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_job(self):
+        atomic_write(self.state_path, json.dumps(self.job, indent=2))
+
+    def start(self, radius, center=(0, 0), dimension="minecraft:overworld", backend="auto"):
+        if self.is_running():
+            self.instance.log("⚠ Pre-generation is already running.\n")
+            return False
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {', '.join(BACKENDS)}")
+        self.job = {"backend": backend, "center": list(center), "radius": int(radius), "dimension": dimension,
+                    "next": 0, "total": count_tiles(int(radius)), "percent": 0.0, "done": False,
+                    "started": time.time(), "resumed": False}
+        self.save_job()
+        return self._launch()
+
+    def resume(self):
+        # Continues the job in pregen.json
+        if self.is_running():
+            self.instance.log("⚠ Pre-generation is already running.\n")
+            return False
+        job = self.load_job()
+        if not job or job.get("done"):
+            self.instance.log("⚠ No unfinished pre-generation to resume.\n")
+            return False
+        self.job = job
+        self.job["resumed"] = True
+        return self._launch()
+
+    def _launch(self):
+        self._stop.clear()
+        self.paused = None
+        self.unmeasured = False
+        self.batch = 1
+        self.thread = threading.Thread(target=self._run, name=f"pregen-{self.instance.name}", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        # Progress is kept; resume() carries on later
+        self._stop.set()
+
+    def status(self):
+        if not self.job:
+            return ""
+        if self.job.get("done"):
+            return "🗺 Pregen done"
+        state = f"⏸ {self.paused}" if self.paused else f"batch {self.batch}" if self.is_running() else "stopped"
+        return f"🗺 Pregen {self.job.get('percent', 0):.1f}% ({state})"
+
+    def _command(self, command, timeout=10):
+        # The response, or RuntimeError when the server isn't there to answer
+        return self.instance.request(command, timeout).result()
+
+    def _limit(self):
+        return self.target_mspt if self.instance.events.online() else self.idle_mspt
+
+    def _mspt(self):
+        # Probes when the tick monitor's last answer is older than probe_interval.
+        # The probe goes through the command channel, so it works over RCON too.
+        monitor = self.instance.tick_monitor
+        last = monitor.history[-1][0] if monitor.history else 0
+        if time.time() - last > self.probe_interval:
+            return monitor.probe()
+        return monitor.mspt
+
+    def _warn_unmeasured(self, mspt, limit, action):
+        if limit and mspt is None and not self.unmeasured:
+            self.unmeasured = True
+            self.instance.log(f"⚠ Pre-generation: the server doesn't report MSPT, {action}.\n")
+
+    def _overloaded(self, mspt, limit):
+        # Updates self.paused with hysteresis; True while generation should wait
+        if not limit or mspt is None:
+            self.paused = None
+        elif mspt > limit * PAUSE_ABOVE:
+            self.paused = f"MSPT {mspt:.0f} > {limit:.0f}"
+        elif self.paused and mspt < limit * RESUME_BELOW:
+            self.paused = None
+        return self.paused is not None
+
+    def _wait_for_server(self):
+        while not self._stop.is_set() and not self.instance.is_running() and not self.instance.uses_rcon():
+            self.paused = "server offline"
+            self._stop.wait(2.0)
+        if self.paused == "server offline":
+            self.paused = None
+        return not self._stop.is_set()
+
+    def _run(self):
+        job = self.job
+        self.instance.log(f"🗺 Pre-generating {job['dimension']} to {job['radius']} blocks around "
+                          f"{job['center'][0]}, {job['center'][1]}"
+                          f"{' (resumed at %.1f%%)' % job['percent'] if job['resumed'] else ''}...\n")
+        try:
+            if not self._wait_for_server():
+                return
+            if job["backend"] == "auto":
+                job["backend"] = self._detect()
+                self.save_job()
+            if job["backend"] == CHUNKY:
+                self._run_chunky()
+            else:
+                self._run_forceload()
+        except Exception as e:
+            self.instance.log(f"❌ Pre-generation stopped: {str(e)}\n")
+        finally:
+            self.paused = None
+            if job.get("done"):
+                self.instance.log(f"✔ Pre-generation of {job['dimension']} finished.\n")
+            else:
+                self.instance.log(f"⏸ Pre-generation paused at {job['percent']:.1f}%; resume it any time.\n")
+
+    def _detect(self):
+        response = self._command("chunky")
+        if any(UNKNOWN_RE.search(line) for line in response.messages()) or not response.lines:
+            return FORCELOAD
+        return CHUNKY
+
+    def _run_forceload(self):
+        job = self.job
+        areas = itertools.islice(tiles(job["center"][0], job["center"][1], job["radius"]), job["next"], None)
+        reported = int(job["percent"] // 5)
+        batch = None  # kept across a failed attempt so no area is skipped
+        while not self._stop.is_set():
+            if not self.instance.is_running() and not self._wait_for_server():
+                return
+            limit = self._limit()
+            mspt = self._mspt()
+            if self._overloaded(mspt, limit):
+                self._stop.wait(self.probe_interval)
+                continue
+            if limit and mspt is None:
+                # Nothing to measure the load by: stay at the smallest batch
+                self._warn_unmeasured(mspt, limit, "generating one area at a time")
+                self.batch = 1
+            elif limit:
+                if mspt > limit:
+                    self.batch = max(1, self.batch // 2)
+                elif mspt < limit * RESUME_BELOW:
+                    self.batch = min(self.max_batch, self.batch + 1)
+            else:
+                self.batch = min(self.max_batch, self.batch + 1)
+
+            batch = batch or list(itertools.islice(areas, self.batch))
+            if not batch:
+                job["done"] = True
+                job["percent"] = 100.0
+                self.save_job()
+                return
+            try:
+                self._generate(batch)
+            except Exception as e:
+                # Usually the server going down mid-batch; the loop waits for it and retries
+                self.instance.log(f"⚠ Pre-generation: {str(e)}, retrying\n")
+                self._stop.wait(self.probe_interval)
+                continue
+            job["next"] += len(batch)
+            job["percent"] = job["next"] / job["total"] * 100 if job["total"] else 100.0
+            self.save_job()
+            batch = None
+            if int(job["percent"] // 5) > reported:
+                reported = int(job["percent"] // 5)
+                self.instance.log(f"🗺 Pre-generation {job['percent']:.0f}% ({job['next']}/{job['total']} areas, "
+                                  f"batch {self.batch}, MSPT {mspt if mspt is not None else '?'})\n")
+
+    def _generate(self, batch):
+        dimension = self.job["dimension"]
+        for x1, z1, x2, z2 in batch:
+            self._command(f"execute in {dimension} run forceload add {x1 * 16} {z1 * 16} {x2 * 16 + 15} {z2 * 16 + 15}")
+        try:
+            self._wait_loaded(batch)
+        finally:
+            # Even when stopping: chunks left forceloaded would stay loaded forever
+            for x1, z1, x2, z2 in batch:
+                self._command(f"execute in {dimension} run forceload remove {x1 * 16} {z1 * 16} "
+                              f"{x2 * 16 + 15} {z2 * 16 + 15}")
+
+    def _wait_loaded(self, batch):
+        deadline = time.monotonic() + self.load_timeout
+        pending = list(batch)
+        while pending and not self._stop.is_set():
+            if not self.verify:
+                # No way to ask, give the chunk system a moment per area instead
+                self._stop.wait(0.5 * len(pending))
+                return
+            waiting = []
+            for x1, z1, x2, z2 in pending:
+                tests = " ".join(f"if loaded {x * 16 + 8} 0 {z * 16 + 8}"
+                                 for x in range(x1, x2 + 1) for z in range(z1, z2 + 1))
+                text = " ".join(self._command(f"execute in {self.job['dimension']} {tests}").messages())
+                if "Test passed" in text:
+                    continue
+                if "Test failed" not in text:
+                    self.verify = False  # before 1.19.4 there is no "if loaded"
+                waiting.append((x1, z1, x2, z2))
+            pending = waiting
+            if pending and time.monotonic() > deadline:
+                self.instance.log(f"⚠ Pre-generation: {len(pending)} areas still loading after "
+                                  f"{self.load_timeout:.0f}s, moving on.\n")
+                return
+            if pending:
+                self._stop.wait(0.5)
+
+    def _run_chunky(self):
+        job = self.job
+        subscription = self.instance.bus.subscribe("pregen", maxlen=2000)
+        try:
+            if job["resumed"]:
+                self._command("chunky continue")
+            else:
+                commands = [f"chunky center {job['center'][0]} {job['center'][1]}", f"chunky radius {job['radius']}",
+                            "chunky shape square"]
+                if job["dimension"] != "minecraft:overworld":
+                    # Chunky starts in the main world; Bukkit servers want their own world names here
+                    commands.insert(0, f"chunky world {job['dimension']}")
+                for command in commands:
+                    self._command(command)
+                response = self._command("chunky start")
+                if any("confirm" in line for line in response.messages()):
+                    self._command("chunky confirm")  # replaces an old task for the same world
+            process = self.instance.process
+            reported = int(job["percent"] // 5)
+            last_check = 0
+            while not self._stop.is_set():
+                lines = subscription.get(timeout=1.0) or []
+                for line in lines:
+                    match = CHUNKY_RE.search(COLOR_RE.sub("", line))
+                    if match:
+                        job["percent"] = float(match.group(4))
+                        job["done"] = match.group(1) == "finished"
+                if job["done"]:
+                    job["percent"] = 100.0
+                    self.save_job()
+                    return
+                if int(job["percent"] // 5) > reported:
+                    reported = int(job["percent"] // 5)
+                    self.save_job()
+                if not self.instance.is_running():
+                    if not self._wait_for_server():
+                        return
+                if self.instance.process is not process:
+                    # Restarted: Chunky keeps its task but waits to be told to continue
+                    process = self.instance.process
+                    self.paused = None
+                    self._command("chunky continue")
+                if time.monotonic() - last_check < self.probe_interval:
+                    continue
+                last_check = time.monotonic()
+                was_paused = self.paused
+                mspt, limit = self._mspt(), self._limit()
+                self._warn_unmeasured(mspt, limit, "so Chunky runs at its own pace")
+                if self._overloaded(mspt, limit) != bool(was_paused):
+                    self._command("chunky pause" if self.paused else "chunky continue")
+        finally:
+            subscription.close()
+            if not job["done"] and (self.instance.is_running() or self.instance.uses_rcon()):
+                try:
+                    self._command("chunky pause")  # Chunky saves its progress on pause
+                except Exception as e:
+                    # The server went away meanwhile; don't hide whatever stopped the loop
+                    self.instance.log(f"⚠ Pre-generation: could not pause Chunky: {str(e)}\n")
+            self.save_job()
@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+
+PROC = "/proc"
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def read_stat(pid):
+    # Returns (ppid, cpu ticks, threads) from /proc/<pid>/stat
+    with open(f"{PROC}/{pid}/stat", "rb") as f:
+        data = f.read()
+    fields = data[data.rindex(b")") + 2:].split()
+    return int(fields[1]), int(fields[11]) + int(fields[12]), int(fields[17])
+
+
+def read_status(pid):
+    values = {}
+    with open(f"{PROC}/{pid}/status", "rb") as f:
+        for line in f:
+            if line.startswith((b"VmRSS:", b"VmHWM:", b"VmSwap:")):
+                key, value = line.split(b":", 1)
+                values[key.decode()] = int(value.split()[0]) // 1024  # kB -> MB
+    return values
+
+
+def read_io(pid):
+    read_bytes = write_bytes = 0
+    try:
+        with open(f"{PROC}/{pid}/io", "rb") as f:
+            for line in f:
+                if line.startswith(b"read_bytes:"):
+                    read_bytes = int(line.split()[1])
+                elif line.startswith(b"write_bytes:"):
+                    write_bytes = int(line.split()[1])
+    except OSError:
+        pass  # needs ptrace access on some kernels
+    return read_bytes, write_bytes
+
+
+def child_pids(root):
+    # One pass over /proc building the parent map; only done every few samples
+    children = {}
+    for entry in os.listdir(PROC):
+        if entry.isdigit():
+            try:
+                children.setdefault(read_stat(entry)[0], []).append(int(entry))
+            except (OSError, ValueError, IndexError):
+                continue
+    tree, frontier = [], [root]
+    while frontier:
+        found = children.get(frontier.pop(), [])
+        tree += found
+        frontier += found
+    return tree
+
+
+class ProcSampler:
+    # Samples CPU%, memory, threads and disk I/O for the server process tree
+    # from /proc. Everything is read as bytes and only the fields we need are
+    # parsed, so a sample costs a handful of small reads per process.
+    def __init__(self, instance, interval=2.0, rescan_every=15):
+        self.instance = instance
+        self.interval = interval
+        self.rescan_every = rescan_every
+        self.available = os.path.isdir(PROC)
+        self.latest = {}
+        self._thread = None
+        self._wake = threading.Event()
+        self._last = None
+        self._children = []
+        self._samples = 0
+
+    def start(self):
+        if self.available and self.interval and (self._thread is None or not self._thread.is_alive()):
+            self._wake.clear()
+            self._last = None
+            self._samples = 0
+            self._thread = threading.Thread(target=self._run, name=f"proc-{self.instance.name}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._wake.set()
+
+    def _run(self):
+        while self.instance.is_running():
+            try:
+                self.sample(self.instance.process.pid)
+            except (OSError, ValueError, IndexError):
+                pass  # process went away between is_running() and the read
+            if self._wake.wait(self.interval):
+                break
+        self.latest = {}
+
+    def sample(self, pid):
+        if self._samples % self.rescan_every == 0:
+            self._children = child_pids(pid)
+        self._samples += 1
+
+        ticks = threads = rss = swap = read_bytes = write_bytes = 0
+        alive = []
+        for member in [pid] + self._children:
+            try:
+                _, member_ticks, member_threads = read_stat(member)
+                status = read_status(member)
+            except OSError:
+                continue
+            member_read, member_write = read_io(member)
+            alive.append(member)
+            ticks += member_ticks
+            threads += member_threads
+            rss += status.get("VmRSS", 0)
+            swap += status.get("VmSwap", 0)
+            read_bytes += member_read
+            write_bytes += member_write
+        self._children = [child for child in self._children if child in alive]
+
+        now = time.monotonic()
+        latest = {
+            "pid": pid,
+            "processes": len(alive),
+            "threads": threads,
+            "rss_mb": rss,
+            "swap_mb": swap,
+            "cpu_percent": 0.0,
+            "read_bps": 0.0,
+            "write_bps": 0.0,
+        }
+        if self._last:
+            last_time, last_ticks, last_read, last_write = self._last
+            elapsed = max(now - last_time, 1e-6)
+            # 100% = one full core, like top
+            latest["cpu_percent"] = max(0.0, (ticks - last_ticks) / CLK_TCK / elapsed * 100)
+            latest["read_bps"] = max(0.0, (read_bytes - last_read) / elapsed)
+            latest["write_bps"] = max(0.0, (write_bytes - last_write) / elapsed)
+        self._last = (now, ticks, read_bytes, write_bytes)
+        self.latest = latest
+        return latest
+
+    def summary(self):
+        s = self.latest
+        if not s:
+            return ""
+        return (f"CPU {s['cpu_percent']:.0f}%  RSS {s['rss_mb']} MB  {s['threads']} threads  "
+                f"IO r {s['read_bps'] / 1024:.0f} KB/s w {s['write_bps'] / 1024:.0f} KB/s")
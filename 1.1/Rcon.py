@@ -0,0 +1,268 @@
+import itertools
+import os
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import Future
+
+SERVERDATA_AUTH = 3
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_RESPONSE_VALUE = 0
+MAX_COMMAND_BYTES = 1446  # Minecraft drops longer requests
+MAX_PACKET = 4096 + 14
+
+
+class RconError(Exception):
+    pass
+
+
+class RconAuthError(RconError):
+    pass
+
+
+def encode_packet(request_id, packet_type, body):
+    payload = struct.pack("<ii", request_id, packet_type) + body.encode("utf-8") + b"\x00\x00"
+    return struct.pack("<i", len(payload)) + payload
+
+
+def read_properties(path):
+    # Just the keys we need from server.properties
+    values = {}
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if "=" in line and not line.lstrip().startswith("#"):
+                    key, value = line.split("=", 1)
+                    values[key.strip()] = value.strip()
+    except OSError:
+        pass
+    return values
+
+
+def settings_from_properties(workdir):
+    # {"host", "port", "password"} if the server has RCON enabled, otherwise None
+    values = read_properties(os.path.join(workdir, "server.properties"))
+    if values.get("enable-rcon", "false").lower() != "true" or not values.get("rcon.password"):
+        return None
+    try:
+        port = int(values.get("rcon.port", 25575))
+    except ValueError:
+        return None
+    return {"host": "127.0.0.1", "port": port, "password": values["rcon.password"]}
+
+
+class RconConnection:
+    # One authenticated RCON socket. Requests are pipelined: each command is
+    # followed by an empty packet of an unknown type, which the server answers
+    # only after the command's (possibly fragmented) reply, so the reader
+    # thread knows when a reply is complete and matches it by request id.
+    def __init__(self, host, port, password, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.lock = threading.Lock()
+        self.pending = {}  # request id -> [future, chunks]
+        self.terminators = {}  # terminator id -> request id
+        self.closed = False
+        self._ids = itertools.count(1)
+        self._authenticate(password)
+        self.sock.settimeout(None)
+        self.thread = threading.Thread(target=self._read_loop, name=f"rcon-{host}:{port}", daemon=True)
+        self.thread.start()
+
+    def _read_packet(self):
+        header = self._read_exactly(4)
+        length = struct.unpack("<i", header)[0]
+        if not 10 <= length <= MAX_PACKET:
+            raise RconError(f"bad packet length {length}")
+        data = self._read_exactly(length)
+        request_id, packet_type = struct.unpack("<ii", data[:8])
+        return request_id, packet_type, data[8:-2].decode("utf-8", errors="replace")
+
+    def _read_exactly(self, size):
+        data = b""
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("RCON connection closed")
+            data += chunk
+        return data
+
+    def _authenticate(self, password):
+        try:
+            self.sock.sendall(encode_packet(0, SERVERDATA_AUTH, password))
+            while True:
+                request_id, packet_type, _ = self._read_packet()
+                # Some servers send an empty RESPONSE_VALUE before the auth response
+                if packet_type == SERVERDATA_EXECCOMMAND:
+                    break
+        except (OSError, RconError):
+            self.sock.close()
+            raise
+        if request_id == -1:
+            self.sock.close()
+            raise RconAuthError("RCON password rejected")
+
+    def request(self, command):
+        future = Future()
+        body = command.encode("utf-8")
+        if len(body) > MAX_COMMAND_BYTES:
+            future.set_exception(RconError(f"command is longer than {MAX_COMMAND_BYTES} bytes"))
+            return future
+        with self.lock:
+            if self.closed:
+                future.set_exception(RconError("RCON connection closed"))
+                return future
+            request_id, terminator = next(self._ids), next(self._ids)
+            self.pending[request_id] = [future, []]
+            self.terminators[terminator] = request_id
+            try:
+                self.sock.sendall(encode_packet(request_id, SERVERDATA_EXECCOMMAND, command) +
+                                  encode_packet(terminator, SERVERDATA_RESPONSE_VALUE, ""))
+            except OSError as e:
+                self.pending.pop(request_id, None)
+                self.terminators.pop(terminator, None)
+                future.set_exception(RconError(str(e)))
+        return future
+
+    def in_flight(self):
+        return len(self.pending)
+
+    def _read_loop(self):
+        error = None
+        try:
+            while True:
+                request_id, _, body = self._read_packet()
+                with self.lock:
+                    if request_id in self.pending:
+                        self.pending[request_id][1].append(body)
+                        continue
+                    finished = self.pending.pop(self.terminators.pop(request_id, None), None)
+                if finished and not finished[0].done():
+                    future, chunks = finished
+                    future.set_result("".join(chunks))
+        except (OSError, RconError) as e:
+            error = e
+        finally:
+            self._fail(RconError(f"RCON connection lost: {error}"))
+
+    def _fail(self, error):
+        with self.lock:
+            self.closed = True
+            pending, self.pending = self.pending, {}
+            self.terminators = {}
+        for future, _ in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        self._fail(RconError("RCON connection closed"))
+
+
+class RconPool:
+    # A few connections to one server, opened on demand and replaced when they
+    # break. Failed connects back off so a server that is down isn't hammered.
+    def __init__(self, host, port, password, size=2, timeout=5.0, max_backoff=30.0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.size = size
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.connections = []
+        self.lock = threading.Lock()
+        self.closed = False
+        self._connecting = 0
+        self._backoff = 0
+        self._retry_at = 0
+
+    def _idle(self):
+        # A connection that can take a request right away; the caller holds the lock
+        self.connections = [conn for conn in self.connections if not conn.closed]
+        least_busy = min(self.connections, key=RconConnection.in_flight, default=None)
+        if least_busy is not None and (least_busy.in_flight() == 0
+                                       or len(self.connections) + self._connecting >= self.size):
+            return least_busy
+        return None
+
+    def _connection(self):
+        # May block for up to timeout while connecting, so never call it on the UI thread
+        with self.lock:
+            if self.closed:
+                raise RconError("RCON pool closed")
+            conn = self._idle()
+            if conn is not None:
+                return conn
+            least_busy = min(self.connections, key=RconConnection.in_flight, default=None)
+            if time.monotonic() < self._retry_at:
+                if least_busy is not None:
+                    return least_busy
+                raise RconError(f"RCON at {self.host}:{self.port} is unreachable, retrying later")
+            self._connecting += 1
+        # Connect and authenticate outside the lock, so requests on the open
+        # connections aren't held up by a slow or dead server
+        try:
+            conn = RconConnection(self.host, self.port, self.password, self.timeout)
+        except RconAuthError:
+            raise
+        except (OSError, RconError) as e:
+            with self.lock:
+                self._backoff = min(self.max_backoff, max(1.0, self._backoff * 2))
+                self._retry_at = time.monotonic() + self._backoff
+            if least_busy is not None and not least_busy.closed:
+                return least_busy
+            raise RconError(f"cannot connect to RCON at {self.host}:{self.port}: {e}")
+        finally:
+            with self.lock:
+                self._connecting -= 1
+        with self.lock:
+            if not self.closed:
+                self._backoff = 0
+                self.connections.append(conn)
+                return conn
+        conn.close()
+        raise RconError("RCON pool closed")
+
+    def request(self, command):
+        # Future resolving to the reply text. Never blocks: when a new
+        # connection is needed it is opened on a short-lived thread.
+        with self.lock:
+            conn = None if self.closed else self._idle()
+        if conn is not None:
+            return conn.request(command)
+        future = Future()
+        threading.Thread(target=self._connect_and_request, args=(command, future),
+                         name=f"rcon-connect-{self.host}:{self.port}", daemon=True).start()
+        return future
+
+    def _connect_and_request(self, command, future):
+        try:
+            reply = self._connection().request(command)
+        except RconError as e:
+            future.set_exception(e)
+            return
+
+        def forward(reply):
+            if reply.exception():
+                future.set_exception(reply.exception())
+            else:
+                future.set_result(reply.result())
+        reply.add_done_callback(forward)
+
+    def run(self, command, timeout=None):
+        return self.request(command).result(timeout or self.timeout)
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            connections, self.connections = self.connections, []
+        for conn in connections:
+            conn.close()
@@ -0,0 +1,184 @@
+import argparse
+import itertools
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+SECTOR = 4096
+HEADER = 2 * SECTOR  # 1024 locations, then 1024 timestamps
+REGION_RE = re.compile(r"^r\.(-?\d+)\.(-?\d+)\.mca$")
+ENTRIES = struct.Struct(">1024I")
+MIN_PARALLEL = 64  # below this many files a process pool costs more than it saves
+
+
+def scan_region(path):
+    # Reads just the header of one region file. Location entries are
+    # 3 bytes of sector offset and 1 byte of sector count; timestamps are
+    # seconds since the epoch of each chunk's last save.
+    match = REGION_RE.match(os.path.basename(path))
+    result = {"path": path, "x": int(match.group(1)) if match else None, "z": int(match.group(2)) if match else None,
+              "size": 0, "chunks": 0, "used_sectors": 0, "free_sectors": 0, "file_sectors": 0, "gaps": 0,
+              "overlaps": 0, "outside": 0, "invalid": 0, "oldest": None, "newest": None, "error": None}
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            result["size"] = size
+            result["file_sectors"] = -(-size // SECTOR)
+            if size == 0:
+                return result  # the server creates empty region files before writing to them
+            if size < HEADER:
+                result["error"] = "truncated header"
+                return result
+            with mmap.mmap(f.fileno(), HEADER, access=mmap.ACCESS_READ) as view:
+                locations = ENTRIES.unpack_from(view, 0)
+                timestamps = ENTRIES.unpack_from(view, SECTOR)
+    except (OSError, ValueError) as e:
+        result["error"] = str(e)
+        return result
+
+    # offset << 8 | count sorts by offset as it is, and filter/compress stay in C
+    stamps = list(filter(None, itertools.compress(timestamps, locations)))
+    file_sectors = result["file_sectors"]
+    position = 2
+    chunks = free = gaps = overlaps = outside = used = invalid = 0
+    for location in sorted(filter(None, locations)):
+        offset, count = location >> 8, location & 0xFF
+        if offset < 2 or count == 0:
+            invalid += 1
+            continue
+        chunks += 1
+        used += count
+        if offset > position:
+            gaps += 1
+            free += max(0, min(offset, file_sectors) - position)
+        elif offset < position:
+            overlaps += 1  # two chunks claim the same sectors: corruption
+        if offset + count > file_sectors:
+            outside += 1
+        if offset + count > position:
+            position = offset + count
+    if position < file_sectors:
+        free += file_sectors - position  # slack at the end, not a hole between chunks
+
+    result.update(chunks=chunks, used_sectors=used, free_sectors=free, gaps=gaps, overlaps=overlaps,
+                  outside=outside, invalid=invalid, oldest=min(stamps) if stamps else None, newest=max(stamps) if stamps else None)
+    return result
+
+
+def fragmentation(result):
+    # Share of the file's chunk area that holds no chunk
+    area = result["file_sectors"] - 2
+    return result["free_sectors"] / area if area > 0 else 0.0
+
+
+def find_regions(paths, folders=("region",)):
+    # Region files under every folder called region/ (or the given names),
+    # anywhere below the world paths, so the nether and end are found too
+    files = []
+    for root in paths:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            if os.path.basename(dirpath) in folders:
+                files.extend(os.path.join(dirpath, name) for name in sorted(filenames) if REGION_RE.match(name))
+    return files
+
+
+def map_files(func, items, workers=None):
+    # func(item) for every item, in order. func has to be a module-level
+    # function so the pool can pickle it.
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(items) < MIN_PARALLEL:
+        return [func(item) for item in items]
+    # Batches keep the pickling overhead per file small
+    chunksize = max(1, len(items) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, items, chunksize=chunksize))
+
+
+def scan_files(files, workers=None):
+    return map_files(scan_region, files, workers)
+
+
+def summarize(results):
+    # Totals per dimension, keyed by the folder that holds region/
+    dimensions = {}
+    for result in results:
+        key = os.path.dirname(os.path.dirname(result["path"]))
+        total = dimensions.setdefault(key, {"regions": 0, "chunks": 0, "size": 0, "free_sectors": 0,
+                                            "file_sectors": 0, "damaged": 0, "oldest": None, "newest": None})
+        total["regions"] += 1
+        total["chunks"] += result["chunks"]
+        total["size"] += result["size"]
+        total["free_sectors"] += result["free_sectors"]
+        total["file_sectors"] += result["file_sectors"]
+        total["damaged"] += bool(result["error"] or result["overlaps"] or result["outside"] or result["invalid"])
+        for field, pick in (("oldest", min), ("newest", max)):
+            if result[field] is not None:
+                total[field] = result[field] if total[field] is None else pick(total[field], result[field])
+    return dimensions
+
+
+def format_time(stamp):
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(stamp)) if stamp else "-"
+
+
+def format_report(results, elapsed=None, top=10):
+    lines = []
+    for key, total in sorted(summarize(results).items()):
+        area = total["file_sectors"] - 2 * total["regions"]
+        wasted = total["free_sectors"] / area * 100 if area > 0 else 0.0
+        lines.append(f"{key}")
+        lines.append(f"  {total['regions']} regions, {total['chunks']} chunks, {total['size'] / 1048576:.1f} MB, "
+                     f"{total['free_sectors'] * SECTOR / 1048576:.1f} MB free inside files ({wasted:.1f}%)")
+        lines.append(f"  chunks saved {format_time(total['oldest'])} .. {format_time(total['newest'])}"
+                     + (f", {total['damaged']} damaged regions" if total["damaged"] else ""))
+
+    worst = sorted((result for result in results if result["chunks"]), key=fragmentation, reverse=True)[:top]
+    if worst:
+        lines.append("")
+        lines.append("Most fragmented regions:")
+        for result in worst:
+            lines.append(f"  {result['path']}: {fragmentation(result) * 100:.0f}% free, "
+                         f"{result['gaps']} holes, {result['chunks']} chunks, "
+                         f"saved {format_time(result['oldest'])} .. {format_time(result['newest'])}")
+    damaged = [result for result in results if result["error"] or result["overlaps"] or result["outside"]
+               or result["invalid"]]
+    if damaged:
+        lines.append("")
+        lines.append("Damaged regions:")
+        for result in damaged:
+            problem = result["error"] or (f"{result['overlaps']} overlapping, {result['outside']} past the end, "
+                                          f"{result['invalid']} invalid entries")
+            lines.append(f"  {result['path']}: {problem}")
+    if elapsed is not None:
+        lines.append("")
+        lines.append(f"Scanned {len(results)} region files in {elapsed:.2f}s")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chunk counts, sector usage and fragmentation of region files")
+    parser.add_argument("worlds", nargs="+", help="world folders (or any folder above them)")
+    parser.add_argument("--workers", type=int, default=None, help="processes to use (default: one per CPU)")
+    parser.add_argument("--folders", default="region", help="comma separated folder names, e.g. region,entities,poi")
+    parser.add_argument("--top", type=int, default=10, help="how many fragmented regions to list")
+    parser.add_argument("--json", action="store_true", help="print every region as JSON instead")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    results = scan_files(find_regions(args.worlds, tuple(args.folders.split(","))), args.workers)
+    elapsed = time.perf_counter() - started
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        print(format_report(results, elapsed, args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import random
+import time
+from collections import deque
+
+RESTART = "restart"
+IMMEDIATE = "immediate"
+STOP = "stop"
+CRASH_LOOP = "crash_loop"
+
+
+class RestartPolicy:
+    # Decides what to do when a server process exits. Delays grow
+    # exponentially (with jitter) while the server keeps dying young, and after
+    # max_restarts inside window seconds we call it a crash loop and give up.
+    def __init__(self, enabled=True, base_delay=5, max_delay=300, multiplier=2.0, jitter=0.2,
+                 max_restarts=5, window=600, stable_after=300, exit_rules=None):
+        self.enabled = enabled
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.max_restarts = max_restarts
+        self.window = window
+        self.stable_after = stable_after
+        # exit code -> RESTART / IMMEDIATE / STOP; 0 is a clean "stop" from the console
+        rules = {0: STOP}
+        rules.update({int(code): action for code, action in (exit_rules or {}).items()})
+        self.exit_rules = rules
+        self.attempt = 0
+        self.history = deque()
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**(data or {}))
+
+    def to_dict(self):
+        return {
+            "enabled": self.enabled,
+            "base_delay": self.base_delay,
+            "max_delay": self.max_delay,
+            "multiplier": self.multiplier,
+            "jitter": self.jitter,
+            "max_restarts": self.max_restarts,
+            "window": self.window,
+            "stable_after": self.stable_after,
+            "exit_rules": {str(code): action for code, action in self.exit_rules.items()},
+        }
+
+    def reset(self):
+        self.attempt = 0
+        self.history.clear()
+
+    def decide(self, exit_code, uptime, now=None):
+        # Returns (action, delay in seconds)
+        now = time.monotonic() if now is None else now
+        rule = self.exit_rules.get(exit_code, RESTART)
+        if not self.enabled or rule == STOP:
+            return STOP, 0
+
+        if uptime >= self.stable_after:
+            self.attempt = 0  # it ran fine for a while, start the backoff over
+        while self.history and now - self.history[0] > self.window:
+            self.history.popleft()
+        if len(self.history) >= self.max_restarts:
+            return CRASH_LOOP, 0
+
+        if rule == IMMEDIATE:
+            delay = 0
+        else:
+            delay = min(self.max_delay, self.base_delay * self.multiplier ** self.attempt)
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        self.attempt += 1
+        self.history.append(now)
+        return RESTART, max(0, delay)
@@ -0,0 +1,239 @@
+import re
+import threading
+import time
+from collections import Counter, deque, namedtuple
+
+from TickMonitor import COLOR_RE
+
+JOIN = "join"
+LEAVE = "leave"
+CHAT = "chat"
+DEATH = "death"
+COMMAND = "command"
+ADVANCEMENT = "advancement"
+WARN = "warn"
+ERROR = "error"
+
+Event = namedtuple("Event", "time kind player text level")
+
+# One header regex for every flavour:
+#   Vanilla/Fabric  [12:00:00] [Server thread/INFO]: msg
+#   Paper/Spigot    [12:00:00 INFO]: msg
+#   Forge           [18Oct2026 12:00:00.123] [Server thread/INFO] [minecraft/DedicatedServer]: msg
+#   Fabric (some)   [12:00:00] [Server thread/INFO] (Minecraft) msg
+#   PocketMine      [12:00:00.123] [Server thread/WARNING]: msg
+HEADER_RE = re.compile(r"^\[[^\]]*?(?: (?P<level>[A-Z]+))?\](?: \[[^\]/]*/(?P<thread_level>[A-Z]+)\])?"
+                       r"(?: \[[^\]]*\]| \([^)]*\))?:? (?P<message>.*)$")
+LEVELS = {"WARN": WARN, "WARNING": WARN, "ERROR": ERROR, "FATAL": ERROR, "CRITICAL": ERROR,
+          "EMERGENCY": ERROR, "ALERT": ERROR}
+PLAYER_RE = re.compile(r"^[A-Za-z0-9_.]{1,16}$")  # Bedrock names may contain spaces, but not in PocketMine logs
+
+# Openings of the vanilla death messages, keyed by the word after the player
+# name ("Steve was slain by Zombie", "Steve fell from a high place"). Only
+# these phrasings count, so "Server was unable to bind to port" is no death.
+DEATH_PHRASES = {
+    "was": ("slain by", "shot by", "fireballed by", "pummeled by", "killed", "blown up by", "squashed by",
+            "squished too much", "pricked to death", "impaled", "stung to death", "skewered by",
+            "poked to death", "struck by lightning", "frozen to death", "obliterated by",
+            "roasted in dragon's breath", "burned to a crisp", "burnt to a crisp", "doomed to fall",
+            "knocked into the void", "finished off by"),
+    "walked": ("into fire", "into a cactus", "into danger zone", "into the danger zone"),
+    "drowned": ("",),
+    "experienced": ("kinetic energy",),
+    "blew": ("up",),
+    "hit": ("the ground too hard",),
+    "fell": ("from a high place", "off", "out of the world", "while climbing", "too far", "into"),
+    "went": ("up in flames", "off with a bang"),
+    "burned": ("to death",),
+    "tried": ("to swim in lava",),
+    "died": ("",),
+    "suffocated": ("in a wall",),
+    "starved": ("to death",),
+    "froze": ("to death",),
+    "discovered": ("the floor was lava",),
+    "withered": ("away",),
+    "left": ("the confines of this world",),
+    "didn't": ("want to live in the same world as",),
+    "got": ("finished off by",),
+}
+
+
+class Rule:
+    # key is either the first character of the message ("<", "[") or the word
+    # that follows the player name ("joined", "was", ...). Only the rules
+    # registered under a line's key are ever tried.
+    def __init__(self, kind, key, pattern):
+        self.kind = kind
+        self.key = key
+        self.regex = re.compile(pattern)
+
+
+def verb_rules(kind, verbs, pattern):
+    return [Rule(kind, verb, pattern) for verb in verbs]
+
+
+def phrase_rule(kind, verb, phrases):
+    # verb followed by one of the phrases as whole words; an empty phrase
+    # accepts the verb on its own ("Steve drowned")
+    alternatives = "|".join(" " + re.escape(phrase) if phrase else "" for phrase in phrases)
+    return Rule(kind, verb, r"^(?P<text>" + re.escape(verb) + "(?:" + alternatives + r")(?: .*)?)$")
+
+
+# Rules keyed by a verb match the text after "<player> "; rules keyed by a
+# first character match the whole message and name the player group.
+CHAT_RULES = [
+    Rule(CHAT, "<", r"^<(?P<player>[^>]{1,32})> (?P<text>.*)$"),
+    Rule(CHAT, "[", r"^\[Not Secure\] <(?P<player>[^>]{1,32})> (?P<text>.*)$"),
+    Rule(CHAT, "[", r"^\[(?P<player>Server|Rcon)\] (?P<text>.*)$"),
+]
+SESSION_RULES = [
+    Rule(JOIN, "joined", r"^joined the game$"),
+    Rule(LEAVE, "left", r"^left the game$"),
+    Rule(LEAVE, "lost", r"^lost connection: (?P<text>.*)$"),
+]
+FEEDBACK_RULES = [
+    # Operator command feedback broadcast to the console: "[Steve: Set the time to 1000]"
+    Rule(COMMAND, "[", r"^\[(?P<player>[A-Za-z0-9_]{1,16}): (?P<text>.*)\]$"),
+]
+ISSUED_RULES = [
+    # Bukkit-style command log: "Steve issued server command: /tp Alex"
+    Rule(COMMAND, "issued", r"^issued server command: (?P<text>.*)$"),
+]
+ADVANCEMENT_RULES = verb_rules(ADVANCEMENT, ["has"],
+                               r"^has (?:made the advancement|completed the challenge|reached the goal) "
+                               r"\[(?P<text>.*)\]$")
+DEATH_RULES = [phrase_rule(DEATH, verb, phrases) for verb, phrases in DEATH_PHRASES.items()]
+
+VANILLA = CHAT_RULES + SESSION_RULES + FEEDBACK_RULES + ADVANCEMENT_RULES + DEATH_RULES
+PAPER = CHAT_RULES + SESSION_RULES + ISSUED_RULES + FEEDBACK_RULES + ADVANCEMENT_RULES + DEATH_RULES
+
+# Keys match the server types offered by the launcher
+RULE_PACKS = {
+    "Vanilla": VANILLA,
+    "Paper": PAPER,
+    "Fabric": VANILLA,
+    "Forge": VANILLA,
+    "Pocket Edition (PHP)": CHAT_RULES + SESSION_RULES + ISSUED_RULES + DEATH_RULES,
+    "Custom (Browse)": PAPER,  # a custom jar is most often Paper or a fork; PAPER is a superset of VANILLA
+}
+
+
+class EventExtractor:
+    # Turns raw console lines into Events. The rules are compiled once per
+    # pack and grouped by dispatch key, so a typical line costs one header
+    # match, a dict lookup and at most a couple of anchored regexes.
+    def __init__(self, pack="Vanilla"):
+        self.pack = pack
+        self.by_first = {}
+        self.by_verb = {}
+        for rule in RULE_PACKS.get(pack, PAPER):
+            table = self.by_first if len(rule.key) == 1 and not rule.key.isalnum() else self.by_verb
+            table.setdefault(rule.key, []).append(rule)
+
+    def classify(self, line):
+        if "\x1b" in line or "§" in line:
+            line = COLOR_RE.sub("", line)
+        header = HEADER_RE.match(line.rstrip("\r\n"))
+        if not header:
+            return None  # stack trace lines and other continuations
+        level = header.group("level") or header.group("thread_level") or "INFO"
+        message = header.group("message")
+
+        if message:
+            for rule in self.by_first.get(message[0], ()):
+                match = rule.regex.match(message)
+                if match:
+                    return Event(time.time(), rule.kind, match.group("player"), match.group("text"), level)
+
+            player, _, rest = message.partition(" ")
+            verb = rest.split(" ", 1)[0]
+            if verb in self.by_verb and PLAYER_RE.match(player):
+                for rule in self.by_verb[verb]:
+                    match = rule.regex.match(rest)
+                    if match:
+                        text = match.groupdict().get("text")
+                        return Event(time.time(), rule.kind, player, text, level)
+
+        kind = LEVELS.get(level)
+        if kind:
+            return Event(time.time(), kind, None, message, level)
+        return None
+
+
+class EventFeed:
+    # Classifies an instance's output on its own thread, keeps the recent
+    # events, per-kind counts and the online player list, and hands every
+    # event to the listeners as listener(instance, event).
+    def __init__(self, instance, history=1000):
+        self.instance = instance
+        self.extractor = EventExtractor(instance.server_type)
+        self.recent = deque(maxlen=history)
+        self.counts = Counter()
+        self.players = set()
+        self.listeners = []
+        self.lock = threading.Lock()
+        self._subscription = instance.bus.subscribe("events", maxlen=20000)
+        self._thread = threading.Thread(target=self._run, name=f"events-{instance.name}", daemon=True)
+        self._thread.start()
+
+    def add_listener(self, func):
+        self.listeners.append(func)
+
+    def remove_listener(self, func):
+        if func in self.listeners:
+            self.listeners.remove(func)
+
+    def reset(self):
+        # A fresh server process has nobody online
+        with self.lock:
+            self.players.clear()
+            self.counts.clear()
+
+    def _run(self):
+        while True:
+            lines = self._subscription.get(timeout=1.0, limit=2000)
+            if lines is None:
+                break
+            if self.extractor.pack != self.instance.server_type:
+                self.extractor = EventExtractor(self.instance.server_type)
+            classify = self.extractor.classify
+            events = [event for event in map(classify, lines) if event]
+            if events:
+                self.dispatch(events)
+
+    def dispatch(self, events):
+        with self.lock:
+            for event in events:
+                self.counts[event.kind] += 1
+                if event.kind == JOIN:
+                    self.players.add(event.player)
+                elif event.kind == LEAVE:
+                    self.players.discard(event.player)
+            self.recent.extend(events)
+        for event in events:
+            for listener in list(self.listeners):
+                try:
+                    listener(self.instance, event)
+                except Exception:
+                    pass  # a broken listener must not stop the feed
+
+    def online(self):
+        with self.lock:
+            return sorted(self.players)
+
+    def events(self, kinds=None, limit=100):
+        with self.lock:
+            events = [event for event in self.recent if kinds is None or event.kind in kinds]
+        return events[-limit:]
+
+    def summary(self):
+        players = self.online()
+        parts = [f"👥 {len(players)} online"]
+        if self.counts[WARN]:
+            parts.append(f"⚠ {self.counts[WARN]}")
+        if self.counts[ERROR]:
+            parts.append(f"❌ {self.counts[ERROR]}")
+        return "  ".join(parts)
+
+    def close(self):
+        self._subscription.close()
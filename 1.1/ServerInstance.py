@@ -0,0 +1,381 @@
+import io
+import os
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import Future
+from ConsoleArchive import ConsoleArchive
+from OutputBus import OutputBus, BLOCK
+from OutputReader import ChunkedLineReader, Throughput
+from RestartPolicy import RestartPolicy, RESTART, CRASH_LOOP
+from JvmProfiles import DEFAULT_PROFILES, load_profiles
+from TickMonitor import TickMonitor
+from ProcSampler import ProcSampler
+from GcLog import GcLogAnalyzer, GC_LOG_FLAG, GC_LOG_PATH
+from ServerEvents import EventFeed
+from CommandChannel import CommandChannel, Response
+from Rcon import RconPool, settings_from_properties
+from WorldBackup import WorldBackup
+from Pregen import PregenScheduler
+
+NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+
+# Lines that tell us the server accepted "stop" and is shutting down
+SHUTDOWN_MARKERS = ("Stopping server", "Stopping the server", "Saving worlds", "Saving chunks",
+                    "All dimensions are saved", "Server stopped")
+
+
+def build_command(jar_file, xms, xmx, jvm_profile, gc_log=False):
+    if jar_file.endswith(".phar"):
+        return ["php", jar_file]
+    gc_flags = [GC_LOG_FLAG] if gc_log else []
+    return ["java", *jvm_profile.flags(xms, xmx), *gc_flags, "-jar", jar_file, "nogui"]
+
+
+class ServerInstance:
+    # One server: its own working directory, process, reader thread, output bus
+    # and console archive. Nothing in here touches Tk; launcher messages go out
+    # through on_message(instance, text).
+    def __init__(self, name, server_type, jar_file, workdir, xms=1024, xmx=2048, reader_mode="chunked",
+                 restart_policy=None, stop_deadline=60, terminate_deadline=15, jvm_profile=None, tick_interval=15,
+                 sample_interval=2.0, gc_log=False, command_channel="stdin", rcon=None, backup=None,
+                 pregen=None):
+        self.name = name
+        self.server_type = server_type
+        self.jar_file = jar_file
+        self.workdir = workdir
+        self.xms = xms
+        self.xmx = xmx
+        self.reader_mode = reader_mode
+        self.jvm_profile = jvm_profile or DEFAULT_PROFILES["default"]
+        if not isinstance(restart_policy, RestartPolicy):
+            restart_policy = RestartPolicy.from_dict(restart_policy)
+        self.restart_policy = restart_policy
+        self.stop_deadline = stop_deadline  # seconds to wait for "stop" before SIGTERM
+        self.terminate_deadline = terminate_deadline  # seconds after SIGTERM before SIGKILL
+        self.on_message = None
+
+        os.makedirs(workdir, exist_ok=True)
+        self.bus = OutputBus()
+        self.throughput = Throughput()
+        self.archive = ConsoleArchive(os.path.join(workdir, "console-logs"),
+                                      self.bus.subscribe("archive", maxlen=50000, policy=BLOCK))
+        self.tick_monitor = TickMonitor(self, interval=tick_interval)
+        self.sampler = ProcSampler(self, interval=sample_interval)
+        self.gc_logging = gc_log
+        self.gc_log = GcLogAnalyzer(os.path.join(workdir, GC_LOG_PATH))
+        self.events = EventFeed(self)
+        self.send_lock = threading.RLock()
+        self.commands = CommandChannel(self)
+        self.command_channel = command_channel  # "stdin", "rcon" or "auto" (RCON when we didn't start it)
+        self.rcon_settings = rcon  # {"host", "port", "password"}; None reads server.properties
+        self.rcon = None
+        self.backups = WorldBackup(self, **(backup or {}))
+        self.pregen = PregenScheduler(self, **(pregen or {}))
+        self.process = None
+        self.thread = None
+        self.stop_requested = False
+        self.stop_stage = None
+        self.stopper = None
+        self._wake = threading.Event()
+        self._escalate = threading.Event()
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "server_type": self.server_type,
+            "jar_file": self.jar_file,
+            "workdir": self.workdir,
+            "xms": self.xms,
+            "xmx": self.xmx,
+            "reader_mode": self.reader_mode,
+            "jvm_profile": self.jvm_profile.name,
+            "tick_interval": self.tick_monitor.interval,
+            "sample_interval": self.sampler.interval,
+            "gc_log": self.gc_logging,
+            "command_channel": self.command_channel,
+            "rcon": self.rcon_settings,
+            "backup": self.backups.to_dict(),
+            "pregen": self.pregen.to_dict(),
+            "restart_policy": self.restart_policy.to_dict(),
+            "stop_deadline": self.stop_deadline,
+            "terminate_deadline": self.terminate_deadline,
+        }
+
+    def log(self, message):
+        if self.on_message:
+            self.on_message(self, message)
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def is_active(self):
+        # Running, or waiting to be restarted
+        return self.thread is not None and self.thread.is_alive()
+
+    def build_command(self):
+        return build_command(self.jar_file, self.xms, self.xmx, self.jvm_profile, self.uses_gc_log())
+
+    def uses_gc_log(self):
+        return self.gc_logging and not self.jar_file.endswith(".phar")
+
+    def start(self):
+        if self.is_active():
+            self.log("⚠ Server is already running.\n")
+            return False
+        self.stop_requested = False
+        self.stop_stage = None
+        self._wake.clear()
+        self._escalate.clear()
+        self.restart_policy.reset()
+        self.thread = threading.Thread(target=self._run, name=f"server-{self.name}", daemon=True)
+        self.thread.start()
+        return True
+
+    def _run(self):
+        # Supervisor loop: runs on the instance thread, never on the Tk thread
+        while True:
+            started = time.monotonic()
+            return_code = self._run_once()
+            if return_code is None or self.stop_requested:
+                break
+            if return_code == 0:
+                self.log("\n✔ Server stopped gracefully.\n")
+            else:
+                self.log(f"\n⚠ Server crashed (exit code {return_code}).\n")
+
+            action, delay = self.restart_policy.decide(return_code, time.monotonic() - started)
+            if action == CRASH_LOOP:
+                policy = self.restart_policy
+                self.log(f"🛑 Crash loop: {policy.max_restarts} restarts within {policy.window}s, not restarting.\n")
+                break
+            if action != RESTART:
+                break
+            self.log(f"⏳ Restarting in {delay:.1f}s (attempt {self.restart_policy.attempt})...\n")
+            # stop() sets the event, so a pending restart can be cancelled
+            if self._wake.wait(delay) or self.stop_requested:
+                self.log("✔ Restart cancelled.\n")
+                break
+
+    def _run_once(self):
+        cmd = self.build_command()
+        self.log(f"\n▶ Starting server with command: {' '.join(cmd)}\n")
+        chunked = self.reader_mode == "chunked"
+        if self.uses_gc_log():
+            os.makedirs(os.path.dirname(self.gc_log.path), exist_ok=True)
+        try:
+            self.process = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                stdin=subprocess.PIPE,
+                universal_newlines=not chunked,
+                bufsize=0 if chunked else 1,
+                cwd=self.workdir
+            )
+            self.events.reset()
+            self.commands.reset()
+            self.tick_monitor.start()
+            self.sampler.start()
+            if self.uses_gc_log():
+                self.gc_log.start()
+            for batch in self.read_output(chunked):
+                self.bus.publish(batch)
+            self.process.stdout.close()
+            return self.process.wait()
+        except Exception as e:
+            self.log(f"❌ Failed to start server: {str(e)}\n")
+            return None
+
+    def read_output(self, chunked):
+        if chunked:
+            yield from ChunkedLineReader(self.process.stdout, throughput=self.throughput)
+        else:
+            for line in self.process.stdout:
+                self.throughput.add(1, len(line))
+                yield [line]
+
+    def send(self, command):
+        if not self.is_running() or not self.process.stdin:
+            raise RuntimeError(f"{self.name} is not running")
+        stdin = self.process.stdin
+        text = command + "\n"
+        with self.send_lock:
+            stdin.write(text if isinstance(stdin, io.TextIOBase) else text.encode("utf-8"))
+            stdin.flush()
+
+    def request(self, command, timeout=None, quiet=False):
+        # Future resolving to a CommandChannel.Response with the command's output.
+        # quiet keeps the output off the console (RCON replies never reach it).
+        if self.uses_rcon():
+            return self.rcon_request(command, timeout)
+        return self.commands.request(command, timeout, quiet)
+
+    def rcon_pool(self):
+        settings = self.rcon_settings or settings_from_properties(self.workdir)
+        if settings is None:
+            return None
+        key = (settings.get("host", "127.0.0.1"), int(settings.get("port", 25575)), settings["password"])
+        if self.rcon is None or (self.rcon.host, self.rcon.port, self.rcon.password) != key:
+            if self.rcon:
+                self.rcon.close()
+            self.rcon = RconPool(*key)
+        return self.rcon
+
+    def uses_rcon(self):
+        if self.command_channel == "rcon":
+            return True
+        # "auto": a server started outside the launcher can still be reached over RCON
+        return self.command_channel == "auto" and not self.is_running() and self.rcon_pool() is not None
+
+    def rcon_request(self, command, timeout=None):
+        result = Future()
+        pool = self.rcon_pool()
+        if pool is None:
+            result.set_exception(RuntimeError(f"RCON is not enabled in {self.name}'s server.properties"))
+            return result
+
+        def done(reply):
+            if result.done():
+                return
+            if reply.exception():
+                result.set_exception(reply.exception())
+            else:
+                result.set_result(Response(command, reply.result().splitlines(), True))
+
+        def expire():
+            if not result.done():
+                result.set_result(Response(command, [], False))
+
+        timer = threading.Timer(timeout or pool.timeout, expire)
+        timer.daemon = True
+        timer.start()
+        result.add_done_callback(lambda _: timer.cancel())
+        pool.request(command).add_done_callback(done)
+        return result
+
+    def stop(self, on_progress=None, wait=False, force=False):
+        # Never blocks unless wait=True: the stop sequence runs on its own thread.
+        # force=True while a stop is in progress skips straight to SIGTERM.
+        self.stop_requested = True
+        self._wake.set()
+        self.tick_monitor.stop()
+        self.sampler.stop()
+        self.gc_log.stop()
+        if not self.is_running():
+            return False
+        if self.stopper and self.stopper.is_alive():
+            if force:
+                self._escalate.set()
+        else:
+            self._escalate.clear()
+            self.stopper = threading.Thread(target=self._stop_sequence, args=(on_progress,),
+                                            name=f"stop-{self.name}", daemon=True)
+            self.stopper.start()
+        if wait:
+            self.stopper.join()
+        return True
+
+    def _stop_sequence(self, on_progress):
+        process = self.process
+
+        def progress(stage, message):
+            self.stop_stage = stage
+            self.log(message)
+            if on_progress:
+                try:
+                    on_progress(self, stage)
+                except Exception as e:
+                    # A broken UI callback must never keep the server running
+                    self.log(f"⚠ Stop progress callback failed: {str(e)}\n")
+
+        watch = self.bus.subscribe("stop-watch", maxlen=1000)
+        try:
+            progress("saving", "💾 Saving worlds and sending stop...\n")
+            try:
+                self.send("save-all")
+                self.send("stop")
+            except Exception as e:
+                self.log(f"❌ Could not send stop: {str(e)}\n")
+                self._escalate.set()
+
+            deadline = time.monotonic() + self.stop_deadline
+            announced = False
+            while process.poll() is None and time.monotonic() < deadline and not self._escalate.is_set():
+                lines = watch.get(timeout=0.5)
+                if lines and not announced and any(marker in line for line in lines for marker in SHUTDOWN_MARKERS):
+                    announced = True
+                    progress("shutting_down", "⏳ Server is shutting down...\n")
+        finally:
+            watch.close()
+
+        if process.poll() is None:
+            progress("terminating", "⚠ Server did not stop in time, sending SIGTERM...\n")
+            process.terminate()
+            try:
+                process.wait(self.terminate_deadline)
+            except subprocess.TimeoutExpired:
+                progress("killing", "☠ Server ignored SIGTERM, killing it...\n")
+                process.kill()
+                process.wait()
+        progress("stopped", f"✔ Server stopped (exit code {process.returncode}).\n")
+
+    def close(self):
+        self.events.close()
+        self.archive.close()
+        if self.rcon:
+            self.rcon.close()
+
+
+class InstanceManager:
+    def __init__(self, base_dir, jvm_profiles=None):
+        self.base_dir = base_dir
+        self.jvm_profiles = jvm_profiles or load_profiles()
+        self.instances = {}
+
+    def create(self, name, server_type, jar_file, workdir=None, **settings):
+        if not NAME_RE.match(name or ""):
+            raise ValueError("Instance names may only use letters, digits, '-' and '_'.")
+        if name in self.instances:
+            raise ValueError(f"An instance called '{name}' already exists.")
+        workdir = workdir or os.path.join(self.base_dir, "instances", name)
+        if isinstance(settings.get("jvm_profile"), str):
+            settings["jvm_profile"] = self.jvm_profiles.get(settings["jvm_profile"])
+        instance = ServerInstance(name, server_type, os.path.abspath(jar_file), workdir, **settings)
+        self.instances[name] = instance
+        return instance
+
+    def remove(self, name):
+        instance = self.instances[name]
+        if instance.is_running():
+            raise ValueError(f"Stop '{name}' before removing it.")
+        instance.close()
+        del self.instances[name]
+
+    def get(self, name):
+        return self.instances.get(name)
+
+    def running(self):
+        return [instance for instance in self.instances.values() if instance.is_running()]
+
+    def stop_all(self, wait=False):
+        stopping = []
+        for instance in self.instances.values():
+            if not instance.is_active():
+                continue
+            try:
+                if instance.stop():
+                    stopping.append(instance)
+            except Exception as e:
+                instance.log(f"❌ Error stopping server: {str(e)}\n")
+        if wait:
+            for instance in stopping:
+                instance.stopper.join()
+
+    def close(self):
+        for instance in self.instances.values():
+            instance.close()
+
+    def to_config(self):
+        return [instance.to_dict() for instance in self.instances.values()]
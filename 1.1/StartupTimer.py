@@ -0,0 +1,104 @@
+import json
+import os
+import statistics
+import sys
+import time
+
+HISTORY = 50  # launches kept in the timing file
+REGRESSION = 1.25  # warn when a launch is 25% slower than the median of earlier ones
+MIN_SAMPLES = 5
+CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def process_age():
+    # Seconds since this process was created, where /proc can tell (Linux).
+    # Covers interpreter startup and, when frozen, the bootloader.
+    try:
+        with open("/proc/self/stat", "rb") as f:
+            data = f.read()
+        start_ticks = int(data[data.rindex(b")") + 2:].split()[19])
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return max(0.0, uptime - start_ticks / CLK_TCK)
+
+
+def build_kind():
+    if not getattr(sys, "frozen", False):
+        return "source"
+    # A one-file build unpacks itself to a fresh _MEIxxxxxx temp dir on every launch
+    return "onefile" if os.path.basename(getattr(sys, "_MEIPASS", "")).startswith("_MEI") else "onedir"
+
+
+class StartupTimer:
+    # Wall-clock marks from the moment the launcher module starts executing.
+    # Create it before the heavy imports. report() appends the launch to a
+    # JSON-lines file and compares it with earlier launches of the same build.
+    def __init__(self):
+        self.started = time.perf_counter()
+        age = process_age()
+        self.before_module = age * 1000 if age is not None else None
+        self.marks = {}
+        self.spans = {}
+        self.regressed = False
+
+    def elapsed(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def mark(self, name):
+        self.marks[name] = self.elapsed()
+
+    def span(self, name, started):
+        # started is an elapsed() value taken before the work
+        self.spans[name] = self.elapsed() - started
+
+    def total(self):
+        return (self.before_module or 0) + self.marks.get("first_paint", self.elapsed())
+
+    def entry(self):
+        entry = {"time": time.time(), "build": build_kind(), "total_ms": round(self.total(), 1)}
+        if self.before_module is not None:
+            entry["before_module_ms"] = round(self.before_module, 1)
+        entry.update({f"{name}_ms": round(value, 1) for name, value in self.marks.items()})
+        entry.update({f"{name}_ms": round(value, 1) for name, value in self.spans.items()})
+        return entry
+
+    def report(self, path):
+        # Returns the log lines for this launch
+        entry = self.entry()
+        history = []
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        history.append(json.loads(line))
+                    except ValueError:
+                        pass
+        except OSError:
+            pass
+
+        parts = [f"imports {self.marks.get('imports', 0):.0f}"]
+        if "config" in self.spans:
+            parts.append(f"config {self.spans['config']:.0f}")
+        if self.before_module is not None:
+            parts.append(f"before Python code {self.before_module:.0f}")
+        lines = [f"⏱ Started in {entry['total_ms']:.0f} ms ({', '.join(parts)}; {entry['build']})\n"]
+
+        earlier = [item["total_ms"] for item in history
+                   if item.get("build") == entry["build"] and "total_ms" in item]
+        if len(earlier) >= MIN_SAMPLES:
+            usual = statistics.median(earlier)
+            if entry["total_ms"] > usual * REGRESSION:
+                self.regressed = True
+                lines.append(f"⚠ Startup is slower than usual ({entry['total_ms']:.0f} ms vs a median of "
+                             f"{usual:.0f} ms over {len(earlier)} launches)\n")
+
+        history.append(entry)
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                for item in history[-HISTORY:]:
+                    f.write(json.dumps(item) + "\n")
+        except OSError:
+            pass
+        return lines
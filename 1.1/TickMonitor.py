@@ -0,0 +1,141 @@
+import re
+import statistics
+import threading
+import time
+from collections import deque
+
+COLOR_RE = re.compile(r"\x1b\[[0-9;]*m|§.")
+
+# Paper / Spigot
+TPS_RE = re.compile(r"TPS from last 1m, 5m, 15m: \*?([\d.]+), \*?([\d.]+), \*?([\d.]+)")
+MSPT_HEADER_RE = re.compile(r"Server tick times \(avg/min/max\)")
+MSPT_RE = re.compile(r"([\d.]+)/([\d.]+)/([\d.]+), ([\d.]+)/([\d.]+)/([\d.]+), ([\d.]+)/([\d.]+)/([\d.]+)")
+# Vanilla 1.20.3+ "tick query"
+VANILLA_TICK_RE = re.compile(r"Average time per tick: ([\d.]+)ms")
+# PocketMine "status"
+PM_TPS_RE = re.compile(r"Current TPS: ([\d.]+)")
+UNKNOWN_RE = re.compile(r"Unknown or incomplete command|Unknown command|<--\[HERE\]")
+
+PROBES = {
+    "paper": ["tps", "mspt"],
+    "vanilla": ["tick query"],
+    "pocketmine": ["status"],
+}
+
+
+class TickMonitor:
+    # Polls the server for tick health through the instance's command channel
+    # (stdin markers or RCON), so every answer is matched to its probe and
+    # quiet requests keep the probes off the console.
+    def __init__(self, instance, interval=15, history=240, flavour=None, response_window=2.0):
+        self.instance = instance
+        self.interval = interval
+        self.flavour = flavour or ("pocketmine" if instance.server_type == "Pocket Edition (PHP)" else None)
+        self.response_window = response_window  # seconds to wait for each probe's answer
+        self.history = deque(maxlen=history)  # (time, tps, mspt)
+        self.tps = None
+        self.mspt = None
+        self.mspt_max = None
+        self.lock = threading.Lock()  # the tick thread and the pre-generator both probe
+        self._expect_mspt = False
+        self._thread = None
+        self._wake = threading.Event()
+
+    def start(self):
+        if self.interval and (self._thread is None or not self._thread.is_alive()):
+            self._wake.clear()
+            self._thread = threading.Thread(target=self._run, name=f"ticks-{self.instance.name}", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._wake.set()
+
+    def _run(self):
+        # Give the server time to finish loading before the first probe
+        while not self._wake.wait(self.interval):
+            if not self.instance.is_running():
+                break
+            self.probe()
+
+    def probe(self):
+        # Asks and waits for the answers (up to response_window per command);
+        # returns the latest MSPT, None if the server never reported one
+        with self.lock:
+            asked = set()
+            while True:
+                # Unknown flavour: try Paper's "tps" first, its answer tells what to ask next
+                commands = [command for command in PROBES.get(self.flavour, ["tps"]) if command not in asked]
+                if not commands:
+                    break
+                for command in commands:
+                    asked.add(command)
+                    if not self._ask(command):
+                        return self.mspt
+        return self.mspt
+
+    def _ask(self, command):
+        detecting = self.flavour is None
+        try:
+            response = self.instance.request(command, self.response_window, quiet=True).result()
+        except Exception:
+            return False  # not running, or RCON is down
+        self._expect_mspt = False
+        for line in response.lines:
+            self._consume(COLOR_RE.sub("", line), detecting)
+        return True
+
+    def _record(self, tps=None, mspt=None, mspt_max=None):
+        if tps is not None:
+            self.tps = tps
+        if mspt is not None:
+            self.mspt = mspt
+            self.mspt_max = mspt_max
+        self.history.append((time.time(), self.tps, self.mspt))
+
+    def _consume(self, line, detecting=False):
+        match = TPS_RE.search(line)
+        if match:
+            self.flavour = self.flavour or "paper"
+            self._record(tps=float(match.group(1)))
+            return
+        if MSPT_HEADER_RE.search(line):
+            self._expect_mspt = True
+            return
+        if self._expect_mspt:
+            match = MSPT_RE.search(line)
+            if match:
+                self._expect_mspt = False
+                # first triple is the last 5 seconds: avg/min/max
+                self._record(mspt=float(match.group(1)), mspt_max=float(match.group(3)))
+                return
+        match = VANILLA_TICK_RE.search(line)
+        if match:
+            mspt = float(match.group(1))
+            self._record(tps=min(20.0, 1000 / mspt) if mspt else 20.0, mspt=mspt)
+            return
+        match = PM_TPS_RE.search(line)
+        if match and self.flavour == "pocketmine":
+            self._record(tps=float(match.group(1)))
+            return
+        if UNKNOWN_RE.search(line) and detecting:
+            # No Paper commands here, fall back to vanilla "tick query" from now on
+            self.flavour = self.flavour or "vanilla"
+
+    def regression(self, factor=1.5):
+        # True when the latest MSPT is well above the median of the history
+        samples = [mspt for _, _, mspt in self.history if mspt is not None]
+        if len(samples) < 5 or self.mspt is None:
+            return False
+        return self.mspt > statistics.median(samples) * factor
+
+    def summary(self):
+        if self.tps is None and self.mspt is None:
+            return ""
+        parts = []
+        if self.tps is not None:
+            parts.append(f"TPS {self.tps:.1f}")
+        if self.mspt is not None:
+            parts.append(f"MSPT {self.mspt:.1f} ms" + (f" (max {self.mspt_max:.1f})" if self.mspt_max else ""))
+        if self.regression():
+            parts.append("⚠ tick time rising")
+        return "  ".join(parts)
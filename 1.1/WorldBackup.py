@@ -0,0 +1,275 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+from Rcon import read_properties
+
+CHUNK = 1024 * 1024
+SKIP_FILES = {"session.lock"}  # held open by the server, and useless in a backup
+# Commands that write every dirty chunk to disk before returning
+SAVE_ALL = {"Pocket Edition (PHP)": "save-all"}
+DEFAULT_SAVE_ALL = "save-all flush"
+
+
+class Throttle:
+    # Spreads reads out to rate bytes per second (0 = unlimited), allowing a
+    # short burst. lagging() is polled on every chunk; while it returns True
+    # the rate drops to a quarter so the copy backs off when ticks run long.
+    def __init__(self, rate, lagging=None, burst=0.25):
+        self.rate = rate
+        self.lagging = lagging
+        self.burst = burst
+        self._until = time.monotonic()
+
+    def consume(self, size):
+        rate = self.rate
+        if not rate:
+            return
+        if self.lagging and self.lagging():
+            rate /= 4
+        now = time.monotonic()
+        self._until = max(self._until, now) + size / rate
+        delay = self._until - now - self.burst
+        if delay > 0:
+            time.sleep(delay)
+
+
+class WorldBackup:
+    # Snapshots an instance's world folders into a content-addressed store:
+    #   objects/ab/<sha256>           one copy of every distinct file
+    #   snapshots/<stamp>/<world>/... hardlinks into objects/
+    #   snapshots/<stamp>.json        path -> [size, mtime_ns, sha256]
+    # A file whose size and mtime match the previous manifest is linked
+    # without being read; anything else is hashed while it is copied and
+    # dropped again if the store already has that content. Snapshot folders
+    # look like plain world copies: restore one by copying it back, never run
+    # a server inside it (region files are rewritten in place, and the
+    # hardlinked objects would change with them).
+    def __init__(self, instance, directory=None, keep=10, rate_mb=32, save_timeout=120, max_mspt=45.0):
+        self.instance = instance
+        self.directory = directory or os.path.join(instance.workdir, "backups")
+        self.keep = keep
+        self.rate_mb = rate_mb
+        self.save_timeout = save_timeout  # seconds to wait for save-all flush
+        self.max_mspt = max_mspt  # slow down while the server's ticks take longer than this
+        self.lock = threading.Lock()
+        self.thread = None
+        self.last = None  # manifest summary of the last snapshot taken
+
+    def to_dict(self):
+        return {"directory": self.directory, "keep": self.keep, "rate_mb": self.rate_mb,
+                "save_timeout": self.save_timeout, "max_mspt": self.max_mspt}
+
+    @property
+    def objects_dir(self):
+        return os.path.join(self.directory, "objects")
+
+    @property
+    def snapshots_dir(self):
+        return os.path.join(self.directory, "snapshots")
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        # Runs the backup on its own thread; False if one is already going
+        if self.is_running():
+            self.instance.log("⚠ A backup is already running.\n")
+            return False
+        self.thread = threading.Thread(target=self.run, name=f"backup-{self.instance.name}", daemon=True)
+        self.thread.start()
+        return True
+
+    def worlds(self):
+        workdir = self.instance.workdir
+        if self.instance.server_type == "Pocket Edition (PHP)":
+            names = ["worlds"]
+        else:
+            level = read_properties(os.path.join(workdir, "server.properties")).get("level-name") or "world"
+            names = [level, level + "_nether", level + "_the_end"]
+        return [name for name in names if os.path.isdir(os.path.join(workdir, name))]
+
+    def snapshots(self):
+        # Snapshot names, oldest first
+        try:
+            names = os.listdir(self.snapshots_dir)
+        except OSError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith(".json"))
+
+    def load_manifest(self, name):
+        try:
+            with open(os.path.join(self.snapshots_dir, name + ".json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def run(self):
+        with self.lock:
+            instance = self.instance
+            worlds = self.worlds()
+            if not worlds:
+                instance.log("⚠ Backup: no world folder found.\n")
+                return None
+            quiesced = False
+            try:
+                quiesced = self._save_off()
+                return self._snapshot(worlds)
+            except Exception as e:
+                instance.log(f"❌ Backup failed: {str(e)}\n")
+                return None
+            finally:
+                if quiesced:
+                    self._command("save-on", 10)
+
+    def _command(self, command, timeout):
+        try:
+            return self.instance.request(command, timeout).result()
+        except Exception as e:
+            self.instance.log(f"⚠ Backup: '{command}' failed: {str(e)}\n")
+            return None
+
+    def _save_off(self):
+        # Stops autosaves and flushes the world, so region files stay put while
+        # they are copied. A server that isn't reachable is copied as it is.
+        instance = self.instance
+        if not (instance.is_running() or instance.uses_rcon()):
+            return False
+        instance.log("💾 Backup: pausing autosave and flushing the world...\n")
+        if self._command("save-off", 10) is None:
+            return False
+        response = self._command(SAVE_ALL.get(instance.server_type, DEFAULT_SAVE_ALL), self.save_timeout)
+        if response is None or not response.complete:
+            self._command("save-on", 10)
+            raise RuntimeError(f"the world was not saved within {self.save_timeout}s")
+        return True
+
+    def _snapshot(self, worlds):
+        started = time.monotonic()
+        previous_names = self.snapshots()
+        previous = self.load_manifest(previous_names[-1]) if previous_names else None
+        known = previous["files"] if previous else {}
+
+        name = time.strftime("%Y%m%d-%H%M%S")
+        if name in previous_names:
+            name += f"-{len(previous_names)}"
+        target = os.path.join(self.snapshots_dir, name)
+        os.makedirs(target)
+
+        tick_monitor = self.instance.tick_monitor
+        throttle = Throttle(self.rate_mb * 1024 * 1024,
+                            lambda: (tick_monitor.mspt or 0) > self.max_mspt)
+        files = {}
+        copied = linked = deduplicated = copied_bytes = 0
+        for world in worlds:
+            root = os.path.join(self.instance.workdir, world)
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if filename in SKIP_FILES:
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    rel = os.path.relpath(path, self.instance.workdir).replace(os.sep, "/")
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue  # deleted while we walked
+                    entry = known.get(rel)
+                    if self._unchanged(entry, stat):
+                        digest = entry[2]
+                        linked += 1
+                    else:
+                        try:
+                            digest, size, stored = self._store(path, throttle)
+                        except OSError as e:
+                            self.instance.log(f"⚠ Backup: skipped {rel}: {str(e)}\n")
+                            continue
+                        copied += 1
+                        copied_bytes += size
+                        deduplicated += not stored
+                    self._link(digest, os.path.join(target, *rel.split("/")))
+                    files[rel] = [stat.st_size, stat.st_mtime_ns, digest]
+
+        manifest = {"name": name, "time": time.time(), "worlds": worlds, "files": files,
+                    "copied": copied, "copied_bytes": copied_bytes}
+        with open(os.path.join(self.snapshots_dir, name + ".json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        self.last = {key: value for key, value in manifest.items() if key != "files"}
+
+        elapsed = time.monotonic() - started
+        self.instance.log(f"💾 Backup {name}: {len(files)} files, {copied} changed "
+                          f"({copied_bytes / 1048576:.1f} MB copied, {deduplicated} already stored), "
+                          f"{linked} unchanged, in {elapsed:.1f}s\n")
+        self.prune()
+        return name
+
+    def _unchanged(self, entry, stat):
+        return (entry is not None and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns
+                and os.path.exists(self._object_path(entry[2])))
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _store(self, path, throttle):
+        # Copies path into the store while hashing it; returns (digest, size, newly stored)
+        os.makedirs(self.objects_dir, exist_ok=True)
+        temp = os.path.join(self.objects_dir, f".incoming-{threading.get_ident()}")
+        sha = hashlib.sha256()
+        size = 0
+        try:
+            with open(path, "rb") as src, open(temp, "wb") as dst:
+                while True:
+                    chunk = src.read(CHUNK)
+                    if not chunk:
+                        break
+                    sha.update(chunk)
+                    dst.write(chunk)
+                    size += len(chunk)
+                    throttle.consume(len(chunk))
+            digest = sha.hexdigest()
+            final = self._object_path(digest)
+            if os.path.exists(final):
+                os.remove(temp)
+                return digest, size, False
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            os.replace(temp, final)
+            return digest, size, True
+        except OSError:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
+
+    def _link(self, digest, dest):
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        try:
+            os.link(self._object_path(digest), dest)
+        except OSError:
+            # FAT/exFAT drives and some network shares have no hardlinks
+            shutil.copyfile(self._object_path(digest), dest)
+
+    def prune(self):
+        # Drops snapshots beyond keep, then every object no manifest refers to
+        names = self.snapshots()
+        if not self.keep or len(names) <= self.keep:
+            return 0
+        for name in names[:-self.keep]:
+            shutil.rmtree(os.path.join(self.snapshots_dir, name), ignore_errors=True)
+            os.remove(os.path.join(self.snapshots_dir, name + ".json"))
+        names = names[-self.keep:]
+
+        wanted = set()
+        for name in names:
+            manifest = self.load_manifest(name)
+            if manifest is None:
+                return 0  # an unreadable manifest might still reference anything
+            wanted.update(entry[2] for entry in manifest["files"].values())
+        removed = 0
+        for dirpath, _, filenames in os.walk(self.objects_dir):
+            for filename in filenames:
+                if filename not in wanted and not filename.startswith(".incoming-"):
+                    os.remove(os.path.join(dirpath, filename))
+                    removed += 1
+        return removed
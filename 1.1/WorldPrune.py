@@ -0,0 +1,393 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+
+from RegionScan import ENTRIES, HEADER, REGION_RE, SECTOR, find_regions, map_files, scan_region
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+GZIP, ZLIB, UNCOMPRESSED = 1, 2, 3
+EXTERNAL = 0x80  # payload lives in c.<x>.<z>.mcc next to the region file
+WBITS = {GZIP: 16 + zlib.MAX_WBITS, ZLIB: zlib.MAX_WBITS}
+STEP = 16384  # decompressed bytes pulled at a time
+
+NUMBERS = {1: struct.Struct(">b"), 2: struct.Struct(">h"), 3: struct.Struct(">i"), 4: struct.Struct(">q"),
+           5: struct.Struct(">f"), 6: struct.Struct(">d")}
+FIXED = {tag: number.size for tag, number in NUMBERS.items()}
+ARRAYS = {7: 1, 11: 4, 12: 8}  # byte, int and long arrays: element size
+TAG_STRING, TAG_LIST, TAG_COMPOUND = 8, 9, 10
+
+# Chunks before 1.18 keep everything under "Level"
+CHUNK_FIELDS = {("InhabitedTime",): "inhabited", ("LastUpdate",): "last_update",
+                ("Level", "InhabitedTime"): "inhabited", ("Level", "LastUpdate"): "last_update"}
+LEVEL_FIELDS = {("Data", "Time"): "time", ("Data", "SpawnX"): "spawn_x", ("Data", "SpawnZ"): "spawn_z"}
+SIBLINGS = ("entities", "poi")  # same r.X.Z.mca layout, same chunks
+
+
+class NbtStream:
+    # Decompresses on demand, so a parser that stops early never inflates
+    # the rest of the chunk.
+    def __init__(self, data, compression):
+        if compression == UNCOMPRESSED:
+            self.buffer, self.source = bytes(data), None
+        elif compression in WBITS:
+            self.buffer, self.source = b"", zlib.decompressobj(WBITS[compression])
+            self.pending = bytes(data)
+        else:
+            raise ValueError(f"unsupported compression {compression}")
+        self.pos = 0
+
+    def read(self, size):
+        while len(self.buffer) - self.pos < size:
+            if self.source is None:
+                raise EOFError("NBT data ends early")
+            if self.pending or self.source.unconsumed_tail:
+                more = self.source.decompress(self.source.unconsumed_tail or self.pending, STEP)
+                self.pending = b""
+            else:
+                more = self.source.flush()
+                if not more:
+                    raise EOFError("NBT data ends early")
+            self.buffer = self.buffer[self.pos:] + more
+            self.pos = 0
+        data = self.buffer[self.pos:self.pos + size]
+        self.pos += size
+        return data
+
+    def number(self, tag):
+        return NUMBERS[tag].unpack(self.read(FIXED[tag]))[0]
+
+    def skip(self, tag):
+        if tag in FIXED:
+            self.read(FIXED[tag])
+        elif tag in ARRAYS:
+            self.read(ARRAYS[tag] * self.number(3))
+        elif tag == TAG_STRING:
+            self.read(self.number(2) & 0xFFFF)
+        elif tag == TAG_LIST:
+            item, count = self.number(1), self.number(3)
+            if item in FIXED:
+                self.read(FIXED[item] * count)
+            else:
+                for _ in range(count):
+                    self.skip(item)
+        elif tag == TAG_COMPOUND:
+            while True:
+                item = self.number(1)
+                if item == 0:
+                    break
+                self.read(self.number(2) & 0xFFFF)
+                self.skip(item)
+        else:
+            raise ValueError(f"bad NBT tag {tag}")
+
+
+def find_values(stream, fields):
+    # fields maps tag paths to names; returns {name: number} and stops as soon
+    # as every name has a value. Nothing but the path to them is decoded.
+    wanted = set(fields.values())
+    prefixes = {path[:i] for path in fields for i in range(1, len(path))}
+    found = {}
+
+    def walk(path):
+        while True:
+            tag = stream.number(1)
+            if tag == 0:
+                return False
+            here = path + (stream.read(stream.number(2) & 0xFFFF).decode("utf-8", errors="replace"),)
+            if here in fields and tag in NUMBERS:
+                found[fields[here]] = stream.number(tag)
+                if wanted <= found.keys():
+                    return True
+            elif tag == TAG_COMPOUND and here in prefixes:
+                if walk(here):
+                    return True
+            else:
+                stream.skip(tag)
+
+    if stream.number(1) != TAG_COMPOUND:
+        raise ValueError("NBT root is not a compound")
+    stream.read(stream.number(2) & 0xFFFF)
+    walk(())
+    return found
+
+
+def read_level(world):
+    # Time and spawn from level.dat, or {} when there is none
+    try:
+        with open(os.path.join(world, "level.dat"), "rb") as f:
+            return find_values(NbtStream(f.read(), GZIP), LEVEL_FIELDS)
+    except (OSError, ValueError, EOFError, zlib.error, struct.error):
+        return {}
+
+
+def world_in_use(world):
+    # A running server holds a lock on session.lock
+    try:
+        f = open(os.path.join(world, "session.lock"), "r+b")
+    except FileNotFoundError:
+        return False
+    except PermissionError:
+        return True
+    with f:
+        try:
+            if fcntl:
+                fcntl.lockf(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.lockf(f, fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        except OSError:
+            return True
+    return False
+
+
+def chunk_values(view, location, directory, cx, cz):
+    start = (location >> 8) * SECTOR
+    header = view[start:start + 5]
+    if len(header) < 5:
+        return None
+    length, compression = int.from_bytes(header[:4], "big"), header[4]
+    if compression & EXTERNAL:
+        try:
+            with open(os.path.join(directory, f"c.{cx}.{cz}.mcc"), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        compression &= ~EXTERNAL
+    else:
+        data = view[start + 5:start + 4 + length]
+    try:
+        return find_values(NbtStream(data, compression), CHUNK_FIELDS)
+    except (ValueError, EOFError, zlib.error, struct.error):
+        return None  # LZ4 (1.20.5+) and damaged chunks are kept
+
+
+def chunk_bytes(view, location):
+    # The part of a chunk's sectors that its length prefix says is in use
+    start = (location >> 8) * SECTOR
+    end = start + (location & 0xFF) * SECTOR
+    length = int.from_bytes(view[start:start + 4], "big")
+    if 0 < length <= end - start - 4:
+        end = start + 4 + length
+    return view[start:min(end, len(view))]
+
+
+def compact(path, view, drop):
+    # Writes every chunk not in drop back to back after a new header, to
+    # path + ".prune"; returns the number of sectors written (2 = no chunks left)
+    locations = ENTRIES.unpack_from(view, 0)
+    timestamps = ENTRIES.unpack_from(view, SECTOR)
+    new_locations = [0] * 1024
+    new_timestamps = [0] * 1024
+    position = 2
+    with open(path + ".prune", "wb") as f:
+        f.seek(HEADER)
+        # In file order, so chunks that were close on disk stay close
+        for location, index in sorted((location, index) for index, location in enumerate(locations)
+                                      if location and index not in drop):
+            if location >> 8 < 2 or not location & 0xFF:
+                continue  # points at the header or nowhere
+            data = chunk_bytes(view, location)
+            sectors = -(-len(data) // SECTOR)
+            if not sectors:
+                continue
+            f.write(data)
+            f.write(bytes(sectors * SECTOR - len(data)))
+            new_locations[index] = position << 8 | sectors
+            new_timestamps[index] = timestamps[index]
+            position += sectors
+        f.seek(0)
+        f.write(ENTRIES.pack(*new_locations) + ENTRIES.pack(*new_timestamps))
+        f.flush()
+        os.fsync(f.fileno())
+    return position
+
+
+def replace_region(path, sectors):
+    if sectors > 2:
+        os.replace(path + ".prune", path)
+        return sectors * SECTOR
+    os.remove(path + ".prune")
+    os.remove(path)
+    return 0
+
+
+def drop_chunks(path, drop):
+    # Same chunks out of an entities/ or poi/ region; damaged files are left alone
+    scan = scan_region(path)
+    if scan["error"] or scan["overlaps"] or scan["outside"] or not scan["chunks"]:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        sectors = compact(path, view, drop)
+    replace_region(path, sectors)
+
+
+def protected(cx, cz, protect):
+    x, z = cx * 16 + 8, cz * 16 + 8
+    return any((x - px) ** 2 + (z - pz) ** 2 <= radius ** 2 for px, pz, radius in protect)
+
+
+def prune_region(task):
+    # One region file: decides chunk by chunk, and with apply rewrites the
+    # file compactly (also when nothing is dropped but it has holes)
+    settings, path = task
+    scan = scan_region(path)
+    result = {"path": path, "chunks": scan["chunks"], "dropped": 0, "protected": 0, "unreadable": 0,
+              "size": scan["size"], "new_size": scan["size"], "skipped": None}
+    if scan["error"] or scan["overlaps"] or scan["outside"]:
+        result["skipped"] = scan["error"] or "damaged"
+        return result
+    if not scan["chunks"]:
+        return result
+
+    directory = os.path.dirname(path)
+    base_x, base_z = scan["x"] * 32, scan["z"] * 32
+    drop = set()
+    external = []
+    sectors = None
+    try:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            locations = ENTRIES.unpack_from(view, 0)
+            freed = scan["free_sectors"]
+            for index, location in enumerate(locations):
+                if location >> 8 < 2 or not location & 0xFF:
+                    continue
+                cx, cz = base_x + index % 32, base_z + index // 32
+                if protected(cx, cz, settings["protect"]):
+                    result["protected"] += 1
+                    continue
+                values = chunk_values(view, location, directory, cx, cz)
+                if values is None or "inhabited" not in values:
+                    result["unreadable"] += 1
+                    continue
+                if values["inhabited"] >= settings["min_inhabited"]:
+                    continue
+                if settings["keep_after"] is not None and values.get("last_update", 0) >= settings["keep_after"]:
+                    continue
+                drop.add(index)
+                freed += location & 0xFF
+                if view[(location >> 8) * SECTOR + 4] & EXTERNAL:
+                    external.append((cx, cz))
+            result["dropped"] = len(drop)
+            result["new_size"] = scan["size"] - freed * SECTOR
+            if settings["apply"] and freed:
+                sectors = compact(path, view, drop)
+    except OSError as e:
+        result["skipped"] = str(e)
+        return result
+
+    if sectors is not None:
+        result["new_size"] = replace_region(path, sectors)
+        for cx, cz in external:
+            try:
+                os.remove(os.path.join(directory, f"c.{cx}.{cz}.mcc"))
+            except OSError:
+                pass
+        if drop:
+            for folder in SIBLINGS:
+                sibling = os.path.join(os.path.dirname(directory), folder, os.path.basename(path))
+                if os.path.exists(sibling):
+                    try:
+                        drop_chunks(sibling, drop)
+                    except OSError:
+                        pass  # entities/poi left behind are only orphans
+    return result
+
+
+def plan(worlds, min_inhabited=1200, keep_recent=None, protect=(), spawn_radius=512, apply=False):
+    # One task per region file. level.dat supplies the spawn (protected in
+    # every dimension of that world) and the clock for keep_recent.
+    tasks = []
+    for world in worlds:
+        level = read_level(world)
+        zones = list(protect)
+        if spawn_radius and "spawn_x" in level and "spawn_z" in level:
+            zones.append((level["spawn_x"], level["spawn_z"], spawn_radius))
+        keep_after = level["time"] - keep_recent if keep_recent and "time" in level else None
+        settings = {"min_inhabited": min_inhabited, "keep_after": keep_after, "protect": zones, "apply": apply}
+        tasks.extend((settings, path) for path in find_regions([world]))
+    return tasks
+
+
+def prune(worlds, workers=None, **options):
+    return map_files(prune_region, plan(worlds, **options), workers)
+
+
+def format_report(results, apply, elapsed=None, top=10):
+    chunks = sum(result["chunks"] for result in results)
+    dropped = sum(result["dropped"] for result in results)
+    freed = sum(result["size"] - result["new_size"] for result in results)
+    emptied = sum(1 for result in results if result["chunks"] and result["dropped"] == result["chunks"])
+    lines = [f"{len(results)} regions, {chunks} chunks",
+             f"{'Dropped' if apply else 'Would drop'} {dropped} chunks"
+             f" ({dropped / chunks * 100 if chunks else 0:.1f}%), {emptied} regions emptied",
+             f"{'Freed' if apply else 'Would free'} {freed / 1048576:.1f} MB (dropped chunks plus holes)",
+             f"Kept {sum(result['protected'] for result in results)} protected and "
+             f"{sum(result['unreadable'] for result in results)} unreadable chunks"]
+    skipped = [result for result in results if result["skipped"]]
+    if skipped:
+        lines.append(f"Left {len(skipped)} damaged regions alone:")
+        lines.extend(f"  {result['path']}: {result['skipped']}" for result in skipped)
+    biggest = sorted(results, key=lambda result: result["size"] - result["new_size"], reverse=True)[:top]
+    biggest = [result for result in biggest if result["size"] > result["new_size"]]
+    if biggest:
+        lines.append("Largest savings:")
+        lines.extend(f"  {result['path']}: {result['dropped']}/{result['chunks']} chunks, "
+                     f"{(result['size'] - result['new_size']) / 1048576:.1f} MB" for result in biggest)
+    if elapsed is not None:
+        lines.append(f"Done in {elapsed:.2f}s")
+    if not apply:
+        lines.append("Dry run: nothing was changed. Run again with --apply to prune.")
+    return "\n".join(lines)
+
+
+def parse_zone(text):
+    try:
+        x, z, radius = (int(value) for value in text.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected X,Z,RADIUS in blocks")
+    return x, z, radius
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drop chunks nobody spent time in and compact region files. "
+                                                 "Dry run unless --apply is given; take a backup first.")
+    parser.add_argument("worlds", nargs="+", help="world folders, e.g. world world_nether world_the_end")
+    parser.add_argument("--min-inhabited", type=int, default=1200,
+                        help="keep chunks with at least this InhabitedTime in ticks (20 = 1 second)")
+    parser.add_argument("--keep-recent", type=int, default=None,
+                        help="keep chunks whose LastUpdate is within this many ticks of the world clock")
+    parser.add_argument("--protect", type=parse_zone, action="append", default=[], metavar="X,Z,RADIUS",
+                        help="never prune around these block coordinates (repeatable)")
+    parser.add_argument("--spawn-radius", type=int, default=512, help="protected blocks around spawn (0 = none)")
+    parser.add_argument("--workers", type=int, default=None, help="processes to use (default: one per CPU)")
+    parser.add_argument("--apply", action="store_true", help="rewrite the region files")
+    args = parser.parse_args(argv)
+
+    busy = [world for world in args.worlds if world_in_use(world)]
+    if busy and args.apply:
+        print(f"Stop the server first, these worlds are in use: {', '.join(busy)}", file=sys.stderr)
+        return 1
+    if busy:
+        # A running server keeps saving chunks, so the numbers can be out of date by the time they print
+        print(f"Warning: these worlds are in use, the dry run may not match what --apply would do once the "
+              f"server is stopped: {', '.join(busy)}", file=sys.stderr)
+    started = time.perf_counter()
+    results = prune(args.worlds, args.workers, min_inhabited=args.min_inhabited, keep_recent=args.keep_recent,
+                    protect=args.protect, spawn_radius=args.spawn_radius, apply=args.apply)
+    print(format_report(results, args.apply, time.perf_counter() - started))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
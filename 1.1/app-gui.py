@@ -1,7 +1,11 @@
 # Add these two lines near top imports if not already
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import subprocess, threading, os, json
+import subprocess, threading, os, json, time
+from ConsolePump import ConsolePump
+from RestartPolicy import RestartPolicy, RESTART, STOP, CRASH_LOOP
+from HostMemory import host_memory, max_heap_mb, parse_size_mb
+from ConfigProfile import ConfigEditor
 
 CONFIG_FILE = "config.json"
 
@@ -26,11 +30,16 @@ class MinecraftServerLauncher(tk.Tk):
         self.custom_path = tk.StringVar(value="")
         self.memory_xms = tk.StringVar(value="1024")  # Initial RAM in MB
         self.memory_xmx = tk.StringVar(value="2048")  # Max RAM in MB
+        self.restart_policy = RestartPolicy()
+        self.stop_event = threading.Event()  # set by Stop and on close; cancels a pending restart
+        self.max_heap = max_heap_mb(host_memory())
+        self.config_editor = None
 
         self.style = ttk.Style(self)
         self.style.theme_use("clam")
         self.customize_style()
         self.create_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         self.load_config()
 
     def customize_style(self):
@@ -75,14 +84,14 @@ class MinecraftServerLauncher(tk.Tk):
         # Memory Settings Frame
         # Initial RAM Slider
         ttk.Label(select_frame, text="Initial RAM (MB):").grid(row=2, column=0, sticky="w", pady=5)
-        xms_slider = tk.Scale(select_frame, from_=256, to=8192, resolution=128, orient="horizontal",
+        xms_slider = tk.Scale(select_frame, from_=256, to=self.slider_limit(8192), resolution=128, orient="horizontal",
                             variable=self.memory_xms, bg="#1e1e1e", fg="white", highlightbackground="#1e1e1e",
                             troughcolor="#00b894", font=("Segoe UI", 9))
         xms_slider.grid(row=2, column=1, columnspan=2, sticky="ew", padx=10)
 
         # Max RAM Slider
         ttk.Label(select_frame, text="Maximum RAM (MB):").grid(row=3, column=0, sticky="w", pady=5)
-        xmx_slider = tk.Scale(select_frame, from_=512, to=16384, resolution=256, orient="horizontal",
+        xmx_slider = tk.Scale(select_frame, from_=512, to=self.slider_limit(16384), resolution=256, orient="horizontal",
                             variable=self.memory_xmx, bg="#1e1e1e", fg="white", highlightbackground="#1e1e1e",
                             troughcolor="#0984e3", font=("Segoe UI", 9))
         xmx_slider.grid(row=3, column=1, columnspan=2, sticky="ew", padx=10)
@@ -91,12 +100,16 @@ class MinecraftServerLauncher(tk.Tk):
         # Launch
         self.launch_button = ttk.Button(self, text="🚀 Launch Server", style="RoundedButton.TButton", command=self.launch_server)
         self.launch_button.pack(pady=10)
+        self.stop_button = ttk.Button(self, text="🛑 Stop Server", style="RoundedButton.TButton", command=self.stop_server)
+        self.stop_button.pack(pady=(0, 10))
 
         # Terminal
         self.log_text = tk.Text(self, height=20, bg="#1e1e1e", fg="#00ff00", insertbackground="white",
                                 font=("Consolas", 10), wrap="word", relief="flat", borderwidth=5)
         self.log_text.pack(padx=20, pady=5, fill="both", expand=True)
         self.log_text.config(state="disabled")
+        self.console = ConsolePump(self.log_text)
+        self.console.start()
 
         # Command input
         input_frame = ttk.Frame(self)
@@ -110,6 +123,10 @@ class MinecraftServerLauncher(tk.Tk):
         self.send_button = ttk.Button(input_frame, text="📤 Send", style="RoundedButton.TButton", command=self.send_command)
         self.send_button.pack(side="right")
 
+    def slider_limit(self, default):
+        # Don't offer more heap than the machine (or container) can back
+        return max(512, min(default, self.max_heap)) if self.max_heap else default
+
     def toggle_custom(self, event=None):
         server = self.selected_server.get()
         if server == "Custom (Browse)":
@@ -135,6 +152,7 @@ class MinecraftServerLauncher(tk.Tk):
             return
 
         self.save_config()
+        self.stop_event.clear()
         self.append_log(f"Launching server: {jar_file} with {self.memory_xms.get()} initial and {self.memory_xmx.get()} max memory...\n")
         threading.Thread(target=self.run_server, args=(jar_file,), daemon=True).start()
         self.edit_config_btn.pack()  # Show config button after launching
@@ -151,7 +169,9 @@ class MinecraftServerLauncher(tk.Tk):
         )
 
 
+        self.restart_policy.reset()
         while True:
+            started = time.monotonic()
             try:
                 self.append_log(f"\n▶ Starting server with command: {' '.join(cmd)}\n")
                 self.process = subprocess.Popen(
@@ -168,21 +188,51 @@ class MinecraftServerLauncher(tk.Tk):
 
                 self.process.stdout.close()
                 return_code = self.process.wait()
+                if self.stop_event.is_set():
+                    self.append_log(f"\n✔ Server stopped (exit code {return_code}).\n")
+                    break
 
-                if return_code == 0:
-                    self.append_log("\n✔ Server stopped gracefully.\n")
+                # Exit code 0 goes through the policy too: its exit rules may say otherwise
+                action, delay = self.restart_policy.decide(return_code, time.monotonic() - started)
+                if action == CRASH_LOOP:
+                    self.append_log(f"\n🛑 Server crashed (exit code {return_code}) {self.restart_policy.max_restarts} times "
+                                    f"within {self.restart_policy.window}s, not restarting.\n")
+                    break
+                if action == STOP:
+                    if return_code == 0:
+                        self.append_log("\n✔ Server stopped gracefully.\n")
+                    elif not self.restart_policy.enabled:
+                        self.append_log(f"\n⚠ Server crashed (exit code {return_code}). Automatic restart is off.\n")
+                    else:
+                        self.append_log(f"\n🛑 Server exited with code {return_code}; the restart policy says to "
+                                        f"leave it stopped.\n")
+                    break
+                what = "stopped" if return_code == 0 else f"crashed (exit code {return_code})"
+                self.append_log(f"\n⚠ Server {what}. Restarting in {delay:.0f} seconds...\n")
+                # Stop and closing the window set the event, so the restart can be cancelled
+                if self.stop_event.wait(delay):
+                    self.append_log("✔ Restart cancelled.\n")
                     break
-                else:
-                    self.append_log(f"\n⚠ Server crashed (exit code {return_code}). Restarting in 5 seconds...\n")
-                    for i in range(5, 0, -1):
-                        self.append_log(f"⏳ Restarting in {i}...\n")
-                        self.update()
-                        self.after(1000)
 
             except Exception as e:
                 self.append_log(f"❌ Failed to start server: {str(e)}\n")
                 break
 
+    def stop_server(self):
+        # Also cancels a restart that is waiting out its backoff
+        self.stop_event.set()
+        if self.process and self.process.poll() is None:
+            try:
+                self.process.stdin.write("stop\n")
+                self.process.stdin.flush()
+                self.append_log("🛑 Stopping server...\n")
+            except Exception as e:
+                self.append_log(f"Failed to stop server: {str(e)}\n")
+
+    def on_close(self):
+        self.stop_server()
+        self.destroy()
+
     def send_command(self, event=None):
         cmd = self.command_entry.get().strip()
         if self.process and self.process.stdin and cmd:
@@ -197,17 +247,18 @@ class MinecraftServerLauncher(tk.Tk):
             self.append_log("Server not running or command is empty.\n")
 
     def append_log(self, message):
-        self.log_text.config(state="normal")
-        self.log_text.insert("end", message)
-        self.log_text.see("end")
-        self.log_text.config(state="disabled")
+        # Safe to call from any thread, the pump writes to the widget on the Tk loop
+        self.console.put(message)
 
     def save_config(self):
         config = {
             "server_type": self.selected_server.get(),
             "custom_path": self.custom_path.get(),
             "xms": self.memory_xms.get(),
-            "xmx": self.memory_xmx.get()
+            "xmx": self.memory_xmx.get(),
+            "scrollback_lines": self.console.max_lines,
+            "scrollback_bytes": self.console.max_bytes,
+            "restart_policy": self.restart_policy.to_dict()
         }
         try:
             with open(CONFIG_FILE, "w") as f:
@@ -222,15 +273,42 @@ class MinecraftServerLauncher(tk.Tk):
                     config = json.load(f)
                     self.selected_server.set(config.get("server_type", "Vanilla"))
                     self.custom_path.set(config.get("custom_path", ""))
-                    self.memory_xms.set(config.get("xms", "1G"))
-                    self.memory_xmx.set(config.get("xmx", "2G"))
+                    # Older profiles stored "1G"/"2G" strings, the sliders want MB
+                    self.memory_xms.set(parse_size_mb(config.get("xms"), 1024))
+                    self.memory_xmx.set(parse_size_mb(config.get("xmx"), 2048))
+                    self.console.set_scrollback(config.get("scrollback_lines", 5000),
+                                                config.get("scrollback_bytes"))
+                    self.restart_policy = RestartPolicy.from_dict(config.get("restart_policy"))
                     self.toggle_custom()
                     self.append_log("✔ Profile loaded from config.json\n")
             except Exception as e:
                 self.append_log(f"Failed to load profile: {str(e)}\n")
 
     def open_config_editor(self):
-        subprocess.Popen(["python", "ConfigProfile.py"])  # Or "ConfigEditor.exe" if compiled
+        # A window of this app: no second interpreter, and saves come straight back here
+        if self.config_editor is not None and self.config_editor.winfo_exists():
+            self.config_editor.deiconify()
+            self.config_editor.lift()
+            return
+        self.save_config()
+        self.config_editor = ConfigEditor(self, CONFIG_FILE, on_save=self.config_saved)
+
+    def config_saved(self, path):
+        name = os.path.basename(path)
+        if os.path.abspath(path) == os.path.abspath(CONFIG_FILE):
+            self.load_config()
+            return
+        if not (self.process and self.process.poll() is None):
+            return
+        if name == "whitelist.json":
+            try:
+                self.process.stdin.write("whitelist reload\n")
+                self.process.stdin.flush()
+                self.append_log("✔ whitelist.json saved, whitelist reloaded.\n")
+            except Exception as e:
+                self.append_log(f"Failed to reload whitelist: {str(e)}\n")
+        else:
+            self.append_log(f"⚠ {name} saved; restart the server to apply it.\n")
 
 
 if __name__ == "__main__":
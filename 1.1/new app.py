@@ -1,11 +1,28 @@
-# Add these two lines near top imports if not already
+from StartupTimer import StartupTimer
+STARTUP = StartupTimer()  # before the other imports so they are timed too
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import subprocess, threading, os, json
-from PIL import Image, ImageDraw
-import pystray
+import threading, os, json, time, sys
+from ConsolePump import ConsolePump
+from ServerInstance import InstanceManager, build_command
+from JvmProfiles import load_profiles
+from HostMemory import host_memory, max_heap_mb, recommend_heap, parse_size_mb
+from ControlServer import ControlServer
+# PIL and pystray are imported by the tray thread, after the window is up
 
 CONFIG_FILE = "log_config.json"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STARTUP_FILE = os.path.join(BASE_DIR, "startup_times.jsonl")
+STARTUP.mark("imports")
+
+# Stages reported by ServerInstance._stop_sequence while a server is stopping
+STOP_STAGES = {
+    "saving": "Saving...",
+    "shutting_down": "Shutting down...",
+    "terminating": "Terminating...",
+    "killing": "Killing...",
+}
 
 class MinecraftServerLauncher(tk.Tk):
     def __init__(self):
@@ -23,20 +40,36 @@ class MinecraftServerLauncher(tk.Tk):
             "Custom (Browse)": None
         }
 
-        self.process = None
         self.selected_server = tk.StringVar(value="Vanilla")
         self.custom_path = tk.StringVar(value="")
         self.memory_xms = tk.IntVar(value=1024)  # Default 1024 MB
         self.memory_xmx = tk.IntVar(value=2048)  # Default 2048 MB
+        self.instance_name = tk.StringVar(value="server")
+        self.jvm_profile_name = tk.StringVar(value="default")
+        self.gc_log_enabled = tk.BooleanVar(value=False)
+        self.reader_mode = "chunked"  # or "lines" for the old text-mode iteration
+        self.host_memory = host_memory()
+        self.memory_policy = "recommend"  # "off", "recommend" (warn) or "enforce" (clamp)
+        self.control_api = {"enabled": False, "host": "127.0.0.1", "port": 8765, "unix_path": None, "token": None}
+        self.control_server = None
+
+        # Each instance has its own process, output bus and console tab
+        self.manager = InstanceManager(BASE_DIR)
+        self.consoles = {}
+        self.tab_ids = {}
+        self.tab_names = {}
 
         self.style = ttk.Style(self)
         self.style.theme_use("clam")
         self.customize_style()
         self.create_widgets()
+        STARTUP.mark("widgets")
+        started = STARTUP.elapsed()
         self.load_config()
+        STARTUP.span("config", started)
 
         self.protocol("WM_DELETE_WINDOW", self.hide_window)
-        self.create_tray_icon()
+        self.bind("<Map>", self.on_first_map)
 
     def customize_style(self):
         self.style.configure("TFrame", background="#121212")
@@ -72,27 +105,66 @@ class MinecraftServerLauncher(tk.Tk):
         self.browse_button.grid(row=1, column=2, padx=5, sticky="w")
 
         ttk.Label(select_frame, text="Initial RAM (MB):").grid(row=2, column=0, sticky="w", pady=5)
-        xms_slider = tk.Scale(select_frame, from_=256, to=8192, resolution=128, orient="horizontal",
+        xms_slider = tk.Scale(select_frame, from_=256, to=self.slider_limit(8192), resolution=128, orient="horizontal",
                             variable=self.memory_xms, bg="#1e1e1e", fg="white", highlightbackground="#1e1e1e",
                             troughcolor="#00b894", font=("Segoe UI", 9))
         xms_slider.grid(row=2, column=1, columnspan=2, sticky="ew", padx=10)
 
         ttk.Label(select_frame, text="Maximum RAM (MB):").grid(row=3, column=0, sticky="w", pady=5)
-        xmx_slider = tk.Scale(select_frame, from_=512, to=16384, resolution=256, orient="horizontal",
+        xmx_slider = tk.Scale(select_frame, from_=512, to=self.slider_limit(16384), resolution=256, orient="horizontal",
                             variable=self.memory_xmx, bg="#1e1e1e", fg="white", highlightbackground="#1e1e1e",
                             troughcolor="#0984e3", font=("Segoe UI", 9))
         xmx_slider.grid(row=3, column=1, columnspan=2, sticky="ew", padx=10)
 
+        self.memory_label = ttk.Label(select_frame, text=self.memory_summary(), font=("Segoe UI", 9))
+        self.memory_label.grid(row=6, column=0, columnspan=2, sticky="w", pady=5)
+
+        self.recommend_button = ttk.Button(select_frame, text="🧮 Recommend RAM", command=self.apply_recommended_heap)
+        self.recommend_button.grid(row=6, column=2, padx=5, sticky="w")
+
+        self.gc_check = tk.Checkbutton(select_frame, text="Log GC pauses (-Xlog:gc)", variable=self.gc_log_enabled,
+                                       bg="#121212", fg="white", selectcolor="#1e1e1e", activebackground="#121212",
+                                       activeforeground="white", font=("Segoe UI", 10))
+        self.gc_check.grid(row=7, column=1, padx=10, pady=5, sticky="w")
+
+        self.gc_button = ttk.Button(select_frame, text="📈 GC Stats", command=self.open_gc_stats)
+        self.gc_button.grid(row=7, column=2, padx=5, sticky="w")
+
+        ttk.Label(select_frame, text="Instance Name:").grid(row=4, column=0, sticky="w", pady=5)
+        self.name_entry = tk.Entry(select_frame, textvariable=self.instance_name, width=40, font=("Segoe UI", 10),
+                                   bg="#1e1e1e", fg="#ffffff", insertbackground="white")
+        self.name_entry.grid(row=4, column=1, padx=10, pady=5, sticky="w")
+
+        self.add_button = ttk.Button(select_frame, text="➕ Add Instance", command=self.add_instance)
+        self.add_button.grid(row=4, column=2, padx=5, sticky="w")
+
+        ttk.Label(select_frame, text="JVM Profile:").grid(row=5, column=0, sticky="w", pady=5)
+        self.jvm_menu = ttk.Combobox(select_frame, textvariable=self.jvm_profile_name,
+                                     values=list(self.manager.jvm_profiles), state="readonly", width=40)
+        self.jvm_menu.grid(row=5, column=1, padx=10, pady=5, sticky="w")
+
+        self.preview_button = ttk.Button(select_frame, text="👁 Preview", command=self.preview_command)
+        self.preview_button.grid(row=5, column=2, padx=5, sticky="w")
+
         self.launch_button = ttk.Button(self, text="🚀 Launch Server", style="RoundedButton.TButton", command=self.launch_server)
         self.launch_button.pack(pady=10)
 
         self.stop_button = ttk.Button(self, text="🚑 Stop Server", style="RoundedButton.TButton", command=self.stop_server)
         self.stop_button.pack(pady=(0, 10))
 
-        self.log_text = tk.Text(self, height=20, bg="#1e1e1e", fg="#00ff00", insertbackground="white",
-                                font=("Consolas", 10), wrap="word", relief="flat", borderwidth=5)
-        self.log_text.pack(padx=20, pady=5, fill="both", expand=True)
-        self.log_text.config(state="disabled")
+        self.tabs = ttk.Notebook(self)
+        self.tabs.pack(padx=20, pady=5, fill="both", expand=True)
+        self.tabs.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+
+        # First tab carries launcher messages that don't belong to an instance
+        self.log_text = self.create_console_text(self.tabs)
+        self.tabs.add(self.log_text, text="Launcher")
+        self.console = ConsolePump(self.log_text)
+        self.console.start()
+
+        self.throughput_label = ttk.Label(self, text="", font=("Segoe UI", 9))
+        self.throughput_label.pack(anchor="e", padx=20)
+        self.after(1000, self.update_status)
 
         input_frame = ttk.Frame(self)
         input_frame.pack(fill="x", padx=20, pady=(5, 10))
@@ -105,6 +177,142 @@ class MinecraftServerLauncher(tk.Tk):
         self.send_button = ttk.Button(input_frame, text="📤 Send", style="RoundedButton.TButton", command=self.send_command)
         self.send_button.pack(side="right")
 
+        self.search_button = ttk.Button(input_frame, text="🔍 Search Logs", style="RoundedButton.TButton", command=self.open_log_search)
+        self.search_button.pack(side="right", padx=(0, 10))
+
+        self.backup_button = ttk.Button(input_frame, text="💾 Backup", style="RoundedButton.TButton", command=self.backup_world)
+        self.backup_button.pack(side="right", padx=(0, 10))
+
+        self.pregen_button = ttk.Button(input_frame, text="🗺 Pregen", style="RoundedButton.TButton", command=self.open_pregen)
+        self.pregen_button.pack(side="right", padx=(0, 10))
+
+    def create_console_text(self, parent):
+        log_text = tk.Text(parent, height=20, bg="#1e1e1e", fg="#00ff00", insertbackground="white",
+                           font=("Consolas", 10), wrap="word", relief="flat", borderwidth=5)
+        log_text.config(state="disabled")
+        return log_text
+
+    def add_console_tab(self, instance):
+        log_text = self.create_console_text(self.tabs)
+        self.tabs.add(log_text, text=instance.name)
+        console = ConsolePump(log_text, max_lines=self.console.max_lines, max_bytes=self.console.max_bytes)
+        console.attach(instance.bus.subscribe("console", maxlen=20000))
+        console.start()
+        self.consoles[instance.name] = console
+        self.tab_ids[instance.name] = str(log_text)
+        self.tab_names[str(log_text)] = instance.name
+        instance.on_message = self.instance_message
+        return log_text
+
+    def instance_message(self, instance, message):
+        console = self.consoles.get(instance.name)
+        (console or self.console).put(message)
+
+    def current_instance(self):
+        name = self.tab_names.get(self.tabs.select())
+        return self.manager.get(name) if name else None
+
+    def on_tab_changed(self, event=None):
+        instance = self.current_instance()
+        if instance is None:
+            return
+        # The form always shows the settings of the selected instance
+        self.instance_name.set(instance.name)
+        self.selected_server.set(instance.server_type)
+        if instance.server_type == "Custom (Browse)":
+            self.custom_path.set(instance.jar_file)
+        self.memory_xms.set(instance.xms)
+        self.memory_xmx.set(instance.xmx)
+        self.jvm_profile_name.set(instance.jvm_profile.name)
+        self.gc_log_enabled.set(instance.gc_logging)
+        if instance.uses_rcon():
+            self.command_entry.config(state="normal")
+        self.toggle_custom()
+
+    def selected_jar(self):
+        server_type = self.selected_server.get()
+        jar_file = self.server_types[server_type]
+        if server_type == "Custom (Browse)":
+            jar_file = self.custom_path.get()
+        if not jar_file or not os.path.isfile(jar_file):
+            messagebox.showerror("File Not Found", f"Cannot find file: {jar_file}")
+            return None
+        return jar_file
+
+    def add_instance(self, select=True):
+        jar_file = self.selected_jar()
+        if not jar_file:
+            return None
+        try:
+            instance = self.manager.create(self.instance_name.get().strip(), self.selected_server.get(), jar_file,
+                                           xms=self.memory_xms.get(), xmx=self.memory_xmx.get(),
+                                           reader_mode=self.reader_mode, jvm_profile=self.selected_jvm_profile(),
+                                           gc_log=self.gc_log_enabled.get())
+        except ValueError as e:
+            messagebox.showerror("Instance", str(e))
+            return None
+        tab = self.add_console_tab(instance)
+        if select:
+            self.tabs.select(tab)
+        self.save_config()
+        return instance
+
+    def selected_jvm_profile(self):
+        profiles = self.manager.jvm_profiles
+        return profiles.get(self.jvm_profile_name.get(), profiles["default"])
+
+    def preview_command(self):
+        jar_file = self.selected_jar()
+        if not jar_file:
+            return
+        cmd = build_command(os.path.abspath(jar_file), self.memory_xms.get(), self.memory_xmx.get(),
+                            self.selected_jvm_profile(), self.gc_log_enabled.get())
+        messagebox.showinfo("Launch Command", " ".join(cmd))
+
+    def other_heaps(self, name):
+        return [i.xmx for i in self.manager.instances.values() if i.is_active() and i.name != name]
+
+    def slider_limit(self, default):
+        # Never offer more heap than the machine (or container) can back
+        limit = max_heap_mb(self.host_memory)
+        return max(512, min(default, limit)) if limit else default
+
+    def memory_summary(self):
+        info = self.host_memory
+        if info is None:
+            return "Host memory unknown"
+        text = f"Host: {info['total']} MB total, {info['available']} MB available"
+        if info["cgroup_limit"]:
+            text += f", container limit {info['cgroup_limit']} MB"
+        return text
+
+    def apply_recommended_heap(self):
+        heap = recommend_heap(self.host_memory, self.other_heaps(self.instance_name.get().strip()))
+        if heap is None:
+            messagebox.showwarning("Memory", "Could not read the host memory.")
+            return
+        xms, xmx = heap
+        self.memory_xms.set(min(xms, 8192))
+        self.memory_xmx.set(xmx)
+        self.append_log(f"🧮 Recommended heap: -Xms{xms}M -Xmx{xmx}M\n")
+
+    def check_heap(self, name):
+        # Returns False if the launch should be cancelled
+        allowed = max_heap_mb(self.host_memory, self.other_heaps(name))
+        xmx = self.memory_xmx.get()
+        if self.memory_policy == "off" or allowed is None or xmx <= allowed:
+            return True
+        if allowed < 512:
+            messagebox.showerror("Not Enough Memory", "The other running instances leave no room for another server.")
+            return False
+        if self.memory_policy == "enforce":
+            self.memory_xmx.set(allowed)
+            self.memory_xms.set(min(self.memory_xms.get(), allowed))
+            self.append_log(f"⚠ Max RAM lowered from {xmx} MB to {allowed} MB to fit the host memory.\n")
+            return True
+        return messagebox.askyesno("Memory", f"{xmx} MB max RAM plus JVM overhead doesn't fit next to the running "
+                                             f"instances (at most {allowed} MB recommended). Launch anyway?")
+
     def toggle_custom(self, event=None):
         server = self.selected_server.get()
         if server == "Custom (Browse)":
@@ -121,72 +329,97 @@ class MinecraftServerLauncher(tk.Tk):
 
     def launch_server(self):
         self.command_entry.config(state="normal")
-        server_type = self.selected_server.get()
-        jar_file = self.server_types[server_type]
-        if server_type == "Custom (Browse)":
-            jar_file = self.custom_path.get()
-
-        if not jar_file or not os.path.isfile(jar_file):
-            messagebox.showerror("File Not Found", f"Cannot find file: {jar_file}")
+        # The typed name decides which instance starts; the selected tab only stands in for an empty field
+        name = self.instance_name.get().strip()
+        instance = self.manager.get(name) if name else self.current_instance()
+        if not (instance and instance.is_running()) and not self.check_heap(instance.name if instance else None):
             return
-
-        os.makedirs("server", exist_ok=True)
+        if instance is None:
+            instance = self.add_instance()
+            if instance is None:
+                return
+        elif not instance.is_running():
+            jar_file = self.selected_jar()
+            if not jar_file:
+                return
+            instance.server_type = self.selected_server.get()
+            instance.jar_file = os.path.abspath(jar_file)
+            instance.xms = self.memory_xms.get()
+            instance.xmx = self.memory_xmx.get()
+            instance.reader_mode = self.reader_mode
+            instance.jvm_profile = self.selected_jvm_profile()
+            instance.gc_logging = self.gc_log_enabled.get()
+
+        self.tabs.select(self.tab_ids[instance.name])
         self.save_config()
-        self.append_log(f"Launching server: {jar_file} with {self.memory_xms.get()} initial and {self.memory_xmx.get()} max memory...\n")
-        threading.Thread(target=self.run_server, args=(jar_file, "server"), daemon=True).start()
-
-    def run_server(self, jar_file, server_dir_name):
-        xms = self.memory_xms.get()
-        xmx = self.memory_xmx.get()
-        use_php = jar_file.endswith(".phar")
-        cmd = ["php", jar_file] if use_php else ["java", f"-Xms{xms}M", f"-Xmx{xmx}M", "-jar", jar_file, "nogui"]
-        self.append_log(f"\n▶ Starting server with command: {' '.join(cmd)}\n")
-        try:
-            self.process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                stdin=subprocess.PIPE,
-                universal_newlines=True,
-                bufsize=1,
-                cwd=os.path.join(os.path.dirname(__file__), server_dir_name)
-            )
-            for line in self.process.stdout:
-                self.append_log(line)
-            self.process.stdout.close()
-            return_code = self.process.wait()
-            if return_code == 0:
-                self.append_log("\n✔ Server stopped gracefully.\n")
-            else:
-                self.append_log(f"\n⚠ Server crashed (exit code {return_code}).\n")
-        except Exception as e:
-            self.append_log(f"❌ Failed to start server: {str(e)}\n")
+        instance.log(f"Launching server: {instance.jar_file} with {instance.xms} initial and {instance.xmx} max memory...\n")
+        instance.start()
+
+    def update_status(self):
+        # Runs on the Tk loop; worker threads only change instance state
+        for name, instance in self.manager.instances.items():
+            stage = STOP_STAGES.get(instance.stop_stage)
+            self.tabs.tab(self.tab_ids[name], text=f"{name} ⏹ {stage}" if stage else name)
+
+        instance = self.current_instance()
+        if instance is None:
+            running = len(self.manager.running())
+            self.throughput_label.config(text=f"{running} of {len(self.manager.instances)} instances running")
+        else:
+            lines, nbytes = instance.throughput.sample()
+            text = f"{instance.name}: {lines:,.0f} lines/s  {nbytes / 1024:,.1f} KB/s  ({instance.reader_mode} reader)"
+            health = [instance.events.summary(), instance.tick_monitor.summary(), instance.sampler.summary(),
+                      instance.gc_log.summary(), instance.pregen.status()] if instance.is_running() else []
+            self.throughput_label.config(text="    ".join([part for part in health if part] + [text]))
+        self.update_tray_title()
+        self.after(1000, self.update_status)
 
     def send_command(self, event=None):
         cmd = self.command_entry.get().strip()
-        if self.process and self.process.stdin and cmd:
+        instance = self.current_instance()
+        if instance and cmd and instance.uses_rcon():
+            instance.log(f"> {cmd} (RCON)\n")
+            instance.request(cmd).add_done_callback(lambda reply: self.rcon_reply(instance, reply))
+            self.command_entry.delete(0, tk.END)
+        elif instance and instance.is_running() and cmd:
             try:
-                self.process.stdin.write(cmd + "\n")
-                self.process.stdin.flush()
-                self.append_log(f"> {cmd}\n")
+                instance.send(cmd)
+                instance.log(f"> {cmd}\n")
                 self.command_entry.delete(0, tk.END)
             except Exception as e:
-                self.append_log(f"Failed to send command: {str(e)}\n")
+                instance.log(f"Failed to send command: {str(e)}\n")
         else:
             self.append_log("Server not running or command is empty.\n")
 
+    def rcon_reply(self, instance, reply):
+        # Runs on the RCON reader thread; log() only queues for the console pump
+        try:
+            response = reply.result()
+        except Exception as e:
+            instance.log(f"❌ RCON: {str(e)}\n")
+            return
+        if not response.complete:
+            instance.log("⚠ RCON: no reply in time.\n")
+        for line in response.lines:
+            instance.log(line + "\n")
+
     def append_log(self, message):
-        self.log_text.config(state="normal")
-        self.log_text.insert("end", message)
-        self.log_text.see("end")
-        self.log_text.config(state="disabled")
+        # Safe to call from any thread, the pump writes to the widget on the Tk loop
+        self.console.put(message)
 
     def save_config(self):
         config = {
             "server_type": self.selected_server.get(),
             "custom_path": self.custom_path.get(),
             "xms": self.memory_xms.get(),
-            "xmx": self.memory_xmx.get()
+            "xmx": self.memory_xmx.get(),
+            "scrollback_lines": self.console.max_lines,
+            "scrollback_bytes": self.console.max_bytes,
+            "reader_mode": self.reader_mode,
+            "memory_policy": self.memory_policy,
+            "jvm_profiles": {name: profile.to_dict() for name, profile in self.manager.jvm_profiles.items()},
+            "control_api": self.control_api,
+            "instances": self.manager.to_config()
         }
         try:
             with open(CONFIG_FILE, "w") as f:
@@ -201,27 +434,301 @@ class MinecraftServerLauncher(tk.Tk):
                     config = json.load(f)
                     self.selected_server.set(config.get("server_type", "Vanilla"))
                     self.custom_path.set(config.get("custom_path", ""))
-                    self.memory_xms.set(config.get("xms", 1024))
-                    self.memory_xmx.set(config.get("xmx", 2048))
+                    self.memory_xms.set(parse_size_mb(config.get("xms"), 1024))
+                    self.memory_xmx.set(parse_size_mb(config.get("xmx"), 2048))
+                    self.memory_policy = config.get("memory_policy", "recommend")
+                    self.console.set_scrollback(config.get("scrollback_lines", 5000),
+                                                config.get("scrollback_bytes"))
+                    self.reader_mode = config.get("reader_mode", "chunked")
                     self.toggle_custom()
+                    self.manager.jvm_profiles = load_profiles(config.get("jvm_profiles"))
+                    self.jvm_menu.config(values=list(self.manager.jvm_profiles))
+                    self.load_instances(config)
+                    self.control_api.update(config.get("control_api", {}))
+                    self.start_control_api()
                     self.append_log("✔ Profile loaded from config.json\n")
             except Exception as e:
                 self.append_log(f"Failed to load profile: {str(e)}\n")
 
+    def load_instances(self, config):
+        entries = config.get("instances")
+        if entries is None and config.get("server_type"):
+            # Profiles from before instances: one server running in ./server
+            jar_file = self.server_types.get(config["server_type"]) or config.get("custom_path", "")
+            entries = [{"name": "server", "server_type": config["server_type"], "jar_file": jar_file,
+                        "workdir": os.path.join(BASE_DIR, "server"),
+                        "xms": parse_size_mb(config.get("xms"), 1024), "xmx": parse_size_mb(config.get("xmx"), 2048)}]
+
+        for entry in entries or []:
+            settings = dict(entry)
+            name = settings.pop("name")
+            instance = self.manager.get(name)
+            if instance is None:
+                instance = self.manager.create(name, settings.pop("server_type"), settings.pop("jar_file"), **settings)
+                self.add_console_tab(instance)
+            elif not instance.is_running():
+                instance.xms = settings.get("xms", instance.xms)
+                instance.xmx = settings.get("xmx", instance.xmx)
+                instance.jvm_profile = self.manager.jvm_profiles.get(settings.get("jvm_profile"), instance.jvm_profile)
+
+    def start_control_api(self):
+        # Same instances, driven over HTTP/WebSocket by scripts on this machine
+        if not self.control_api.get("enabled") or self.control_server:
+            return
+        settings = self.control_api
+        try:
+            self.control_server = ControlServer(self.manager, settings.get("host", "127.0.0.1"),
+                                                settings.get("port", 8765), settings.get("unix_path"),
+                                                settings.get("token"))
+        except ValueError as e:
+            self.append_log(f"❌ Control API not started: {str(e)}\n")
+            return
+        self.control_server.start()
+        self.append_log(f"✔ Control API listening on {self.control_server.address()}\n")
+
     def stop_server(self):
-        if self.process and self.process.poll() is None:
+        instance = self.current_instance()
+        if instance and (instance.is_active() or instance.uses_rcon()):
+            self.stop_instance(instance)
+        else:
+            self.append_log("⚠ No running server to stop.\n")
+
+    def stop_all_servers(self):
+        # The tray has no selected tab, so it stops every server this launcher runs
+        active = [instance for instance in self.manager.instances.values() if instance.is_active()]
+        if not active:
+            self.append_log("⚠ No running server to stop.\n")
+        for instance in active:
+            self.stop_instance(instance)
+
+    def stop_instance(self, instance):
+        if instance.is_active():
             try:
-                self.append_log("🛑 Stopping server...\n")
-                self.process.terminate()
-                self.process.wait(timeout=10)
-                self.append_log("✔ Server terminated.\n")
-                self.command_entry.config(state="disabled")
+                # A second click while the server is still saving escalates to SIGTERM
+                force = instance.stop_stage in ("saving", "shutting_down")
+                instance.log("🛑 Forcing server to stop...\n" if force else "🛑 Stopping server...\n")
+                instance.stop(on_progress=self.stop_progress, force=force)
+                if instance is self.current_instance():
+                    self.command_entry.config(state="disabled")
             except Exception as e:
-                self.append_log(f"❌ Error stopping server: {str(e)}\n")
+                instance.log(f"❌ Error stopping server: {str(e)}\n")
         else:
-            self.append_log("⚠ No running server to stop.\n")
+            instance.log("🛑 Sending stop over RCON...\n")
+            instance.request("stop").add_done_callback(lambda reply: self.rcon_reply(instance, reply))
+
+    def stop_progress(self, instance, stage):
+        # Called from the stop thread
+        if getattr(self, "tray_icon", None):
+            stage = STOP_STAGES.get(stage)
+            self.tray_icon.title = f"MC Launcher - {instance.name}: {stage}" if stage else "MC Launcher"
+            self.tray_icon.update_menu()
+
+    def update_tray_title(self):
+        if not getattr(self, "tray_icon", None):
+            return
+        if any(i.stop_stage in STOP_STAGES for i in self.manager.instances.values()):
+            return  # stop_progress owns the title while a server is stopping
+        parts = []
+        for instance in self.manager.running():
+            stats = instance.sampler.latest
+            if stats:
+                parts.append(f"{instance.name} {stats['cpu_percent']:.0f}% {stats['rss_mb']}MB")
+            else:
+                parts.append(instance.name)
+        # Windows cuts tray tooltips at 127 characters
+        self.tray_icon.title = ("MC Launcher - " + " | ".join(parts) if parts else "MC Launcher")[:127]
+
+    def tray_stop_text(self, item):
+        stopping = [f"{i.name}: {STOP_STAGES[i.stop_stage]}" for i in self.manager.instances.values()
+                    if i.stop_stage in STOP_STAGES]
+        return f"Stop All Servers ({', '.join(stopping)})" if stopping else "Stop All Servers"
+
+    def backup_world(self):
+        instance = self.current_instance()
+        if instance is None:
+            messagebox.showinfo("Backup", "Select an instance tab first.")
+            return
+        # Runs on the backup thread; progress goes to the instance's console
+        instance.backups.start()
+
+    def open_pregen(self):
+        instance = self.current_instance()
+        if instance is None:
+            messagebox.showinfo("Pre-generate", "Select an instance tab first.")
+            return
+
+        window = tk.Toplevel(self)
+        window.title(f"Pre-generate - {instance.name}")
+        window.configure(bg="#121212")
+        window.resizable(False, False)
+
+        job = instance.pregen.job or instance.pregen.load_job() or {}
+        fields = {
+            "radius": tk.StringVar(value=str(job.get("radius", 5000))),
+            "x": tk.StringVar(value=str(job.get("center", [0, 0])[0])),
+            "z": tk.StringVar(value=str(job.get("center", [0, 0])[1])),
+            "dimension": tk.StringVar(value=job.get("dimension", "minecraft:overworld")),
+            "mspt": tk.StringVar(value=str(instance.pregen.target_mspt)),
+        }
+        labels = [("Radius (blocks)", "radius"), ("Center X", "x"), ("Center Z", "z"), ("Dimension", "dimension"),
+                  ("Target MSPT with players online", "mspt")]
+        for row, (label, key) in enumerate(labels):
+            ttk.Label(window, text=label).grid(row=row, column=0, sticky="w", padx=10, pady=4)
+            tk.Entry(window, textvariable=fields[key], font=("Consolas", 10), bg="#2d3436", fg="#ffffff",
+                     insertbackground="white", relief="flat", borderwidth=4).grid(row=row, column=1, padx=10, pady=4)
+        backend = tk.StringVar(value="auto")
+        ttk.Label(window, text="Generator").grid(row=len(labels), column=0, sticky="w", padx=10, pady=4)
+        ttk.Combobox(window, textvariable=backend, values=["auto", "chunky", "forceload"], state="readonly",
+                     width=18).grid(row=len(labels), column=1, padx=10, pady=4, sticky="w")
+
+        status = ttk.Label(window, text="", font=("Segoe UI", 9))
+        status.grid(row=len(labels) + 2, column=0, columnspan=2, sticky="w", padx=10, pady=(0, 10))
+
+        def start():
+            try:
+                instance.pregen.target_mspt = float(fields["mspt"].get())
+                instance.pregen.start(int(fields["radius"].get()), (int(fields["x"].get()), int(fields["z"].get())),
+                                      fields["dimension"].get().strip(), backend.get())
+            except ValueError as e:
+                messagebox.showerror("Pre-generate", f"Invalid setting: {e}", parent=window)
+
+        buttons = ttk.Frame(window)
+        buttons.grid(row=len(labels) + 1, column=0, columnspan=2, pady=10)
+        ttk.Button(buttons, text="▶ Start", command=start).pack(side="left", padx=5)
+        ttk.Button(buttons, text="⏯ Resume", command=instance.pregen.resume).pack(side="left", padx=5)
+        ttk.Button(buttons, text="⏸ Stop", command=instance.pregen.stop).pack(side="left", padx=5)
+
+        def refresh():
+            if not window.winfo_exists():
+                return
+            status.config(text=instance.pregen.status() or "Progress is saved, so a stopped run can be resumed.")
+            window.after(1000, refresh)
+
+        refresh()
+
+    def open_gc_stats(self):
+        instance = self.current_instance()
+        if instance is None:
+            messagebox.showinfo("GC Stats", "Select an instance tab first.")
+            return
+
+        window = tk.Toplevel(self)
+        window.title(f"GC Pauses - {instance.name}")
+        window.geometry("520x460")
+        window.configure(bg="#121212")
+
+        text = tk.Text(window, bg="#1e1e1e", fg="#00ff00", font=("Consolas", 10), relief="flat", borderwidth=5)
+        text.pack(fill="both", expand=True, padx=10, pady=10)
+
+        def refresh():
+            if not window.winfo_exists():
+                return
+            analyzer = instance.gc_log
+            stats = analyzer.stats()
+            lines = []
+            if not instance.uses_gc_log():
+                lines.append("GC logging is off for this instance; enable it and restart the server.\n")
+            if stats["pauses"]:
+                lines.append(f"Pauses: {stats['pauses']}   p50 {stats['p50_ms']:.1f} ms   "
+                             f"p99 {stats['p99_ms']:.1f} ms   max {stats['max_ms']:.1f} ms\n")
+                peak = max(count for _, count in analyzer.histogram()) or 1
+                for label, count in analyzer.histogram():
+                    lines.append(f"{label:>9} {'█' * (count * 40 // peak):<40} {count}")
+                lines.append("")
+            if stats["alloc_rate_mb_s"] is not None:
+                lines.append(f"Allocation rate: {stats['alloc_rate_mb_s']:.0f} MB/s")
+            if stats["heap_after_mb"] is not None:
+                if stats["live_set_mb"] is not None:
+                    # Rule of thumb: a G1 heap about 3x the live set leaves room for young gen and mixed GCs
+                    live = (f"live set ~{stats['live_set_mb']:.0f} MB -> "
+                            f"Xmx of ~{stats['live_set_mb'] * 3:.0f} MB")
+                else:
+                    live = "live set unknown until a full or mixed collection"
+                lines.append(f"Heap after GC: {stats['heap_after_mb']:.0f} MB of {stats['heap_mb']:.0f} MB, {live}\n")
+                lines.append("Heap after GC trend:")
+                for uptime, after in analyzer.trend(20):
+                    lines.append(f"{uptime:>10.0f}s {after:>8.0f} MB")
+            text.config(state="normal")
+            text.delete("1.0", "end")
+            text.insert("end", "\n".join(lines) or "No GC pauses logged yet.")
+            text.config(state="disabled")
+            window.after(2000, refresh)
+
+        refresh()
+
+    def open_log_search(self):
+        window = tk.Toplevel(self)
+        window.title("Search Console History")
+        window.geometry("800x400")
+        window.configure(bg="#121212")
+
+        query_entry = tk.Entry(window, font=("Consolas", 10), bg="#2d3436", fg="#ffffff",
+                               insertbackground="white", relief="flat", borderwidth=4)
+        query_entry.pack(fill="x", padx=10, pady=10)
+
+        status = ttk.Label(window, text="Type a word or phrase and press Enter.")
+        status.pack(anchor="w", padx=10)
+
+        results = tk.Listbox(window, bg="#1e1e1e", fg="#00ff00", font=("Consolas", 10), relief="flat")
+        results.pack(fill="both", expand=True, padx=10, pady=10)
+
+        searches = [0]  # bumped per search, so a slow older search can't overwrite a newer one
+
+        def show(search, hits, elapsed):
+            if search != searches[0] or not window.winfo_exists():
+                return
+            results.delete(0, tk.END)
+            for segment, number, line in hits:
+                results.insert(tk.END, f"{segment}:{number + 1}  {line}")
+            results.see(tk.END)
+            status.config(text=f"{len(hits)} matches in {elapsed:.1f} ms")
+
+        def search_worker(search, instance, query):
+            # Scanning gzipped segments can take a while; keep it off the Tk loop
+            started = time.perf_counter()
+            try:
+                hits = instance.archive.search(query) if instance else []
+            except Exception as e:
+                self.append_log(f"❌ Log search failed: {str(e)}\n")
+                hits = []
+            elapsed = (time.perf_counter() - started) * 1000
+            try:
+                window.after(0, show, search, hits, elapsed)
+            except (RuntimeError, tk.TclError):
+                pass  # the window was closed meanwhile
+
+        def run_search(event=None):
+            searches[0] += 1
+            status.config(text="Searching...")
+            threading.Thread(target=search_worker, args=(searches[0], self.current_instance(), query_entry.get().strip()),
+                             name="log-search", daemon=True).start()
+
+        query_entry.bind("<Return>", run_search)
+        query_entry.focus_set()
+
+    def on_first_map(self, event):
+        # Children map through the toplevel's bindings too; wait for the window itself
+        if event.widget is not self:
+            return
+        self.unbind("<Map>")
+        # Idle callbacks queued now run after Tk has drawn the mapped window
+        self.after_idle(self.startup_painted)
+
+    def startup_painted(self):
+        STARTUP.mark("first_paint")
+        for line in STARTUP.report(STARTUP_FILE):
+            self.append_log(line)
+        if "--startup-exit" in sys.argv:
+            # Scripted timing runs: one launch, exit status 1 on a regression
+            if self.control_server:
+                self.control_server.stop()
+            self.manager.close()
+            self.destroy()
+            sys.exit(1 if STARTUP.regressed else 0)
+        self.create_tray_icon()
 
     def generate_icon_image(self):
+        from PIL import Image, ImageDraw
         img = Image.new("RGB", (64, 64), color="#00b894")
         draw = ImageDraw.Draw(img)
         draw.rectangle((16, 16, 48, 48), fill="#2d3436")
@@ -229,30 +736,42 @@ class MinecraftServerLauncher(tk.Tk):
         return img
 
     def create_tray_icon(self):
+        threading.Thread(target=self.run_tray_icon, name="tray", daemon=True).start()
+
+    def run_tray_icon(self):
+        try:
+            import pystray
+            image = self.generate_icon_image()
+        except ImportError as e:
+            self.append_log(f"⚠ Tray icon unavailable: {e}\n")
+            return
+
+        # These run on the tray thread: anything that touches Tk goes through the console pump
         def on_show(icon, item):
-            self.deiconify()
+            self.console.call(self.deiconify)
 
         def on_hide(icon, item):
-            self.withdraw()
+            self.console.call(self.withdraw)
 
         def on_stop_server(icon, item):
-            self.stop_server()
+            self.console.call(self.stop_all_servers)
 
         def on_quit(icon, item):
             icon.stop()
-            self.stop_server()
-            self.destroy()
-
-        image = self.generate_icon_image()
+            if self.control_server:
+                self.control_server.stop()
+            # Tray thread, so waiting for every server to save and exit is fine here
+            self.manager.stop_all(wait=True)
+            self.manager.close()
+            self.console.call(self.destroy)
 
         self.tray_icon = pystray.Icon("minecraft_launcher", image, "MC Launcher", menu=pystray.Menu(
             pystray.MenuItem("Show", on_show),
             pystray.MenuItem("Hide", on_hide),
-            pystray.MenuItem("Stop Server", on_stop_server),
+            pystray.MenuItem(self.tray_stop_text, on_stop_server),
             pystray.MenuItem("Exit", on_quit)
         ))
-
-        threading.Thread(target=self.tray_icon.run, daemon=True).start()
+        self.tray_icon.run()
 
     def hide_window(self):
         self.withdraw()
@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import subprocess
 import threading
+import queue
 import os
 
 class MinecraftServerLauncher(tk.Tk):
@@ -21,6 +22,7 @@ class MinecraftServerLauncher(tk.Tk):
         }
 
         self.process = None
+        self.log_queue = queue.SimpleQueue()
         self.selected_server = tk.StringVar(value="Vanilla")
         self.custom_path = tk.StringVar(value="")
 
@@ -29,6 +31,7 @@ class MinecraftServerLauncher(tk.Tk):
         self.customize_style()
 
         self.create_widgets()
+        self.after(50, self.drain_log)
 
     def customize_style(self):
         self.style.configure("TFrame", background="#121212")
@@ -150,10 +153,24 @@ class MinecraftServerLauncher(tk.Tk):
             self.append_log("Server not running or command is empty.\n")
 
     def append_log(self, message):
-        self.log_text.config(state="normal")
-        self.log_text.insert("end", message)
-        self.log_text.see("end")
-        self.log_text.config(state="disabled")
+        # Called from the server thread too, so only queue here
+        self.log_queue.put(message)
+
+    def drain_log(self):
+        batch = []
+        try:
+            while len(batch) < 1000:
+                batch.append(self.log_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        if batch:
+            self.log_text.config(state="normal")
+            self.log_text.insert("end", "".join(batch))
+            self.log_text.see("end")
+            self.log_text.config(state="disabled")
+
+        self.after(1 if not self.log_queue.empty() else 50, self.drain_log)
 
 if __name__ == "__main__":
     MinecraftServerLauncher().mainloop()
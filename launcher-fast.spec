@@ -0,0 +1,51 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Fast-start profile for the multi-instance launcher (1.1/new app.py).
+# One-directory and uncompressed: nothing is unpacked to a temp dir or run
+# through UPX on launch, the bootloader just maps what is already on disk.
+# Build with:  pyinstaller launcher-fast.spec
+# The result is dist/mc-launcher/; ship the whole folder.
+
+
+a = Analysis(
+    ['1.1/new app.py'],
+    pathex=['1.1'],
+    binaries=[],
+    datas=[],
+    # The tray stack is imported lazily, list it so it is still collected
+    hiddenimports=['PIL.Image', 'PIL.ImageDraw', 'pystray'],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=['unittest', 'pydoc', 'doctest', 'lib2to3', 'numpy'],
+    noarchive=False,
+    optimize=0,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='mc-launcher',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='mc-launcher',
+)
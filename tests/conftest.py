@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The launcher's modules live in 1.1/ and import each other as siblings
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "1.1"))
@@ -0,0 +1,100 @@
+import queue
+import threading
+
+import pytest
+
+from CommandChannel import CommandChannel
+
+
+def line(message):
+    return f"[12:00:00] [Server thread/INFO]: {message}"
+
+
+class FakeBus:
+    def __init__(self):
+        self.filters = ()
+        self.published = []
+
+    def add_filter(self, func, first=False):
+        self.filters = (func,) + self.filters if first else self.filters + (func,)
+
+    def publish(self, lines):
+        for func in self.filters:
+            lines = func(lines)
+        self.published.extend(lines)
+
+
+class FakeServer:
+    # Stands in for a ServerInstance: commands written to send() are run in
+    # order on a server thread, which publishes their output on the bus.
+    def __init__(self, server_type, echo):
+        self.server_type = server_type
+        self.echo = echo
+        self.bus = FakeBus()
+        self.send_lock = threading.Lock()
+        self.sent = []
+        self.answering = True
+        self.commands = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def send(self, command):
+        self.sent.append(command)
+        if self.answering:
+            self.commands.put(command)
+
+    def output(self, command):
+        if command == "list":
+            return [line("There are 1 of a max of 20 players online: Steve")]
+        if command == "multi":
+            return [line("line one"), line("line two")]
+        if command == "silent":
+            return []
+        if self.echo:
+            return [line("Unknown or incomplete command, see below for error"), line(command[-10:] + "<--[HERE]")]
+        return [line('Unknown command. Type "/help" for help.')]
+
+    def _run(self):
+        while True:
+            self.bus.publish(self.output(self.commands.get()))
+
+
+@pytest.mark.parametrize("server_type,echo", [("Vanilla", True), ("Pocket Edition (PHP)", False),
+                                              ("Paper", False), ("Paper", True)])
+def test_responses_stay_in_step(server_type, echo):
+    server = FakeServer(server_type, echo)
+    channel = CommandChannel(server)
+    commands = ["list", "bogus", "multi", "silent", "list", "nonsense", "list"]
+    futures = [channel.request(command, timeout=5) for command in commands]
+    responses = [future.result(10) for future in futures]
+    assert all(response.complete for response in responses)
+    assert responses[0].messages() == ["There are 1 of a max of 20 players online: Steve"]
+    assert responses[2].messages() == ["line one", "line two"]
+    assert responses[3].messages() == []
+    assert responses[4].messages() == responses[6].messages() == responses[0].messages()
+    for unknown in (responses[1], responses[5]):
+        assert unknown.lines and "nknown" in unknown.messages()[0]
+    # Marker replies never reach the console
+    assert not any("mcq" in published for published in server.bus.published)
+
+
+def test_no_echo_requests_go_out_one_at_a_time():
+    server = FakeServer("Pocket Edition (PHP)", False)
+    server.answering = False
+    channel = CommandChannel(server)
+    first = channel.request("list", timeout=0.3)
+    channel.request("list", timeout=0.3)
+    assert len(server.sent) == 3
+    assert not first.result(5).complete
+
+
+@pytest.mark.parametrize("echo", [True, False])
+def test_quiet_request_stays_off_the_console(echo):
+    server = FakeServer("Vanilla" if echo else "Pocket Edition (PHP)", echo)
+    channel = CommandChannel(server)
+    quiet = channel.request("list", timeout=5, quiet=True)
+    loud = channel.request("multi", timeout=5)
+    unknown = channel.request("bogus", timeout=5, quiet=True)
+    assert quiet.result(10).messages() == ["There are 1 of a max of 20 players online: Steve"]
+    assert loud.result(10).messages() == ["line one", "line two"]
+    assert unknown.result(10).complete
+    assert server.bus.published == [line("line one"), line("line two")]
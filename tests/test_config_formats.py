@@ -0,0 +1,81 @@
+import pytest
+
+from ConfigFormats import ConfigIndex, open_document
+
+YAML = """\
+# Paper world settings
+settings:
+  spawn-limits:
+    monsters: 70
+    animals: 10
+  view-distance: 8
+level-name: world_nether
+motd: A Minecraft Server
+"""
+
+
+def index_for(tmp_path, text, name="config.yml"):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return ConfigIndex(open_document(str(path)))
+
+
+def test_children_are_worked_out_per_section(tmp_path):
+    index = index_for(tmp_path, YAML)
+    assert index.children == {}
+    assert list(index.children_of(())) == [("settings",), ("level-name",), ("motd",)]
+    assert list(index.children_of(("settings",))) == [("settings", "spawn-limits"), ("settings", "view-distance")]
+    assert set(index.children) == {(), ("settings",)}
+    assert index.is_container(("settings", "spawn-limits"))
+    assert not index.is_container(("settings", "view-distance"))
+
+
+def test_filter_matches_word_prefixes(tmp_path):
+    index = index_for(tmp_path, YAML)
+    assert index.search("monst") == [("settings", "spawn-limits", "monsters")]
+    assert index.search("level world_n") == [("level-name",)]
+    assert index.search("SPAWN 70") == [("settings", "spawn-limits", "monsters")]
+    assert index.search("onsters") == []
+    assert len(index.search("settings", limit=2)) == 2
+
+
+def test_edits_keep_children_and_filter_current(tmp_path):
+    index = index_for(tmp_path, YAML)
+    document = index.document
+    index.children_of(("settings",))
+    index.search("x")
+
+    document.set(("settings", "simulation-distance"), 6)
+    index.add(("settings", "simulation-distance"), 6)
+    assert ("settings", "simulation-distance") in index.children_of(("settings",))
+    assert index.search("simulation") == [("settings", "simulation-distance")]
+
+    document.set(("motd",), "Survival")
+    index.update(("motd",), "Survival")
+    assert index.search("minecraft") == []
+    assert index.search("surv") == [("motd",)]
+
+    document.delete(("settings", "spawn-limits"))
+    index.remove(("settings", "spawn-limits"))
+    assert ("settings", "spawn-limits") not in index.children_of(("settings",))
+    assert index.search("monsters") == []
+    assert index.count() == 4
+
+
+def test_rename_moves_the_value(tmp_path):
+    path = tmp_path / "server.properties"
+    path.write_text("# Minecraft server properties\nmax-players=20\nmotd=Hello\n", encoding="utf-8")
+    document = open_document(str(path))
+    document.rename(("max-players",), ("max-player-count",), "20")
+    document.save()
+    assert path.read_text(encoding="utf-8") == "# Minecraft server properties\nmotd=Hello\nmax-player-count=20\n"
+
+
+def test_rejected_rename_keeps_the_old_entry(tmp_path):
+    path = tmp_path / "ops.json"
+    path.write_text('{"level": 4, "name": "Steve"}', encoding="utf-8")
+    document = open_document(str(path))
+    with pytest.raises(TypeError):
+        document.rename(("level",), ("name", "level"), 4)
+    assert document.entries() == [(("level",), 4), (("name",), "Steve")]
+    assert not document.dirty
@@ -0,0 +1,70 @@
+import threading
+import time
+
+from ConsoleArchive import ConsoleArchive
+
+
+def archive_with(tmp_path, lines, **kwargs):
+    archive = ConsoleArchive(str(tmp_path), **kwargs)
+    for line in lines:
+        archive.write(line)
+    return archive
+
+
+def wait_written(archive, count):
+    deadline = time.monotonic() + 5
+    while archive.active_lines < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+LINES = [
+    "[12:00:00] [Server thread/INFO]: Steve joined the game",
+    "[12:00:01] [Server thread/INFO]: <Steve> hello world",
+    "[12:00:02] [Server thread/INFO]: Alex joined the game",
+    "[12:00:03] [Server thread/INFO]: Steve left the game",
+]
+
+
+def test_whole_and_partial_words(tmp_path):
+    archive = archive_with(tmp_path, LINES)
+    wait_written(archive, len(LINES))
+    assert [number for _, number, _ in archive.search("Steve")] == [0, 1, 3]
+    assert [number for _, number, _ in archive.search("Stev")] == [0, 1, 3]
+    assert [number for _, number, _ in archive.search("teve")] == [0, 1, 3]
+    assert [number for _, number, _ in archive.search("ex join")] == [2]
+    assert [number for _, number, _ in archive.search("<Steve> hel")] == [1]
+    assert archive.search("Steven") == []
+    archive.close()
+    # The same answers from the sealed, gzipped segment
+    archive = ConsoleArchive(str(tmp_path))
+    assert [number for _, number, _ in archive.search("Stev")] == [0, 1, 3]
+    assert [number for _, number, _ in archive.search("join")] == [0, 2]
+    archive.close()
+
+
+def test_carriage_return_keeps_line_numbers(tmp_path):
+    lines = ["first line", "progress 10%\rprogress 100%", "third line", "fourth line"]
+    archive = archive_with(tmp_path, lines)
+    archive.close()
+    archive = ConsoleArchive(str(tmp_path))
+    assert [(number, line) for _, number, line in archive.search("fourth")] == [(3, "fourth line")]
+    assert [number for _, number, _ in archive.search("progress 100")] == [1]
+    archive.close()
+
+
+def test_leftover_segment_is_sealed_by_the_writer(tmp_path, monkeypatch):
+    (tmp_path / "console-20261018-120000.log").write_text("\n".join(LINES) + "\n", encoding="utf-8")
+    sealed_on = []
+    seal = ConsoleArchive._seal
+
+    def recording_seal(archive, segment):
+        sealed_on.append(threading.current_thread())
+        seal(archive, segment)
+
+    monkeypatch.setattr(ConsoleArchive, "_seal", recording_seal)
+    archive = ConsoleArchive(str(tmp_path))
+    archive.close()
+    assert sealed_on and threading.main_thread() not in sealed_on
+    assert (tmp_path / "console-20261018-120000.log.gz").exists()
+    assert not (tmp_path / "console-20261018-120000.log").exists()
+    assert [number for _, number, _ in archive.search("Steve")] == [0, 1, 3]
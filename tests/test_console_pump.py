@@ -0,0 +1,53 @@
+import threading
+
+from ConsolePump import ConsolePump
+
+
+class FakeText:
+    # Just enough of a Tk Text widget: after() callbacks are run by hand
+    def __init__(self):
+        self.content = ""
+        self.scheduled = []
+
+    def after(self, delay, func):
+        self.scheduled.append(func)
+        return len(self.scheduled)
+
+    def after_cancel(self, after_id):
+        pass
+
+    def config(self, **options):
+        pass
+
+    def insert(self, index, text):
+        self.content += text
+
+    def see(self, index):
+        pass
+
+    def tick(self):
+        self.scheduled.pop(0)()
+
+
+def test_calls_run_on_the_tick_after_earlier_lines():
+    text = FakeText()
+    pump = ConsolePump(text)
+    pump.start()
+    seen = []
+    worker = threading.Thread(target=lambda: (pump.put("stopping\n"), pump.call(lambda: seen.append(text.content))))
+    worker.start()
+    worker.join()
+    assert seen == []
+    text.tick()
+    assert seen == ["stopping\n"]
+    assert text.content == "stopping\n"
+    assert pump.lines_drained == 1
+
+
+def test_a_call_may_end_the_loop():
+    text = FakeText()
+    pump = ConsolePump(text)
+    pump.start()
+    pump.call(text.scheduled.clear)  # like destroy(): nothing scheduled survives it
+    text.tick()
+    assert text.scheduled == []
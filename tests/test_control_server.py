@@ -0,0 +1,114 @@
+import base64
+import json
+import os
+import socket
+import struct
+import time
+
+import pytest
+
+from ControlServer import ControlServer
+from ServerInstance import InstanceManager
+
+TOKEN = "s3cret"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def api(tmp_path):
+    manager = InstanceManager(str(tmp_path))
+    manager.create("a", "Vanilla", str(tmp_path / "server.jar"), tick_interval=0, sample_interval=0)
+    server = ControlServer(manager, port=free_port(), token=TOKEN)
+    server.start()
+    deadline = time.monotonic() + 5
+    while server.server is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    yield server
+    server.stop()
+    manager.close()
+
+
+def raw_request(api, head):
+    with socket.create_connection((api.host, api.port), timeout=5) as sock:
+        sock.sendall(head.encode("latin-1"))
+        data = b""
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            data += chunk
+            if b"\r\n\r\n" in data:
+                head, _, body = data.partition(b"\r\n\r\n")
+                length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+                if len(body) >= length:
+                    break
+    status = int(data.split(b" ", 2)[1])
+    return status, json.loads(data.partition(b"\r\n\r\n")[2])
+
+
+def test_token_required(api):
+    assert raw_request(api, "GET /instances HTTP/1.1\r\n\r\n")[0] == 401
+    assert raw_request(api, "GET /instances HTTP/1.1\r\nAuthorization: Bearer s3cre\r\n\r\n")[0] == 401
+    assert raw_request(api, f"GET /instances HTTP/1.1\r\nAuthorization: Bearer {TOKEN}\r\n\r\n")[0] == 200
+    assert raw_request(api, f"GET /instances?token={TOKEN} HTTP/1.1\r\n\r\n")[0] == 200
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1e3"])
+def test_bad_content_length(api, length):
+    status, data = raw_request(api, f"POST /instances/a/command?token={TOKEN} HTTP/1.1\r\n"
+                                    f"Content-Length: {length}\r\n\r\n")
+    assert status == 400
+    assert "Content-Length" in data["error"]
+
+
+def test_console_stream_wakes_on_publish(api):
+    instance = api.manager.get("a")
+    with socket.create_connection((api.host, api.port), timeout=5) as sock:
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        sock.sendall(f"GET /instances/a/console?token={TOKEN} HTTP/1.1\r\nUpgrade: websocket\r\n"
+                     f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n\r\n".encode("latin-1"))
+        response = b""
+        while b"\r\n\r\n" not in response:
+            response += sock.recv(1)
+        assert response.startswith(b"HTTP/1.1 101")
+        time.sleep(0.2)  # the stream task is idle now, waiting for the bus
+
+        started = time.monotonic()
+        instance.bus.publish(["[12:00:00] [Server thread/INFO]: hello\n"])
+        header = sock.recv(2, socket.MSG_WAITALL)
+        size = header[1] & 0x7F
+        if size == 126:
+            size = struct.unpack("!H", sock.recv(2, socket.MSG_WAITALL))[0]
+        frame = json.loads(sock.recv(size, socket.MSG_WAITALL))
+        assert frame["lines"] == ["[12:00:00] [Server thread/INFO]: hello\n"]
+        assert time.monotonic() - started < 1.0
+
+
+@pytest.mark.parametrize("body", ["[]", "null", "5", '{"command": 5}', "{}"])
+def test_bad_command_body(api, body):
+    status, data = raw_request(api, f"POST /instances/a/command?token={TOKEN} HTTP/1.1\r\n"
+                                    f"Content-Length: {len(body)}\r\n\r\n{body}")
+    assert status == 400
+
+
+def test_rcon_password_not_exposed(api):
+    api.manager.get("a").rcon_settings = {"host": "127.0.0.1", "port": 25575, "password": "hunter2"}
+    status, data = raw_request(api, f"GET /instances?token={TOKEN} HTTP/1.1\r\n\r\n")
+    assert status == 200
+    assert data[0]["rcon"] == {"host": "127.0.0.1", "port": 25575}
+    assert "hunter2" not in json.dumps(data)
+    assert api.manager.get("a").to_dict()["rcon"]["password"] == "hunter2"
+
+
+def test_public_host_needs_token(tmp_path):
+    manager = InstanceManager(str(tmp_path))
+    with pytest.raises(ValueError):
+        ControlServer(manager, host="0.0.0.0")
+    ControlServer(manager, host="0.0.0.0", token=TOKEN)
+    ControlServer(manager, host="localhost")
+    manager.close()
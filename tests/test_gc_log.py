@@ -0,0 +1,49 @@
+from GcLog import GcLogAnalyzer
+
+LOG = """\
+[2026-10-18T12:00:01.000+0000][1.000s][info][gc] GC(0) Pause Young (Normal) (G1 Evacuation Pause) 300M->120M(4096M) 4.000ms
+[2026-10-18T12:00:05.000+0000][5.000s][info][gc] GC(1) Pause Young (Concurrent Start) (G1 Humongous Allocation) 2900M->2700M(4096M) 9.500ms
+[2026-10-18T12:00:05.500+0000][5.500s][info][gc] GC(2) Pause Remark 2750M->2650M(4096M) 3.200ms
+[2026-10-18T12:00:06.000+0000][6.000s][info][gc] GC(2) Pause Cleanup 2650M->2650M(4096M) 0.100ms
+[2026-10-18T12:00:08.000+0000][8.000s][info][gc] GC(3) Pause Young (Prepare Mixed) (G1 Evacuation Pause) 2800M->2600M(4096M) 8.000ms
+[2026-10-18T12:00:09.000+0000][9.000s][info][gc] GC(4) Pause Young (Mixed) (G1 Evacuation Pause) 2700M->1100M(4096M) 12.000ms
+[2026-10-18T12:00:10.000+0000][10.000s][info][gc] GC(5) Pause Young (Mixed) (G1 Evacuation Pause) 1300M->900M(4096M) 11.000ms
+[2026-10-18T12:00:20.000+0000][20.000s][info][gc] GC(6) Pause Full (System.gc()) 1500M->850M(4096M) 250.000ms
+[2026-10-18T12:00:21.000+0000][21.000s][info][gc] GC(7) Pause Young (Normal) (G1 Evacuation Pause) 3000M->2900M(4096M) 6.000ms
+"""
+
+
+def analyzer_with(text):
+    analyzer = GcLogAnalyzer("unused")
+    for line in text.splitlines():
+        analyzer.feed(line)
+    return analyzer
+
+
+def test_parses_every_pause():
+    analyzer = analyzer_with(LOG)
+    stats = analyzer.stats()
+    assert stats["pauses"] == 9
+    assert stats["max_ms"] == 250.0
+    assert stats["heap_after_mb"] == 2900.0
+    assert stats["heap_mb"] == 4096.0
+
+
+def test_live_set_ignores_young_and_remark():
+    stats = analyzer_with(LOG).stats()
+    # Young, Remark and Prepare Mixed pauses peak at 2900 MB; only the mixed and full ones count
+    assert stats["live_set_mb"] == 850.0
+
+
+def test_no_live_set_before_old_collection():
+    young_only = "\n".join(line for line in LOG.splitlines() if "(Mixed)" not in line and "Full" not in line)
+    analyzer = analyzer_with(young_only)
+    assert analyzer.stats()["pauses"] == 6
+    assert analyzer.stats()["live_set_mb"] is None
+
+
+def test_zgc_phases_have_no_heap_numbers():
+    analyzer = analyzer_with("[1.000s][info][gc,phases] GC(3) Y: Pause Mark Start 0.012ms\n"
+                             "[1.100s][info][gc,phases] GC(3) O: Pause Mark End 0.020ms")
+    assert [kind for _, kind, _ in analyzer.pauses] == ["Pause Mark Start", "Pause Mark End"]
+    assert analyzer.stats()["live_set_mb"] is None
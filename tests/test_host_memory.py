@@ -0,0 +1,26 @@
+from HostMemory import max_heap_mb, recommend_heap
+
+
+def host(total, available, reserve=1024):
+    return {"total": total, "available": available, "cgroup_limit": None, "limit": total, "reserve": reserve}
+
+
+def test_recommendation_fits_the_whole_machine():
+    assert recommend_heap(host(16384, 15500)) == (12288, 12288)
+    assert max_heap_mb(host(16384, 14000)) == 12288
+
+
+def test_recommendation_is_capped_by_available_memory():
+    # Browsers and the like already use most of the RAM
+    assert recommend_heap(host(16384, 6000)) == (4608, 4608)
+    assert max_heap_mb(host(16384, 6000)) == 12288
+
+
+def test_other_instances_come_out_of_available_memory():
+    # A running 4G instance takes its heap plus 1G of JVM overhead
+    assert recommend_heap(host(16384, 10000), [4096]) == (3840, 3840)
+    assert recommend_heap(host(16384, 3000), [4096]) == (512, 512)
+
+
+def test_unknown_host():
+    assert recommend_heap(None) is None
@@ -0,0 +1,35 @@
+from OutputReader import ChunkedLineReader
+
+
+class ChunkedStream:
+    # readinto() hands out the given byte strings one per call
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def readinto(self, buffer):
+        if not self.chunks:
+            return 0
+        chunk = self.chunks.pop(0)
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+def read_lines(chunks):
+    return [line for batch in ChunkedLineReader(ChunkedStream(chunks), chunk_size=64) for line in batch]
+
+
+def test_crlf_split_across_reads():
+    assert read_lines([b"one\r", b"\ntwo\r\n"]) == ["one\n", "two\n"]
+    assert read_lines([b"one\r\ntwo\r", b"\nthree\r\n"]) == ["one\n", "two\n", "three\n"]
+    assert read_lines([b"one\r\n\r", b"\n"]) == ["one\n", "\n"]
+
+
+def test_lone_carriage_returns_stay_in_the_line():
+    assert read_lines([b"progress 10%\r", b"progress 100%\n"]) == ["progress 10%\rprogress 100%\n"]
+    assert read_lines([b"last line\r"]) == ["last line\n"]
+
+
+def test_partial_lines_and_utf8_across_reads():
+    snowman = "☃ ready\n".encode("utf-8")
+    assert read_lines([b"Done (3.2s)! For help, type ", b'"help"\n', snowman[:2], snowman[2:]]) == \
+        ['Done (3.2s)! For help, type "help"\n', "☃ ready\n"]
@@ -0,0 +1,158 @@
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from Rcon import (SERVERDATA_AUTH, SERVERDATA_EXECCOMMAND, SERVERDATA_RESPONSE_VALUE, RconAuthError,
+                  RconConnection, RconError, RconPool, encode_packet)
+
+PASSWORD = "hunter2"
+LONG_REPLY = "".join(f"line {n}\n" for n in range(2000))  # well over one 4096 byte packet
+
+
+class FakeRconServer:
+    # Answers like a vanilla server: replies longer than 4096 bytes are split
+    # over several packets, and a packet of an unknown type is answered with
+    # "Unknown request" after everything sent before it.
+    def __init__(self):
+        self.listener = socket.socket()
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen()
+        self.port = self.listener.getsockname()[1]
+        self.accepted = 0
+        self.commands = []
+        self.clients = []
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                return
+            self.accepted += 1
+            self.clients.append(client)
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    def _read(self, client, size):
+        data = b""
+        while len(data) < size:
+            chunk = client.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError
+            data += chunk
+        return data
+
+    def _serve(self, client):
+        try:
+            while True:
+                length = struct.unpack("<i", self._read(client, 4))[0]
+                data = self._read(client, length)
+                request_id, packet_type = struct.unpack("<ii", data[:8])
+                body = data[8:-2].decode("utf-8")
+                if packet_type == SERVERDATA_AUTH:
+                    ok = body == PASSWORD
+                    client.sendall(encode_packet(request_id if ok else -1, SERVERDATA_EXECCOMMAND, ""))
+                    if not ok:
+                        return
+                elif packet_type == SERVERDATA_EXECCOMMAND:
+                    self.commands.append(body)
+                    reply = LONG_REPLY if body == "long" else f"ran {body}"
+                    for start in range(0, max(len(reply), 1), 4096):
+                        client.sendall(encode_packet(request_id, SERVERDATA_RESPONSE_VALUE,
+                                                     reply[start:start + 4096]))
+                else:
+                    client.sendall(encode_packet(request_id, SERVERDATA_RESPONSE_VALUE,
+                                                 f"Unknown request {packet_type:x}"))
+        except OSError:
+            pass
+        finally:
+            client.close()
+
+    def close(self):
+        self.listener.close()
+        for client in self.clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+@pytest.fixture
+def server():
+    server = FakeRconServer()
+    yield server
+    server.close()
+
+
+def test_wrong_password(server):
+    with pytest.raises(RconAuthError):
+        RconConnection("127.0.0.1", server.port, "wrong")
+
+
+def test_pool_reports_wrong_password(server):
+    pool = RconPool("127.0.0.1", server.port, "wrong")
+    with pytest.raises(RconAuthError):
+        pool.run("list")
+    pool.close()
+
+
+def test_multi_packet_reply(server):
+    conn = RconConnection("127.0.0.1", server.port, PASSWORD)
+    assert conn.request("long").result(5) == LONG_REPLY
+    conn.close()
+
+
+def test_pipelined_requests(server):
+    conn = RconConnection("127.0.0.1", server.port, PASSWORD)
+    futures = [conn.request("long" if n % 3 == 0 else f"cmd {n}") for n in range(30)]
+    for n, future in enumerate(futures):
+        assert future.result(5) == (LONG_REPLY if n % 3 == 0 else f"ran cmd {n}")
+    assert conn.in_flight() == 0
+    conn.close()
+
+
+def test_pool_reuses_connection(server):
+    pool = RconPool("127.0.0.1", server.port, PASSWORD, size=2)
+    for n in range(10):
+        assert pool.run(f"say {n}") == f"ran say {n}"
+    assert server.accepted == 1
+    pool.close()
+
+
+def test_pool_replaces_broken_connection(server):
+    pool = RconPool("127.0.0.1", server.port, PASSWORD)
+    assert pool.run("list") == "ran list"
+    pool.connections[0].close()
+    assert pool.run("list") == "ran list"
+    assert server.accepted == 2
+    pool.close()
+
+
+def test_unreachable_server_fails_without_blocking():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    port = listener.getsockname()[1]
+    listener.close()  # nothing listens here any more
+    pool = RconPool("127.0.0.1", port, PASSWORD, timeout=1.0)
+    future = pool.request("list")
+    with pytest.raises(RconError):
+        future.result(5)
+    pool.close()
+
+
+def test_request_does_not_wait_for_connect():
+    # Accepts the TCP connection but never answers the login
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    pool = RconPool("127.0.0.1", listener.getsockname()[1], PASSWORD, timeout=1.0)
+    started = time.monotonic()
+    future = pool.request("list")
+    assert time.monotonic() - started < 0.5
+    with pytest.raises(RconError):
+        future.result(5)
+    pool.close()
+    listener.close()
@@ -0,0 +1,81 @@
+import struct
+
+from RegionScan import SECTOR, find_regions, fragmentation, scan_region, summarize
+
+
+def write_region(path, chunks, sectors, stamps=None):
+    # chunks: {slot: (sector offset, sector count, timestamp)}; stamps adds
+    # timestamps for slots that have no location
+    locations = [0] * 1024
+    timestamps = [0] * 1024
+    for slot, (offset, count, stamp) in chunks.items():
+        locations[slot] = offset << 8 | count
+        timestamps[slot] = stamp
+    for slot, stamp in (stamps or {}).items():
+        timestamps[slot] = stamp
+    data = struct.pack(">1024I", *locations) + struct.pack(">1024I", *timestamps)
+    path.write_bytes(data + b"\0" * (sectors * SECTOR - len(data)))
+    return str(path)
+
+
+def test_header_counts_chunks_and_timestamps(tmp_path):
+    path = write_region(tmp_path / "r.-1.2.mca", {0: (2, 1, 1700000000), 31: (3, 2, 1700000500),
+                                                  1023: (5, 1, 1699999000)}, sectors=6)
+    result = scan_region(path)
+    assert (result["x"], result["z"]) == (-1, 2)
+    assert result["chunks"] == 3
+    assert result["used_sectors"] == 4
+    assert result["file_sectors"] == 6
+    assert result["free_sectors"] == result["gaps"] == 0
+    assert (result["oldest"], result["newest"]) == (1699999000, 1700000500)
+    assert result["error"] is None
+
+
+def test_timestamps_only_count_for_stored_chunks(tmp_path):
+    # A timestamp without a location is left over from a deleted chunk; a
+    # stored chunk with timestamp 0 has never been stamped
+    path = write_region(tmp_path / "r.0.0.mca", {0: (2, 1, 0), 1: (3, 1, 1700000000)}, sectors=4,
+                        stamps={500: 1800000000, 501: 1})
+    result = scan_region(path)
+    assert result["chunks"] == 2
+    assert (result["oldest"], result["newest"]) == (1700000000, 1700000000)
+
+
+def test_holes_and_trailing_slack(tmp_path):
+    # Chunks at sectors 2 and 6-7 in a 10 sector file: a 3 sector hole, 2 free at the end
+    path = write_region(tmp_path / "r.0.0.mca", {7: (6, 2, 1), 3: (2, 1, 1)}, sectors=10)
+    result = scan_region(path)
+    assert result["gaps"] == 1
+    assert result["free_sectors"] == 5
+    assert fragmentation(result) == 5 / 8
+
+
+def test_damaged_entries(tmp_path):
+    path = write_region(tmp_path / "r.0.0.mca", {0: (2, 2, 1), 1: (3, 1, 1), 2: (1, 1, 1), 3: (9, 0, 1),
+                                                 4: (5, 4, 1)}, sectors=6)
+    result = scan_region(path)
+    assert result["invalid"] == 2  # inside the header, and a zero length
+    assert result["overlaps"] == 1
+    assert result["outside"] == 1
+    assert result["chunks"] == 3
+    assert summarize([result])[str(tmp_path.parent)]["damaged"] == 1
+
+
+def test_empty_and_truncated_files(tmp_path):
+    (tmp_path / "r.0.0.mca").write_bytes(b"")
+    (tmp_path / "r.0.1.mca").write_bytes(b"\0" * 100)
+    empty = scan_region(str(tmp_path / "r.0.0.mca"))
+    truncated = scan_region(str(tmp_path / "r.0.1.mca"))
+    assert empty["error"] is None and empty["chunks"] == 0
+    assert truncated["error"] == "truncated header"
+    assert truncated["file_sectors"] == 1
+
+
+def test_finds_regions_of_every_dimension(tmp_path):
+    for folder in ("world/region", "world/DIM-1/region", "world/entities"):
+        (tmp_path / folder).mkdir(parents=True)
+        write_region(tmp_path / folder / "r.0.0.mca", {}, sectors=2)
+    (tmp_path / "world/region/r.0.0.mca.bak").write_bytes(b"")
+    found = find_regions([str(tmp_path / "world")])
+    assert [path[len(str(tmp_path)) + 1:].replace("\\", "/") for path in found] == \
+        ["world/DIM-1/region/r.0.0.mca", "world/region/r.0.0.mca"]
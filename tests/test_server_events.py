@@ -0,0 +1,53 @@
+import pytest
+
+from ServerEvents import DEATH, JOIN, LEAVE, EventExtractor
+
+
+def line(message):
+    return f"[12:00:00] [Server thread/INFO]: {message}"
+
+
+@pytest.mark.parametrize("message", [
+    "Steve was slain by Zombie",
+    "Steve was shot by Skeleton",
+    "Steve was blown up by Creeper",
+    "Steve was killed by magic",
+    "Steve was squashed by a falling anvil",
+    "Steve was struck by lightning",
+    "Steve fell from a high place",
+    "Steve fell out of the world",
+    "Steve drowned",
+    "Steve drowned whilst trying to escape Drowned",
+    "Steve hit the ground too hard",
+    "Steve tried to swim in lava",
+    "Steve went up in flames",
+    "Steve died",
+    "Steve left the confines of this world",
+    "Steve experienced kinetic energy",
+])
+def test_death_messages(message):
+    event = EventExtractor("Vanilla").classify(line(message))
+    assert event is not None and event.kind == DEATH
+    assert event.player == "Steve"
+    assert event.text == message[len("Steve "):]
+
+
+@pytest.mark.parametrize("message", [
+    "Server was unable to bind to port",
+    "Steve was kicked for floating too long",
+    "Steve was banned by an operator",
+    "World was saved",
+    "Steve walked away",
+    "Steve hit the road",
+    "Steve fell asleep",
+    "Steve got an item",
+    "Steve drownedd",
+])
+def test_not_deaths(message):
+    assert EventExtractor("Vanilla").classify(line(message)) is None
+
+
+def test_sessions_are_not_deaths():
+    extractor = EventExtractor("Paper")
+    assert extractor.classify("[12:00:00 INFO]: Steve joined the game").kind == JOIN
+    assert extractor.classify("[12:00:00 INFO]: Steve left the game").kind == LEAVE
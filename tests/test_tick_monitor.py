@@ -0,0 +1,59 @@
+from concurrent.futures import Future
+
+from CommandChannel import Response
+from TickMonitor import TickMonitor
+
+PAPER = {
+    "tps": ["§6TPS from last 1m, 5m, 15m: §a19.8, §a*20.0, §a20.0"],
+    "mspt": ["§6Server tick times §e(§7avg§e/§7min§e/§7max§e)§6 from last 5s§7,§6 10s§7,§6 1m§e:",
+             "§6◴ §a12.5§7/§a3.1§7/§a48.0§e, §a11.0§7/§a3.0§7/§a50.0§e, §a10.0§7/§a2.9§7/§a61.0"],
+}
+VANILLA = {
+    "tps": ["Unknown or incomplete command, see below for error", "tps<--[HERE]"],
+    "tick query": ["The game is running normally", "Target tick rate: 20.0 per second.",
+                   "Average time per tick: 25.0ms (Target: 50.0ms)"],
+}
+
+
+class FakeInstance:
+    # Answers request() the way ServerInstance does, from a table of replies
+    def __init__(self, server_type, replies):
+        self.name = "test"
+        self.server_type = server_type
+        self.replies = replies
+        self.requests = []
+
+    def request(self, command, timeout=None, quiet=False):
+        self.requests.append((command, quiet))
+        future = Future()
+        if self.replies is None:
+            future.set_exception(RuntimeError("test is not running"))
+        else:
+            future.set_result(Response(command, self.replies.get(command, []), True))
+        return future
+
+
+def test_paper():
+    instance = FakeInstance("Paper", PAPER)
+    monitor = TickMonitor(instance)
+    assert monitor.probe() == 12.5
+    assert monitor.flavour == "paper"
+    assert (monitor.tps, monitor.mspt_max) == (19.8, 48.0)
+    assert instance.requests == [("tps", True), ("mspt", True)]
+
+
+def test_vanilla_detected_from_unknown_command():
+    instance = FakeInstance("Vanilla", VANILLA)
+    monitor = TickMonitor(instance)
+    assert monitor.probe() == 25.0
+    assert monitor.flavour == "vanilla"
+    assert monitor.tps == 20.0
+    monitor.probe()
+    assert [command for command, _ in instance.requests] == ["tps", "tick query", "tick query"]
+
+
+def test_no_answer_keeps_flavour_open():
+    instance = FakeInstance("Paper", None)
+    monitor = TickMonitor(instance)
+    assert monitor.probe() is None
+    assert monitor.flavour is None
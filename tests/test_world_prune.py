@@ -0,0 +1,92 @@
+import mmap
+import os
+import struct
+import zlib
+
+import WorldPrune
+from RegionScan import ENTRIES, SECTOR, scan_region
+from WorldPrune import ZLIB, chunk_values, prune_region
+
+SETTINGS = {"min_inhabited": 1200, "keep_after": None, "protect": [], "apply": False}
+
+
+def chunk_nbt(inhabited, last_update=0):
+    def long_tag(name, value):
+        return b"\x04" + struct.pack(">H", len(name)) + name.encode() + struct.pack(">q", value)
+
+    # Padding ahead of the fields, so the chunks don't all compress to a few bytes
+    padding = b"\x07" + struct.pack(">H", 4) + b"Pads" + struct.pack(">i", 6000) + os.urandom(6000)
+    return b"\x0a\x00\x00" + padding + long_tag("InhabitedTime", inhabited) + long_tag("LastUpdate", last_update) + b"\x00"
+
+
+def write_region(path, chunks, holes=()):
+    # chunks: [(slot, inhabited)] stored in that order; holes: slots after
+    # which an unused sector is left behind
+    path.parent.mkdir(parents=True, exist_ok=True)
+    locations, timestamps = [0] * 1024, [0] * 1024
+    body = b""
+    for slot, inhabited in chunks:
+        payload = zlib.compress(chunk_nbt(inhabited))
+        data = struct.pack(">IB", len(payload) + 1, ZLIB) + payload
+        sectors = -(-len(data) // SECTOR)
+        locations[slot] = (2 + len(body) // SECTOR) << 8 | sectors
+        timestamps[slot] = 1700000000 + slot
+        body += data + bytes(sectors * SECTOR - len(data))
+        if slot in holes:
+            body += bytes(SECTOR)
+    path.write_bytes(ENTRIES.pack(*locations) + ENTRIES.pack(*timestamps) + body)
+    return str(path)
+
+
+def read_chunks(path):
+    # {slot: (inhabited, timestamp, raw chunk bytes)}
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        locations = ENTRIES.unpack_from(view, 0)
+        timestamps = ENTRIES.unpack_from(view, SECTOR)
+        chunks = {}
+        for slot, location in enumerate(locations):
+            if location:
+                start = (location >> 8) * SECTOR
+                length = int.from_bytes(view[start:start + 4], "big")
+                values = chunk_values(view, location, os.path.dirname(path), slot % 32, slot // 32)
+                chunks[slot] = (values["inhabited"], timestamps[slot], view[start:start + 4 + length])
+        return chunks
+
+
+def test_compaction_round_trip(tmp_path):
+    region = write_region(tmp_path / "world" / "region" / "r.0.0.mca",
+                          [(0, 0), (1, 5000), (33, 10), (40, 2400)], holes=(1,))
+    entities = write_region(tmp_path / "world" / "entities" / "r.0.0.mca", [(0, 0), (40, 0)])
+    before = read_chunks(region)
+
+    dry = prune_region((SETTINGS, region))
+    assert (dry["chunks"], dry["dropped"]) == (4, 2)
+    assert read_chunks(region) == before
+
+    result = prune_region((dict(SETTINGS, apply=True), region))
+    after = read_chunks(region)
+    assert sorted(after) == [1, 40]
+    assert all(after[slot] == before[slot] for slot in after)
+    assert result["new_size"] == dry["new_size"] == os.path.getsize(region)
+    scan = scan_region(region)
+    assert (scan["chunks"], scan["free_sectors"], scan["gaps"]) == (2, 0, 0)
+    # The dropped chunks' entities go with them
+    assert sorted(read_chunks(entities)) == [40]
+
+
+def test_emptied_region_is_removed(tmp_path):
+    region = write_region(tmp_path / "region" / "r.1.1.mca", [(5, 0), (6, 100)])
+    result = prune_region((dict(SETTINGS, apply=True), region))
+    assert result["dropped"] == 2
+    assert result["new_size"] == 0
+    assert not os.path.exists(region)
+
+
+def test_busy_world_warns_on_dry_run_and_refuses_apply(tmp_path, monkeypatch, capsys):
+    write_region(tmp_path / "region" / "r.0.0.mca", [(0, 0)])
+    monkeypatch.setattr(WorldPrune, "world_in_use", lambda world: True)
+    assert WorldPrune.main([str(tmp_path), "--workers", "1"]) == 0
+    assert "in use" in capsys.readouterr().err
+    assert WorldPrune.main([str(tmp_path), "--workers", "1", "--apply"]) == 1
+    assert "Stop the server first" in capsys.readouterr().err
+    assert os.path.exists(tmp_path / "region" / "r.0.0.mca")